@@ -0,0 +1,211 @@
+"""
+批量绿地率计算（命令行）
+
+功能说明:
+- 读取目录中的全部文本DXF图纸，无需打开CAD
+- 按图层名称取绿地、红线和地库：绿地面积逐个计算，地库边界内的绿地按折算系数折算，
+  红线取最大的闭合图形面积，绿地率 = 折算面积 / 红线面积 × 100%
+- 图纸分配给多个进程并行计算，每完成一张立即输出一行，最后输出汇总表
+
+用法示例:
+    python batch_report.py 图纸目录 --green 绿地 --redline 红线 --garage 地库 -o 绿地率汇总.csv
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from cad.backend import DxfBackend
+from cad.entity_snapshot import layer_key
+from utils.factor_zones import FactorZoneRegistry
+from utils.overlap import GARAGE_FACTOR
+
+REPORT_FIELDS = ["文件", "绿地数量", "绿地面积", "折算面积", "红线面积", "绿地率", "耗时", "错误"]
+
+
+def split_layers(value):
+    """解析逗号或分号分隔的图层名称"""
+    if not value:
+        return []
+    return [name.strip() for name in value.replace("；", ";").replace(";", ",").split(",") if name.strip()]
+
+
+def analyze_drawing(path, green_layers, redline_layers=None, garage_layers=None,
+                    garage_factor=GARAGE_FACTOR, unit="米"):
+    """计算单张图纸的绿地面积、折算面积和绿地率，一次流式读取完成
+
+    地库边界可能出现在绿地之后，因此绿地只保留面积和轮廓数值，读完后统一按地库分区折算。
+    """
+    start = time.perf_counter()
+    result = {"文件": os.path.basename(path), "绿地数量": 0, "绿地面积": 0.0, "折算面积": 0.0,
+              "红线面积": 0.0, "绿地率": None, "耗时": 0.0, "错误": ""}
+    try:
+        conversion = 0.000001 if unit == "米" else 1
+        green = {layer_key(name) for name in green_layers}
+        redline = {layer_key(name) for name in redline_layers or ()}
+        garage = {layer_key(name) for name in garage_layers or ()}
+
+        zones = FactorZoneRegistry()
+        areas = []
+        outline_vertices = []
+        outline_counts = []
+        redline_area = 0.0
+        for snapshot, _, _ in DxfBackend(path).iter_snapshots(list(green | redline | garage)):
+            keys = [layer_key(name) for name in snapshot.layers]
+            layer_keys = [keys[k] for k in snapshot.layer_ids]
+            snapshot_areas = np.frombuffer(snapshot.areas, dtype=float)
+
+            green_ids = [i for i, key in enumerate(layer_keys) if key in green]
+            if green_ids:
+                vertices, offsets = snapshot.outlines(np.asarray(green_ids))
+                areas.append(snapshot_areas[green_ids])
+                outline_vertices.append(np.asarray(vertices, dtype=float))
+                outline_counts.append(np.diff(offsets))
+
+            for i, key in enumerate(layer_keys):
+                if not snapshot.closed[i]:
+                    continue
+                if key in redline:
+                    redline_area = max(redline_area, snapshot_areas[i])
+                if key in garage:
+                    vertices, offsets = snapshot.outlines(np.asarray([i]))
+                    if len(vertices) >= 6:
+                        zones.add(np.asarray(vertices, dtype=float).reshape(-1, 2), garage_factor)
+
+        if areas:
+            areas = np.concatenate(areas)
+            offsets = np.concatenate(([0], np.cumsum(np.concatenate(outline_counts))))
+            factors = zones.classify(np.concatenate(outline_vertices), offsets)
+            result["绿地数量"] = len(areas)
+            result["绿地面积"] = float(areas.sum()) * conversion
+            result["折算面积"] = float((areas * factors).sum()) * conversion
+        result["红线面积"] = redline_area * conversion
+        if redline_area > 0:
+            result["绿地率"] = result["折算面积"] / result["红线面积"] * 100
+    except Exception as e:
+        result["错误"] = str(e)
+    result["耗时"] = time.perf_counter() - start
+    return result
+
+
+def format_row(result):
+    """把一行结果格式化为报表文字"""
+    ratio = result["绿地率"]
+    return {
+        "文件": result["文件"],
+        "绿地数量": str(result["绿地数量"]),
+        "绿地面积": f"{result['绿地面积']:.2f}",
+        "折算面积": f"{result['折算面积']:.2f}",
+        "红线面积": f"{result['红线面积']:.2f}",
+        "绿地率": "" if ratio is None else f"{ratio:.2f}%",
+        "耗时": f"{result['耗时']:.1f}s",
+        "错误": result["错误"],
+    }
+
+
+def find_drawings(directory, recursive=False):
+    """列出目录中的DXF文件"""
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(".dxf"))
+        if not recursive:
+            break
+    return sorted(paths)
+
+
+def run_batch(paths, green_layers, redline_layers, garage_layers, garage_factor=GARAGE_FACTOR,
+              unit="米", workers=None, on_result=None):
+    """多进程计算全部图纸，每完成一张调用 on_result(结果)，返回按文件名排序的结果列表"""
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(analyze_drawing, path, green_layers, redline_layers, garage_layers,
+                            garage_factor, unit)
+            for path in paths
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if on_result:
+                on_result(result)
+    results.sort(key=lambda item: item["文件"])
+    return results
+
+
+def print_report(results, unit="米", stream=sys.stdout):
+    """输出汇总表"""
+    unit_symbol = "㎡" if unit == "米" else "mm²"
+    stream.write(f"\n绿地率汇总（面积单位：{unit_symbol}）\n")
+    rows = [format_row(result) for result in results]
+    widths = {field: max([len(field)] + [len(row[field]) for row in rows]) for field in REPORT_FIELDS}
+    stream.write("  ".join(field.ljust(widths[field]) for field in REPORT_FIELDS).rstrip() + "\n")
+    for row in rows:
+        stream.write("  ".join(row[field].ljust(widths[field]) for field in REPORT_FIELDS).rstrip() + "\n")
+    ok = [result for result in results if not result["错误"]]
+    stream.write(f"共{len(results)}张图纸，成功{len(ok)}张，"
+                 f"绿地面积合计{sum(r['绿地面积'] for r in ok):.2f}{unit_symbol}，"
+                 f"折算面积合计{sum(r['折算面积'] for r in ok):.2f}{unit_symbol}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量计算DXF图纸的绿地面积、折算面积和绿地率")
+    parser.add_argument("directory", help="DXF图纸所在目录")
+    parser.add_argument("--green", required=True, help="绿地图层，多个用逗号分隔")
+    parser.add_argument("--redline", default="", help="红线图层，多个用逗号分隔")
+    parser.add_argument("--garage", default="", help="地库图层，多个用逗号分隔")
+    parser.add_argument("--garage-factor", type=float, default=GARAGE_FACTOR * 100,
+                        help="地库范围内绿地的折算系数（百分比），默认80")
+    parser.add_argument("--unit", choices=["米", "毫米"], default="米",
+                        help="面积单位：米（默认，图纸按毫米绘制，输出平方米）或毫米（输出平方毫米）")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="进程数，默认为CPU核数")
+    parser.add_argument("-r", "--recursive", action="store_true", help="包含子目录")
+    parser.add_argument("-o", "--output", help="同时写入CSV文件")
+    args = parser.parse_args(argv)
+
+    paths = find_drawings(args.directory, args.recursive)
+    if not paths:
+        print(f"目录中没有DXF文件: {args.directory}")
+        return 1
+
+    green_layers = split_layers(args.green)
+    redline_layers = split_layers(args.redline)
+    garage_layers = split_layers(args.garage)
+    print(f"共{len(paths)}张图纸，开始计算...")
+
+    csv_file = None
+    writer = None
+    if args.output:
+        csv_file = open(args.output, "w", newline="", encoding="utf-8-sig")
+        writer = csv.DictWriter(csv_file, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+
+    done = [0]
+
+    def on_result(result):
+        done[0] += 1
+        row = format_row(result)
+        status = f"出错: {row['错误']}" if row["错误"] else (
+            f"折算面积 {row['折算面积']}，绿地率 {row['绿地率'] or '无红线'}")
+        print(f"[{done[0]}/{len(paths)}] {row['文件']}  {status}  ({row['耗时']})", flush=True)
+        if writer:
+            writer.writerow(row)
+            csv_file.flush()
+
+    try:
+        results = run_batch(paths, green_layers, redline_layers, garage_layers,
+                            args.garage_factor / 100, args.unit, args.workers, on_result)
+    finally:
+        if csv_file:
+            csv_file.close()
+
+    print_report(results, args.unit)
+    return 0 if all(not result["错误"] for result in results) else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+阅读顺序排序性能对比
+
+功能说明:
+- 对比原 PlantMark.sort_points 的逐行扫描分组与 utils.reading_order 的排序扫描
+- 检查两种实现在规则网格上的编号是否一致，以及新实现对输入顺序是否稳定
+- 运行: python benchmarks/bench_reading_order.py [点数 ...]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from utils.reading_order import reading_order, sort_points
+
+
+def legacy_sort_points(points):
+    """原 PlantMark.sort_points 实现（按行键逐个扫描）"""
+    if not points:
+        return []
+
+    y_coords = [p[1] for p in points]
+    y_min, y_max = min(y_coords), max(y_coords)
+    y_range = y_max - y_min
+
+    y_tolerance = y_range / 10
+    y_tolerance = max(min(y_tolerance, y_range / 3), 100)
+
+    rows = {}
+    for point in points:
+        y = point[1]
+        closest_row = None
+        min_distance = float('inf')
+        for existing_y in rows.keys():
+            distance = abs(y - existing_y)
+            if distance < min_distance and distance < y_tolerance:
+                min_distance = distance
+                closest_row = existing_y
+
+        if closest_row is not None:
+            rows[closest_row].append(point)
+        else:
+            rows[y] = [point]
+
+    sorted_points = []
+    for y in sorted(rows.keys(), reverse=True):
+        sorted_points.extend(sorted(rows[y], key=lambda p: p[0]))
+    return sorted_points
+
+
+def random_site(count, seed=0):
+    """生成随机分布的种植池中心点"""
+    rng = random.Random(seed)
+    return [[rng.uniform(0, 200000), rng.uniform(0, 120000)] for _ in range(count)]
+
+
+def grid_site(rows, cols, spacing=5000, jitter=200, seed=0):
+    """生成按行排布的种植池中心点（行内有少量抖动）"""
+    rng = random.Random(seed)
+    points = []
+    for r in range(rows):
+        for c in range(cols):
+            points.append([c * spacing + rng.uniform(-jitter, jitter),
+                           -r * spacing + rng.uniform(-jitter, jitter)])
+    rng.shuffle(points)
+    return points
+
+
+def timed(func, *args, repeat=3):
+    """返回多次运行中的最短耗时（毫秒）和结果"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+
+    # 规则网格上两种实现的编号应一致
+    grid = grid_site(10, 10)
+    same = legacy_sort_points(grid) == sort_points(grid)
+    print(f"网格编号与原实现一致: {same}")
+
+    for count in sizes:
+        points = random_site(count)
+        array = np.asarray(points)
+
+        new_ms, order = timed(reading_order, array)
+        list_ms, _ = timed(sort_points, points)
+
+        # 打乱输入顺序后结果应不变
+        shuffled = points[:]
+        random.Random(1).shuffle(shuffled)
+        stable = sort_points(shuffled) == [points[i] for i in order]
+
+        legacy_ms, _ = timed(legacy_sort_points, points, repeat=1)
+
+        print(f"{count:>7} 点  原实现 {legacy_ms:7.1f} ms  新实现(数组) {new_ms:7.1f} ms  "
+              f"新实现(列表) {list_ms:7.1f} ms  与输入顺序无关: {stable}")
+
+
+if __name__ == '__main__':
+    main()
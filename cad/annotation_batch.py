@@ -0,0 +1,176 @@
+"""
+标注批处理模块
+
+功能说明:
+- 收集一次标注运行中的全部圆圈序号和面积文字
+- 提交时只切换一次当前图层，按块创建图形并报告进度
+- 整个批次只刷新一次视图（Regen），取消或出错时回滚已创建的图形
+- 每块提交后报告进度，进度回调抛出异常（如取消）时中止并回滚本批次
+- 登记标注时可附带源图形句柄，提交后按句柄记录创建的圆圈、序号和面积文字
+- 移动过位置的标注可登记一条从锚点到标注的引线
+- 属性块标注每个只创建一个块参照，按句柄记录块参照和其中的序号属性
+- 增量标注时删除旧标注和修改序号也登记在批次中，全部新标注创建成功后才执行：
+  先查找全部目标图形，再修改序号（记录原序号，回滚时恢复），最后删除旧标注
+- 整个批次使用同一个标注样式（AnnotationStyle），逐个绘制时不读取界面也不查找图层；
+  自适应字高时单个标注可指定自己的档位样式
+"""
+
+
+class AnnotationBatch:
+    """标注批处理（事务），用法:
+
+        with plant.annotation_batch() as batch:
+            batch.add_circle_number(center, 1)
+            batch.add_area_text(center, area)
+    """
+
+    DEFAULT_CHUNK_SIZE = 500
+
+    def __init__(self, plant, layer_name, chunk_size=DEFAULT_CHUNK_SIZE, progress_callback=None, style=None):
+        self.plant = plant
+        self.doc = plant.doc
+        self.layer_name = layer_name
+        self.style = style  # 标注样式，未提供时在提交时构造一次
+        self.chunk_size = max(1, int(chunk_size or self.DEFAULT_CHUNK_SIZE))
+        self.progress_callback = progress_callback
+        self.pending = []   # 待创建的标注
+        self.created = []   # 已创建的CAD图形
+        self.created_by_key = {}  # 源图形句柄 -> {角色: CAD图形}，角色为 circle/number/area/leader
+        self.deletions = []  # 提交成功后删除的已有图形句柄
+        self.renumbers = []  # 提交成功后修改的 (序号文字或属性句柄, 序号)
+        self.restore = []    # 已修改的 (图形, 原序号)，回滚时恢复
+
+    def __len__(self):
+        return len(self.pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.pending = []
+            self.deletions = []
+            self.renumbers = []
+            self.rollback()
+        return False
+
+    def add_circle_number(self, point, number, key=None, style=None):
+        """登记一个圆圈序号，key 为对应的源图形句柄，style 为该标注的样式（默认为批次样式）"""
+        self.pending.append(('circle', point, number, key, style))
+
+    def add_area_text(self, point, area, is_combined=False, key=None, style=None):
+        """登记一个面积文字，key 为对应的源图形句柄，style 为该标注的样式（默认为批次样式）"""
+        self.pending.append(('area', point, area, key, style, is_combined))
+
+    def add_label_block(self, point, number, area, key=None, style=None):
+        """登记一个属性块标注（圆圈、序号和面积在同一个块参照中）"""
+        self.pending.append(('block', point, number, key, style, area))
+
+    def add_leader(self, start, end, key=None):
+        """登记一条引线（UCS），key 为对应的源图形句柄"""
+        self.pending.append(('leader', start, end, key))
+
+    def delete_handles(self, handles):
+        """登记需要删除的已有图形（如旧标注），全部标注创建成功后才删除"""
+        self.deletions.extend(handles)
+
+    def renumber(self, handle, number):
+        """登记修改已有序号文字（或序号属性），全部标注创建成功后才修改"""
+        self.renumbers.append((handle, str(number)))
+
+    def commit(self):
+        """创建全部已登记的标注，再执行登记的删除和序号修改，返回本批次创建的图形"""
+        if not self.pending and not self.deletions and not self.renumbers:
+            return self.created
+
+        pending, self.pending = self.pending, []
+        total = len(pending)
+        if self.style is None:
+            self.style = self.plant.annotation_style(self.layer_name)
+        style = self.style
+
+        # 整个批次只切换一次图层
+        current_layer = self.doc.ActiveLayer
+        if style.layer is not None:
+            self.doc.ActiveLayer = style.layer
+        try:
+            for start in range(0, total, self.chunk_size):
+                for item in pending[start:start + self.chunk_size]:
+                    owned = None  # 需要回滚删除的图形，默认为全部创建的图形
+                    if item[0] == 'circle':
+                        entities = self.plant._add_circle_number(item[1], item[2], item[4] or style)
+                        roles = ('circle', 'number')
+                    elif item[0] == 'block':
+                        # 块参照和其中的序号属性；修改序号只改属性，回滚只删除块参照
+                        entities = self.plant._add_label_block(item[1], item[2], item[5], item[4] or style)
+                        roles = ('block', 'number')
+                        owned = entities[:1]
+                    elif item[0] == 'leader':
+                        entities = self.plant._add_leader(item[1], item[2], style)
+                        roles = ('leader',)
+                    else:
+                        entities = self.plant._add_area_text(item[1], item[2], is_combined=item[5],
+                                                             style=item[4] or style)
+                        roles = ('area',)
+                    self.created.extend(entities if owned is None else owned)
+                    if item[3] is not None and len(entities) == len(roles):
+                        self.created_by_key.setdefault(item[3], {}).update(zip(roles, entities))
+                self._report_progress(min(start + self.chunk_size, total), total)
+            self._apply_changes()
+        except BaseException:
+            self.rollback()
+            raise
+        finally:
+            self.doc.ActiveLayer = current_layer
+            # 整个批次只刷新一次
+            self.doc.Regen(1)
+        return self.created
+
+    def _apply_changes(self):
+        """修改序号、删除旧图形；此时新标注已全部创建，不再检查取消
+
+        先查找全部目标图形，找不到序号文字时在修改任何图形之前出错。修改序号记录原序号，
+        出错时由 rollback 恢复。删除无法撤销，放在最后执行；删除中途出错时已删除的旧标注
+        仍在登记表中，下次标注时按缺失的标注重画。
+        """
+        deletions, self.deletions = self.deletions, []
+        renumbers, self.renumbers = self.renumbers, []
+        targets = [(self.doc.HandleToObject(handle), text) for handle, text in renumbers]
+        doomed = []
+        for handle in deletions:
+            try:
+                doomed.append(self.doc.HandleToObject(handle))
+            except Exception:
+                pass  # 图形已被手动删除
+        for obj, text in targets:
+            old_text = obj.TextString
+            obj.TextString = text
+            self.restore.append((obj, old_text))
+        for obj in doomed:
+            obj.Delete()
+        self.restore = []
+
+    def rollback(self):
+        """恢复已修改的序号，删除本批次已创建的图形"""
+        restore, self.restore = self.restore, []
+        for obj, text in reversed(restore):
+            try:
+                obj.TextString = text
+            except Exception as e:
+                print(f"恢复序号时出错: {str(e)}")
+        for entity in reversed(self.created):
+            try:
+                entity.Delete()
+            except Exception as e:
+                print(f"回滚标注时出错: {str(e)}")
+        self.created = []
+        self.created_by_key = {}
+
+    def _report_progress(self, done, total):
+        """报告分块提交进度"""
+        if self.progress_callback:
+            self.progress_callback(done, total)
+        if total > self.chunk_size:
+            self.doc.Utility.Prompt(f"\n已完成标注 {done}/{total}")
@@ -0,0 +1,97 @@
+"""
+标注登记表模块
+
+功能说明:
+- 按图纸记录每个已标注图形：句柄 -> 几何哈希、序号、标注图形句柄
+- 再次标注时对比几何哈希和序号，只处理变化的部分：
+  几何未变且序号相同的跳过；几何未变但序号变化的只修改序号文字；
+  几何变化的删除旧标注后重画；新图形直接标注
+- 标注样式（标注类型、字高、单位、标注图层、UCS）变化时全部重画
+- 登记表可转换为字典保存到设置文件
+- 脚本模式下标注句柄在脚本执行后才有，先登记结果文件路径，下次标注前读回（merge_labels）
+"""
+
+
+class AnnotationRegistry:
+    """单张图纸的标注登记表"""
+
+    def __init__(self, entries=None, style=None, script_results=None):
+        # 源图形句柄 -> {"hash": 几何哈希, "number": 序号, "labels": {角色: 标注图形句柄}}
+        self.entries = dict(entries or {})
+        self.style = style  # 上次标注使用的样式
+        self.script_results = script_results  # 尚未读回的脚本结果文件路径
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, handle):
+        return handle in self.entries
+
+    def get(self, handle):
+        return self.entries.get(handle)
+
+    def plan(self, handles, hashes, style):
+        """对比本次的图形（已按标注顺序排列，序号为位置+1），返回处理计划
+
+        返回字典:
+        - draw: 需要新画标注的位置列表
+        - renumber: 需要修改序号的 (位置, 登记项) 列表
+        - remove: 需要删除旧标注的登记项列表（几何变化或样式变化）
+        - skip: 无需处理的数量
+        """
+        restyle = self.style is not None and self.style != style
+        draw = []
+        renumber = []
+        remove = []
+        skip = 0
+        for i, (handle, geometry_hash) in enumerate(zip(handles, hashes)):
+            entry = self.entries.get(handle)
+            if entry is None:
+                draw.append(i)
+            elif restyle or entry["hash"] != geometry_hash:
+                remove.append(entry)
+                draw.append(i)
+            elif entry["number"] != i + 1:
+                renumber.append((i, entry))
+            else:
+                skip += 1
+        return {"draw": draw, "renumber": renumber, "remove": remove, "skip": skip}
+
+    def record(self, handle, geometry_hash, number, labels):
+        """登记一个图形的标注"""
+        self.entries[handle] = {"hash": geometry_hash, "number": number, "labels": dict(labels)}
+
+    def discard(self, handle):
+        """移除登记项，返回被移除的登记项"""
+        return self.entries.pop(handle, None)
+
+    def merge_labels(self, labels):
+        """合并脚本结果文件中的标注句柄 {源图形句柄: {角色: 标注图形句柄}}，返回合并的图形数"""
+        merged = 0
+        for handle, roles in labels.items():
+            entry = self.entries.get(handle)
+            if entry is not None:
+                entry["labels"].update(roles)
+                merged += 1
+        return merged
+
+    def unlabelled_handles(self):
+        """返回没有任何标注句柄的登记项（脚本未执行时需要重画）"""
+        return [handle for handle, entry in self.entries.items() if not entry["labels"]]
+
+    def stale_handles(self, current_handles):
+        """返回已登记但不在本次图形中的句柄"""
+        current = set(current_handles)
+        return [handle for handle in self.entries if handle not in current]
+
+    def to_dict(self):
+        data = {"style": self.style, "entries": self.entries}
+        if self.script_results:
+            data["script_results"] = self.script_results
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data:
+            return cls()
+        return cls(data.get("entries"), data.get("style"), data.get("script_results"))
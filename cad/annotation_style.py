@@ -0,0 +1,183 @@
+"""
+标注样式模块
+
+功能说明:
+- AnnotationStyle: 一次标注运行使用的不可变样式（字高、圆圈半径、面积单位格式、
+  标注图层对象、颜色和UCS旋转角度），每次运行只构造一次，
+  绘制每个标注时不再读取界面变量，也不再按名称查找图层
+- read_label_options: 在界面线程中读取标注选项，得到可交给COM工作线程的普通字典
+- adaptive_heights: 自适应字高，按图形大小一次算出全部标注的字高，
+  限制在基准字高的 0.5~4 倍之间并取整到几个固定档位，同一档位共用一个样式；
+  有圆圈序号时先把档位限制到序号最小字高再取整，各档位的字高互不相同
+- 标注类型：标记（圆圈序号）、数字（面积）、综合（面积 + 圆圈序号）、
+  属性块（与综合相同的内容定义为带 NUMBER/AREA 属性的块，每个标注只插入一个块）
+"""
+
+import hashlib
+
+import numpy as np
+
+DEFAULT_LAYER_NAME = "绿化面积标注"
+DEFAULT_TEXT_HEIGHT = 3.0
+MIN_TEXT_HEIGHT = 2.5  # 序号文字的最小字高
+MIN_RADIUS = 1.5       # 序号圆圈的最小半径
+LABEL_COLOR = 1        # 标注颜色（红色）
+LAYER_COLOR = 3        # 新建标注图层的颜色（绿色）
+ADAPTIVE_LEVELS = (0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0)  # 自适应字高的档位（基准字高的倍数）
+BLOCK_MARK_TYPE = "属性块"
+BLOCK_PREFIX = "GREEN_LABEL_"  # 标注块名称前缀，后接样式哈希
+
+
+def adaptive_heights(sizes, base_height, levels=ADAPTIVE_LEVELS):
+    """把按图形大小算出的字高限制并取整到固定档位，返回每个标注的档位下标
+
+    sizes 为每个图形的建议字高（见 EntitySnapshot.label_sizes），按对数距离取最近的档位。
+    """
+    heights = np.log(np.asarray(levels, dtype=float) * base_height)
+    sizes = np.log(np.maximum(np.asarray(sizes, dtype=float), 1e-12))
+    bounds = (heights[:-1] + heights[1:]) / 2
+    return np.searchsorted(bounds, sizes)
+
+
+def read_label_options(ui):
+    """读取界面上的标注选项，只能在界面线程中调用"""
+    options = {
+        "mark_type": "标记",
+        "text_height": None,
+        "unit": None,
+        "layer_name": DEFAULT_LAYER_NAME,
+        "adaptive": False,
+        "layout": False,
+        "arcs": False,
+        "script": False,
+    }
+    if ui is None:
+        return options
+    if hasattr(ui, 'mark_type_var'):
+        options["mark_type"] = ui.mark_type_var.get()
+    if hasattr(ui, 'text_height_var'):
+        options["text_height"] = ui.text_height_var.get()
+    if hasattr(ui, 'unit_var'):
+        options["unit"] = ui.unit_var.get()
+    if hasattr(ui, 'annotation_layer_var'):
+        options["layer_name"] = ui.annotation_layer_var.get()
+    if hasattr(ui, 'adaptive_size_var'):
+        options["adaptive"] = bool(ui.adaptive_size_var.get())
+    if hasattr(ui, 'label_layout_var'):
+        options["layout"] = bool(ui.label_layout_var.get())
+    if hasattr(ui, 'arc_mode_var'):
+        options["arcs"] = bool(ui.arc_mode_var.get())
+    if hasattr(ui, 'script_mode_var'):
+        options["script"] = bool(ui.script_mode_var.get())
+    return options
+
+
+class AnnotationStyle:
+    """一次标注运行的不可变样式"""
+
+    __slots__ = (
+        "mark_type", "height_text", "unit", "layer_name", "layer",
+        "text_height", "number_height", "radius", "combined_offset",
+        "area_divisor", "area_suffix", "circle_color", "text_color",
+        "rotation", "text_rotation", "ucs", "layout", "adaptive",
+        "has_number", "has_area", "combined",
+    )
+
+    def __init__(self, mark_type="标记", text_height=None, unit=None, layer_name=DEFAULT_LAYER_NAME,
+                 layer=None, rotation=0.0, ucs=None, color=LABEL_COLOR, layout=False, adaptive=False):
+        try:
+            height = float(text_height) if text_height is not None else DEFAULT_TEXT_HEIGHT
+        except ValueError:
+            height = DEFAULT_TEXT_HEIGHT
+        radius = max(max(height, MIN_TEXT_HEIGHT) * 0.6, MIN_RADIUS)
+        values = {
+            "mark_type": mark_type,
+            "height_text": text_height,  # 界面中的原始字高文字，用于标注登记表比较样式
+            "unit": unit,
+            "layer_name": layer_name,
+            "layer": layer,
+            "text_height": height,                              # 面积文字字高
+            "number_height": max(height, MIN_TEXT_HEIGHT),      # 序号文字字高
+            "radius": radius,
+            # 综合模式下面积文字在圆的左侧：圆的直径加一个字高
+            "combined_offset": max(height * 0.6, MIN_RADIUS) * 2 + height,
+            "area_divisor": 1000000 if unit == "米" else 1,     # 平方毫米 -> 平方米
+            "area_suffix": "㎡" if unit == "米" else "㎟",
+            "circle_color": color,
+            "text_color": color,
+            "rotation": rotation,                                # UCS旋转角度（弧度）
+            "text_rotation": -rotation,                          # 文字和块参照的 Rotation（弧度）
+            "ucs": ucs,
+            "layout": bool(layout),                              # 是否启用标注避让
+            "adaptive": bool(adaptive),                          # 是否按图形大小自适应字高
+            "has_number": mark_type in ("标记", "综合", BLOCK_MARK_TYPE),  # 是否有圆圈序号
+            "has_area": mark_type in ("数字", "综合", BLOCK_MARK_TYPE),    # 是否有面积文字
+            "combined": mark_type in ("综合", BLOCK_MARK_TYPE),           # 面积文字是否偏移到圆旁
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("标注样式不可修改")
+
+    def __delattr__(self, name):
+        raise AttributeError("标注样式不可修改")
+
+    def __repr__(self):
+        return (f"AnnotationStyle({self.mark_type!r}, text_height={self.text_height}, "
+                f"unit={self.unit!r}, layer_name={self.layer_name!r})")
+
+    @classmethod
+    def from_options(cls, options, layer=None, rotation=0.0, ucs=None, layout=False):
+        """由 read_label_options 的结果构造"""
+        return cls(options.get("mark_type", "标记"), options.get("text_height"), options.get("unit"),
+                   options.get("layer_name") or DEFAULT_LAYER_NAME, layer, rotation, ucs,
+                   layout=layout, adaptive=options.get("adaptive", False))
+
+    def scaled(self, factor):
+        """字高乘以 factor 的同类样式（自适应字高的一个档位）"""
+        if factor == 1:
+            return self
+        return AnnotationStyle(self.mark_type, self.text_height * factor, self.unit, self.layer_name,
+                               self.layer, self.rotation, self.ucs, self.circle_color, self.layout,
+                               self.adaptive)
+
+    def effective_levels(self, levels=ADAPTIVE_LEVELS):
+        """实际使用的档位：有圆圈序号时低于序号最小字高的档位合并为最小字高一档"""
+        if not self.has_number:
+            return tuple(levels)
+        lowest = MIN_TEXT_HEIGHT / self.text_height
+        result = []
+        for factor in levels:
+            factor = max(factor, lowest)
+            if not result or factor > result[-1]:
+                result.append(factor)
+        return tuple(result)
+
+    def level_styles(self, sizes, levels=ADAPTIVE_LEVELS):
+        """按图形的建议字高为每个标注选择档位样式，同一档位共用一个样式对象"""
+        levels = self.effective_levels(levels)
+        indices = adaptive_heights(sizes, self.text_height, levels)
+        styles = [self.scaled(factor) for factor in levels]
+        return [styles[k] for k in indices.tolist()]
+
+    @property
+    def block_name(self):
+        """属性块名称：几何和颜色相同的样式共用一个块定义"""
+        values = (self.number_height, self.text_height, self.radius, self.combined_offset,
+                  self.circle_color, self.text_color)
+        digest = hashlib.blake2b(repr(values).encode("ascii"), digest_size=4).hexdigest()
+        return BLOCK_PREFIX + digest.upper()
+
+    def format_area(self, area):
+        """按单位格式化面积文字"""
+        return f"{area / self.area_divisor:.2f}{self.area_suffix}"
+
+    def registry_key(self):
+        """标注登记表比较的样式，变化时需要全部重画"""
+        key = [self.mark_type, self.height_text, self.unit, self.layer_name, self.ucs]
+        if self.layout:
+            key.append("避让")
+        if self.adaptive:
+            key.append("自适应")
+        return key
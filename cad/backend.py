@@ -0,0 +1,107 @@
+"""
+CAD后端模块
+
+功能说明:
+- CadBackend: 读取图纸的统一接口，CadUtils/PlantMark 通过它获取图层和分块的图形快照
+- ComBackend: 通过 win32com 连接正在运行的CAD（由 CadUtils 创建）
+- DxfBackend: 流式读取文本DXF文件，无需CAD即可在任意平台计算面积、折算系数和绿地率
+- 两个后端产出相同的 EntitySnapshot 快照表，后续计算不区分来源
+"""
+
+from .entity_snapshot import DXF_NAMES, EntitySnapshot
+from .dxf_reader import DxfReader
+
+
+class CadBackend:
+    """CAD后端接口"""
+
+    name = ""
+
+    def layer_names(self):
+        """返回图纸中的全部图层名称"""
+        raise NotImplementedError
+
+    def iter_snapshots(self, layer_names=None, chunk_size=2000, min_area=1):
+        """分块读取模型空间中符合图层条件的图形，每块产出 (快照, 已完成, 总数)
+
+        layer_names 为 None 时读取全部图层；已完成和总数的单位由后端决定，仅用于报告进度。
+        """
+        raise NotImplementedError
+
+    def read_snapshot(self, layer_names=None, min_area=1, progress_callback=None):
+        """读取全部符合条件的图形，合并为一个快照"""
+        snapshot = EntitySnapshot()
+        for chunk, done, total in self.iter_snapshots(layer_names, min_area=min_area):
+            snapshot.extend(chunk)
+            if progress_callback:
+                progress_callback(done, total)
+        return snapshot
+
+
+class ComBackend(CadBackend):
+    """通过COM读取正在运行的CAD图纸"""
+
+    name = "com"
+    SELECTION_NAME = "cad_scan_select"
+
+    def __init__(self, cad):
+        self.cad = cad  # CadUtils 实例，提供 doc、msp 和选择集过滤
+        self.detect_arcs = False  # 为 True 时读取多段线的圆弧段凸度（每条多段线多一次COM调用）
+
+    def layer_names(self):
+        return [layer.Name for layer in self.cad.doc.Layers]
+
+    def iter_objects(self, layer_names=None, chunk_size=2000):
+        """分块遍历模型空间中符合类型和图层条件的COM对象，每块产出 (对象列表, 总数)
+
+        优先用带过滤器的 Select(acSelectionSetAll) 由CAD筛选；不支持时逐个遍历 ModelSpace，
+        由快照按类型和图层过滤。每块只持有 chunk_size 个COM对象。
+        """
+        chunk_size = max(1, int(chunk_size))
+        doc = self.cad.doc
+
+        # 删除上次扫描残留的同名选择集
+        try:
+            doc.SelectionSets.Item(self.SELECTION_NAME).Delete()
+        except Exception:
+            pass
+
+        selection = doc.SelectionSets.Add(self.SELECTION_NAME)
+        try:
+            try:
+                self.cad.select_all(selection, DXF_NAMES, layer_names)
+                source = selection
+            except Exception as e:
+                print(f"过滤选择失败，改为遍历模型空间: {str(e)}")
+                source = self.cad.msp
+
+            total = source.Count
+            for start in range(0, total, chunk_size):
+                yield [source.Item(i) for i in range(start, min(start + chunk_size, total))], total
+        finally:
+            selection.Delete()
+
+    def iter_snapshots(self, layer_names=None, chunk_size=2000, min_area=1):
+        done = 0
+        for objects, total in self.iter_objects(layer_names, chunk_size):
+            done += len(objects)
+            yield EntitySnapshot.from_objects(objects, layer_names, min_area, self.detect_arcs), done, total
+
+
+class DxfBackend(CadBackend):
+    """流式读取文本DXF文件，进度按已读字节数报告"""
+
+    name = "dxf"
+
+    def __init__(self, path, encoding=None):
+        self.path = path
+        self.encoding = encoding
+
+    def _reader(self):
+        return DxfReader(self.path, self.encoding)
+
+    def layer_names(self):
+        return self._reader().layers()
+
+    def iter_snapshots(self, layer_names=None, chunk_size=2000, min_area=1):
+        return self._reader().snapshots(layer_names, chunk_size, min_area)
@@ -0,0 +1,62 @@
+"""
+CAD会话模块
+
+功能说明:
+- 在整个程序运行期间复用同一个 PlantMark 连接，按钮操作不再每次重新 Dispatch
+- 首次使用时才连接CAD（延迟绑定）
+- 每次取用前做一次轻量检查：CAD已关闭或连接失效时重新连接；
+  活动文档切换时重新绑定文档和模型空间，并清除上一张图纸的快照
+- 主界面、填充和导出功能共享同一个会话
+"""
+
+from .plant_mark import PlantMark
+
+
+class CadSession:
+    """长期保持的CAD连接"""
+
+    def __init__(self, app_name="AutoCAD.Application", factory=PlantMark):
+        self.app_name = app_name
+        self.factory = factory
+        self.plant = None          # 共享的 PlantMark 实例，重新绑定时保持不变
+        self.document_key = None   # 当前绑定文档的标识（完整路径，未保存时为文件名）
+        self.ui = None
+        self.reconnects = 0        # 重新连接次数
+        self.rebinds = 0           # 切换文档次数
+
+    @staticmethod
+    def _document_key(document):
+        return document.FullName or document.Name
+
+    def acquire(self):
+        """返回绑定到当前活动文档的 PlantMark，必要时连接或重新绑定"""
+        if self.plant is None:
+            self.plant = self.factory(self.app_name)
+            self.plant.ui = self.ui
+            self.document_key = self._document_key(self.plant.doc)
+            return self.plant
+
+        try:
+            document = self.plant.wincad.ActiveDocument
+            key = self._document_key(document)
+        except Exception as e:
+            print(f"CAD连接已失效，重新连接: {str(e)}")
+            self.plant.connect()
+            self.reconnects += 1
+            self.document_key = self._document_key(self.plant.doc)
+            return self.plant
+
+        if key != self.document_key:
+            self.plant.bind(self.plant.wincad, document)
+            self.rebinds += 1
+            self.document_key = key
+        return self.plant
+
+    @property
+    def connected(self):
+        return self.plant is not None
+
+    def reset(self):
+        """丢弃当前连接，下次取用时重新连接"""
+        self.plant = None
+        self.document_key = None
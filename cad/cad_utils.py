@@ -2,12 +2,36 @@ import win32com.client
 import pythoncom
 import win32
 
+from .backend import ComBackend
+
+# Select 方法的选择模式：选择全部图形
+AC_SELECTION_SET_ALL = 5
+
+# 选择集过滤字符串中的通配符，图层名中出现时需要用反引号转义
+WILDCARD_CHARS = "#@.*?~[]-,`"
+
+
+def escape_wildcards(name):
+    """转义名称中的通配符，使其按字面匹配"""
+    return "".join("`" + ch if ch in WILDCARD_CHARS else ch for ch in name)
+
+
 class CadUtils:
     def __init__(self, app_name):
-        self.wincad = win32com.client.Dispatch(app_name)
-        self.doc = self.wincad.ActiveDocument
-        self.msp = self.doc.ModelSpace
+        self.app_name = app_name
         self.wcs = True
+        self.connect()
+        self.backend = ComBackend(self)  # 图形读取后端
+
+    def connect(self):
+        """连接CAD应用程序并绑定当前活动文档"""
+        self.bind(win32com.client.Dispatch(self.app_name))
+
+    def bind(self, application, document=None):
+        """绑定CAD应用程序和文档（默认为活动文档），缓存模型空间"""
+        self.wincad = application
+        self.doc = document if document is not None else application.ActiveDocument
+        self.msp = self.doc.ModelSpace
 
     def vtpnt(self, x, y, z=0):
         """创建点对象"""
@@ -21,6 +45,46 @@ class CadUtils:
         """转化为对象数组"""
         return win32com.client.VARIANT(pythoncom.VT_ARRAY | pythoncom.VT_DISPATCH, obj)
 
+    def selection_filter(self, object_types=None, layer_names=None, layout_name=None):
+        """生成选择集过滤器 (FilterType, FilterData)
+
+        DXF组码0限定图形类型（如 LWPOLYLINE），组码8限定图层，多个值用逗号连接；
+        组码410限定布局（模型空间为 "Model"）。没有任何条件时返回 None。
+        """
+        codes = []
+        values = []
+        if object_types:
+            codes.append(0)
+            values.append(",".join(object_types))
+        if layer_names:
+            codes.append(8)
+            values.append(",".join(escape_wildcards(name) for name in layer_names))
+        if layout_name:
+            codes.append(410)
+            values.append(escape_wildcards(layout_name))
+        if not codes:
+            return None
+        return (win32com.client.VARIANT(pythoncom.VT_ARRAY | pythoncom.VT_I2, codes),
+                win32com.client.VARIANT(pythoncom.VT_ARRAY | pythoncom.VT_VARIANT, values))
+
+    def select_on_screen(self, selection, object_types=None, layer_names=None):
+        """按图形类型和图层过滤后让用户在屏幕上选择，CAD只返回符合条件的图形"""
+        filters = self.selection_filter(object_types, layer_names)
+        if filters is None:
+            selection.SelectOnScreen()
+        else:
+            selection.SelectOnScreen(*filters)
+        return selection
+
+    def select_all(self, selection, object_types=None, layer_names=None, layout_name="Model"):
+        """不经交互选择全部符合条件的图形（默认只选模型空间）"""
+        filters = self.selection_filter(object_types, layer_names, layout_name)
+        if filters is None:
+            selection.Select(AC_SELECTION_SET_ALL)
+        else:
+            selection.Select(AC_SELECTION_SET_ALL, pythoncom.Empty, pythoncom.Empty, *filters)
+        return selection
+
     def autocad(self):
         """获取CAD应用程序实例"""
         try:
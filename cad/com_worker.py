@@ -0,0 +1,155 @@
+"""
+COM工作线程模块
+
+功能说明:
+- 单独的STA线程持有CAD会话，所有CAD的COM调用都在该线程中按顺序执行，
+  耗时操作期间Tk主循环保持响应，窗口不再出现"未响应"
+- submit 提交任务后立即返回 Future；完成、出错和进度回调通过 root.after 轮询
+  在界面线程中执行，回调中可以直接操作Tk控件
+- 任务函数的参数为 (会话, 任务上下文)：上下文提供进度报告和取消检查
+- 不依赖真实CAD，可传入返回假COM对象的 session_factory 和代替 pythoncom 的 apartment
+  在Linux上测试；pythoncom 只在工作线程启动时导入
+"""
+
+import queue
+import threading
+from concurrent.futures import Future
+
+from .jobs import JobCancelled, JobContext
+
+
+class ComWorker:
+    """持有CAD连接的STA工作线程"""
+
+    POLL_INTERVAL = 50  # 界面线程轮询回调的间隔（毫秒）
+
+    def __init__(self, root=None, session_factory=None, poll_interval=POLL_INTERVAL, apartment=None):
+        self.root = root
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        # 提供 CoInitialize/CoUninitialize/PumpWaitingMessages 的对象，默认为 pythoncom
+        self.apartment = apartment
+        self.session = None          # 在工作线程中创建，只能在任务函数里使用
+        self.jobs = queue.Queue()
+        self.callbacks = queue.Queue()
+        self.thread = None
+        self.current = None          # 正在执行的任务上下文
+        self._stopping = False
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="cad-com-worker", daemon=True)
+            self.thread.start()
+            if self.root is not None:
+                self.root.after(self.poll_interval, self._poll)
+        return self
+
+    def stop(self, timeout=None):
+        """处理完已提交的任务后结束线程"""
+        self._stopping = True
+        self.jobs.put(None)
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def submit(self, func, *args, on_done=None, on_error=None, on_progress=None, **kwargs):
+        """提交任务 func(会话, 上下文, *args, **kwargs)，返回 Future
+
+        future.context 为任务上下文，可用于取消。on_done(结果)、on_error(异常)、
+        on_progress(阶段, 已完成, 总数, 耗时) 都在界面线程中调用。
+        """
+        future = Future()
+        context = JobContext(self, future, on_progress)
+        future.context = context
+        if on_done or on_error:
+            future.add_done_callback(lambda f: self._post_result(f, on_done, on_error))
+        self.start()
+        self.jobs.put((future, context, func, args, kwargs))
+        return future
+
+    def cancel(self, future):
+        """取消任务：未开始的直接取消，正在执行的在下一次检查时停止"""
+        if not future.cancel():
+            future.context.cancel()
+
+    def cancel_all(self):
+        """取消正在执行和排队中的全部任务"""
+        if self.current is not None:
+            self.current.cancel()
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job[0].cancel()
+
+    @property
+    def busy(self):
+        return self.current is not None or not self.jobs.empty()
+
+    def post(self, callback, *args):
+        """把回调交给界面线程执行；没有 root 时立即执行（测试用）"""
+        if self.root is None:
+            callback(*args)
+        else:
+            self.callbacks.put((callback, args))
+
+    def _post_result(self, future, on_done, on_error):
+        if future.cancelled():
+            if on_error:
+                self.post(on_error, JobCancelled("操作已取消"))
+            return
+        error = future.exception()
+        if error is None:
+            if on_done:
+                self.post(on_done, future.result())
+        elif on_error:
+            self.post(on_error, error)
+
+    def _poll(self):
+        """界面线程中执行工作线程提交的回调"""
+        while True:
+            try:
+                callback, args = self.callbacks.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"执行界面回调时出错: {str(e)}")
+        if not self._stopping:
+            self.root.after(self.poll_interval, self._poll)
+
+    def _run(self):
+        apartment = self.apartment
+        if apartment is None:
+            import pythoncom
+            apartment = pythoncom
+        apartment.CoInitialize()
+        try:
+            if self.session_factory is not None:
+                self.session = self.session_factory()
+            while True:
+                try:
+                    job = self.jobs.get(timeout=0.1)
+                except queue.Empty:
+                    # 等待任务时处理本线程的COM消息
+                    apartment.PumpWaitingMessages()
+                    continue
+                if job is None:
+                    break
+                future, context, func, args, kwargs = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self.current = context
+                try:
+                    result = func(self.session, context, *args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+                finally:
+                    self.current = None
+        finally:
+            self.session = None
+            apartment.CoUninitialize()
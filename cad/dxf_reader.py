@@ -0,0 +1,272 @@
+"""
+DXF流式读取模块
+
+功能说明:
+- 逐行读取文本DXF的组码/值对，不把整个文件读入内存，可处理上百MB的图纸
+- 读取 HEADER 中的版本和代码页以确定文字编码（R2007及以上为UTF-8，旧版本按代码页，如 ANSI_936 为GBK）
+- 读取 TABLES 中的 LAYER 表得到图层名称
+- 读取 ENTITIES 中模型空间的 LWPOLYLINE（含凸度）、CIRCLE、ELLIPSE，
+  按块写入与COM读取相同的 EntitySnapshot 快照表
+- 多段线和圆的坐标按拉伸方向（组码210/220/230）由OCS转换到WCS
+"""
+
+import os
+import re
+
+from .entity_snapshot import EntitySnapshot, TYPE_POLYLINE, layer_key, layer_set
+
+# 代码页名称 -> Python编码
+CODEPAGES = {
+    "ANSI_936": "gbk",
+    "ANSI_950": "big5",
+    "ANSI_932": "cp932",
+    "ANSI_949": "cp949",
+}
+
+# 旧版本DXF中的 \U+XXXX 转义
+_UNICODE_ESCAPE = re.compile(r"\\U\+([0-9A-Fa-f]{4})")
+
+
+def _unescape(text):
+    return _UNICODE_ESCAPE.sub(lambda m: chr(int(m.group(1), 16)), text)
+
+
+def ocs_axes(normal):
+    """按DXF任意轴算法计算OCS的X、Y轴（WCS下的单位向量）"""
+    nx, ny, nz = normal
+    length = (nx * nx + ny * ny + nz * nz) ** 0.5 or 1.0
+    nx, ny, nz = nx / length, ny / length, nz / length
+    if abs(nx) < 1 / 64 and abs(ny) < 1 / 64:
+        ax = (nz, 0.0, -nx)          # WY × N
+    else:
+        ax = (-ny, nx, 0.0)          # WZ × N
+    a_len = (ax[0] ** 2 + ax[1] ** 2 + ax[2] ** 2) ** 0.5
+    ax = (ax[0] / a_len, ax[1] / a_len, ax[2] / a_len)
+    ay = (ny * ax[2] - nz * ax[1], nz * ax[0] - nx * ax[2], nx * ax[1] - ny * ax[0])  # N × Ax
+    return ax, ay
+
+
+class DxfReader:
+    """文本DXF的流式读取器"""
+
+    READ_SIZE = 1 << 20  # 每批读取的字节数
+
+    def __init__(self, path, encoding=None):
+        self.path = path
+        self.encoding = encoding or "utf-8"  # 未指定时按 HEADER 中的版本和代码页确定
+        self._fixed_encoding = encoding is not None
+        self.size = os.path.getsize(path)
+        self.position = 0  # 已读取的字节数，用于报告进度
+
+    def _decode(self, value):
+        return _unescape(value.decode(self.encoding, errors="replace"))
+
+    def pairs(self):
+        """逐个产出 (组码, 原始字节值)，值已去掉行尾换行符
+
+        每次读取约 READ_SIZE 字节的整行，按行成对解析，内存占用与文件大小无关。
+        """
+        with open(self.path, "rb") as stream:
+            if stream.read(22) == b"AutoCAD Binary DXF\r\n\x1a\x00":
+                raise ValueError("不支持二进制DXF，请另存为文本DXF")
+            stream.seek(0)
+            pending = None  # 上一批末尾落单的组码行
+            while True:
+                lines = stream.readlines(self.READ_SIZE)
+                if not lines:
+                    break
+                self.position = stream.tell()
+                if pending is not None:
+                    lines.insert(0, pending)
+                    pending = None
+                if len(lines) % 2:
+                    pending = lines.pop()
+                for k in range(0, len(lines), 2):
+                    code_line = lines[k].strip()
+                    if code_line:
+                        yield int(code_line), lines[k + 1].rstrip(b"\r\n")
+
+    def records(self):
+        """产出 (段名, 记录类型, 组码/值列表)，每条记录从组码0开始到下一个组码0之前"""
+        section = None
+        kind = None
+        items = []
+        expect_section_name = False
+        for code, value in self.pairs():
+            if code != 0:
+                if expect_section_name and code == 2:
+                    section = value.strip().decode("ascii", errors="replace")
+                    expect_section_name = False
+                else:
+                    items.append((code, value))
+                continue
+
+            if kind is not None:
+                yield section, kind, items
+            kind = value.strip().decode("ascii", errors="replace")
+            items = []
+            if kind == "SECTION":
+                expect_section_name = True
+            elif kind == "ENDSEC":
+                section = None
+            elif kind == "EOF":
+                return
+        if kind is None:
+            raise ValueError("不是有效的DXF文件")
+        yield section, kind, items
+
+    def _read_header_variable(self, name, items):
+        """从 HEADER 中的变量更新文字编码"""
+        if self._fixed_encoding:
+            return
+        for code, value in items:
+            if code == 1 and name == "$ACADVER":
+                version = value.strip().decode("ascii", errors="replace")
+                if version >= "AC1021":
+                    self.encoding = "utf-8"
+                    self._fixed_encoding = True
+            elif code == 3 and name == "$DWGCODEPAGE":
+                codepage = value.strip().decode("ascii", errors="replace").upper()
+                encoding = CODEPAGES.get(codepage)
+                if encoding is None and codepage.startswith("ANSI_"):
+                    encoding = "cp" + codepage[5:]
+                if encoding:
+                    self.encoding = encoding
+
+    def _iter_sections(self):
+        """产出 HEADER 以外的记录；HEADER 变量在读取时直接处理"""
+        for section, kind, items in self.records():
+            if section == "HEADER":
+                # HEADER 中的记录形如 (9, 变量名), (组码, 值)...，整段作为一条记录
+                name = None
+                group = []
+                for code, value in items:
+                    if code == 9:
+                        if name:
+                            self._read_header_variable(name, group)
+                        name = value.strip().decode("ascii", errors="replace")
+                        group = []
+                    else:
+                        group.append((code, value))
+                if name:
+                    self._read_header_variable(name, group)
+            else:
+                yield section, kind, items
+
+    def layers(self):
+        """读取 LAYER 表中的图层名称，读完 TABLES 段即停止"""
+        names = []
+        seen_tables = False
+        for section, kind, items in self._iter_sections():
+            if section != "TABLES":
+                if seen_tables and section is not None:
+                    break
+                continue
+            seen_tables = True
+            if kind == "LAYER":
+                for code, value in items:
+                    if code == 2:
+                        names.append(self._decode(value))
+                        break
+        return names
+
+    def entities(self, layer_names=None):
+        """产出模型空间中符合图层条件的 (类型, 组码/值列表)，图层名比较不区分大小写"""
+        allowed = layer_set(layer_names)
+        decoded = {}  # 原始图层名 -> 解码后的名称
+        for section, kind, items in self._iter_sections():
+            if section != "ENTITIES" or kind not in ("LWPOLYLINE", "CIRCLE", "ELLIPSE"):
+                continue
+            layer = None
+            paper_space = False
+            for code, value in items:
+                if code == 8 and layer is None:
+                    layer = decoded.get(value)
+                    if layer is None:
+                        layer = decoded[value] = self._decode(value)
+                elif code == 67:
+                    paper_space = int(value) == 1
+            if paper_space:
+                continue
+            layer = layer if layer is not None else "0"
+            if allowed is not None and layer_key(layer) not in allowed:
+                continue
+            yield kind, layer, items
+
+    def read_entity(self, snapshot, kind, layer, items):
+        """把一条图形记录写入快照，成功返回 True"""
+        handle = ""
+        normal = [0.0, 0.0, 1.0]
+        if kind == "LWPOLYLINE":
+            flags = 0
+            coords = []
+            bulges = []
+            for code, value in items:
+                if code == 10:
+                    coords.append(float(value))
+                    bulges.append(0.0)
+                elif code == 20:
+                    coords.append(float(value))
+                elif code == 42 and bulges:
+                    bulges[-1] = float(value)
+                elif code == 70:
+                    flags = int(value)
+                elif code == 5:
+                    handle = self._decode(value).strip()
+                elif 210 <= code <= 230 and code % 10 == 0:
+                    normal[(code - 210) // 10] = float(value)
+            count = min(len(coords) // 2, len(bulges))
+            if not count:
+                return False
+            coords, bulges = self._to_wcs(coords[:2 * count], bulges[:count], normal)
+            # 面积和形心由快照的 finalize 批量计算
+            snapshot.append(handle, None, TYPE_POLYLINE, layer, bool(flags & 1), 0.0, (0.0, 0.0), 0.0,
+                            coords, bulges)
+            return True
+
+        values = {}
+        for code, value in items:
+            if code == 5:
+                handle = self._decode(value).strip()
+            elif 210 <= code <= 230 and code % 10 == 0:
+                normal[(code - 210) // 10] = float(value)
+            elif code in (10, 20, 11, 21, 40):
+                values[code] = float(value)
+        center = (values.get(10, 0.0), values.get(20, 0.0))
+        if kind == "CIRCLE":
+            center = self._to_wcs(list(center), None, normal)[0]
+            return snapshot.append_circle(handle, None, layer, center, values.get(40, 0.0))
+        # 椭圆的圆心和长轴在 WCS 中
+        major_axis = (values.get(11, 0.0), values.get(21, 0.0))
+        return snapshot.append_ellipse(handle, None, layer, center, major_axis, values.get(40, 1.0))
+
+    @staticmethod
+    def _to_wcs(coords, bulges, normal):
+        """把OCS坐标转换为WCS；拉伸方向朝下时凸度取反"""
+        if normal[0] == 0.0 and normal[1] == 0.0 and normal[2] > 0:
+            return coords, bulges
+        ax, ay = ocs_axes(normal)
+        wcs = []
+        for k in range(0, len(coords), 2):
+            x, y = coords[k], coords[k + 1]
+            wcs.append(x * ax[0] + y * ay[0])
+            wcs.append(x * ax[1] + y * ay[1])
+        if bulges is not None and ax[0] * ay[1] - ax[1] * ay[0] < 0:
+            bulges = [-b for b in bulges]
+        return wcs, bulges
+
+    def snapshots(self, layer_names=None, chunk_size=2000, min_area=1):
+        """分块读取图形，每块产出 (快照, 已读字节数, 文件字节数)，内存只与块大小有关"""
+        chunk_size = max(1, int(chunk_size))
+        snapshot = EntitySnapshot()
+        for kind, layer, items in self.entities(layer_names):
+            try:
+                self.read_entity(snapshot, kind, layer, items)
+            except Exception as e:
+                print(f"读取DXF图形时出错: {str(e)}")
+                continue
+            if len(snapshot) >= chunk_size:
+                yield snapshot.finalize(min_area), self.position, self.size
+                snapshot = EntitySnapshot()
+        if len(snapshot):
+            yield snapshot.finalize(min_area), self.position, self.size
@@ -0,0 +1,313 @@
+"""
+图形快照模块
+
+功能说明:
+- 一次遍历选择集，把每个图形需要的属性各读取一次
+- 结果保存在紧凑的数组表中（句柄、类型码、图层号、闭合标记、面积、中心点、顶点缓冲）
+- 多段线的面积和形心由 utils.geometry 在快照表上批量计算（含圆弧段）
+- 圆和椭圆在顶点缓冲中保存36边近似轮廓，供重叠面积等多边形运算使用
+- 后续的面积计算、排序和标注只访问快照表，不再产生COM调用
+"""
+
+import hashlib
+from array import array
+
+import numpy as np
+
+from utils.geometry import densify_arcs, ellipse_outline, polygon_properties, subset_buffers
+from utils.polylabel import polylabels
+
+# 图形类型码
+TYPE_POLYLINE = 1
+TYPE_CIRCLE = 2
+TYPE_ELLIPSE = 3
+
+OBJECT_TYPES = {
+    "AcDbPolyline": TYPE_POLYLINE,
+    "AcDbCircle": TYPE_CIRCLE,
+    "AcDbEllipse": TYPE_ELLIPSE,
+}
+
+TYPE_NAMES = {code: name for name, code in OBJECT_TYPES.items()}
+
+# 选择集过滤使用的DXF类型名（组码0）
+DXF_NAMES = ("LWPOLYLINE", "CIRCLE", "ELLIPSE")
+
+
+def layer_key(name):
+    """图层名比较用的键：与CAD一致，图层名不区分大小写"""
+    return name.casefold()
+
+
+def layer_set(layer_names):
+    """按 layer_key 建立图层集合，layer_names 为空时返回 None（不按图层过滤）"""
+    return {layer_key(name) for name in layer_names} if layer_names else None
+
+
+class EntitySnapshot:
+    """选中图形的紧凑快照表"""
+
+    def __init__(self):
+        self.handles = []              # 图形句柄
+        self.objects = []              # 原始COM对象（仅供填充等后续操作引用）
+        self.layers = []               # 图层名称表，layer_ids 为其下标
+        self._layer_index = {}
+        self.type_codes = array('b')   # 图形类型码
+        self.layer_ids = array('i')    # 图层号
+        self.closed = array('b')       # 是否闭合
+        self.areas = array('d')        # 面积
+        self.radii = array('d')        # 圆半径/椭圆短半轴，多段线为0
+        self.centers = array('d')      # 中心点（WCS），x0, y0, x1, y1 ...
+        self.vertices = array('d')     # 顶点缓冲（WCS），x0, y0, x1, y1 ...；圆和椭圆为近似轮廓
+        self.bulges = array('d')       # 每个顶点到下一顶点的凸度，与顶点一一对应
+        self.offsets = array('q', [0]) # 第i个图形的顶点为 offsets[i] 到 offsets[i+1]（按点计）
+        self.unclosed_count = 0        # 计入面积的未闭合多段线数量
+
+    def __len__(self):
+        return len(self.type_codes)
+
+    def layer_id(self, layer_name):
+        """获取图层号，不存在时登记"""
+        index = self._layer_index.get(layer_name)
+        if index is None:
+            index = len(self.layers)
+            self.layers.append(layer_name)
+            self._layer_index[layer_name] = index
+        return index
+
+    def layer_name(self, i):
+        """获取第i个图形的图层名称"""
+        return self.layers[self.layer_ids[i]]
+
+    def type_name(self, i):
+        """获取第i个图形的CAD类型名称"""
+        return TYPE_NAMES[self.type_codes[i]]
+
+    def center(self, i):
+        """获取第i个图形的中心点"""
+        return [self.centers[2 * i], self.centers[2 * i + 1]]
+
+    def get_vertices(self, i):
+        """获取第i个图形的顶点坐标（扁平数组）"""
+        return self.vertices[2 * self.offsets[i]:2 * self.offsets[i + 1]]
+
+    def get_bulges(self, i):
+        """获取第i个图形各顶点的凸度"""
+        return self.bulges[self.offsets[i]:self.offsets[i + 1]]
+
+    def append(self, handle, obj, type_code, layer_name, closed, area, center, radius=0.0, coords=(), bulges=None):
+        """追加一条图形记录"""
+        self.handles.append(handle)
+        self.objects.append(obj)
+        self.type_codes.append(type_code)
+        self.layer_ids.append(self.layer_id(layer_name))
+        self.closed.append(1 if closed else 0)
+        self.areas.append(area)
+        self.radii.append(radius)
+        self.centers.extend((center[0], center[1]))
+        if isinstance(coords, np.ndarray):
+            self.vertices.frombytes(coords.astype(float).tobytes())
+        else:
+            self.vertices.extend(coords)
+        if bulges is None:
+            bulges = (0.0,) * (len(coords) // 2)
+        self.bulges.extend(bulges)
+        self.offsets.append(self.offsets[-1] + len(coords) // 2)
+
+    def take(self, indices):
+        """按下标取出子表，返回新的快照"""
+        subset = EntitySnapshot()
+        for i in indices:
+            subset.append(
+                self.handles[i], self.objects[i], self.type_codes[i], self.layer_name(i),
+                self.closed[i], self.areas[i], self.center(i), self.radii[i],
+                self.get_vertices(i), self.get_bulges(i)
+            )
+        subset.unclosed_count = sum(
+            1 for i in range(len(subset))
+            if subset.type_codes[i] == TYPE_POLYLINE and not subset.closed[i]
+        )
+        return subset
+
+    def extend(self, other):
+        """把另一个快照的全部记录追加到本快照末尾"""
+        base = self.offsets[-1]
+        self.handles.extend(other.handles)
+        self.objects.extend(other.objects)
+        self.type_codes.extend(other.type_codes)
+        self.layer_ids.extend(self.layer_id(other.layers[k]) for k in other.layer_ids)
+        self.closed.extend(other.closed)
+        self.areas.extend(other.areas)
+        self.radii.extend(other.radii)
+        self.centers.extend(other.centers)
+        self.vertices.extend(other.vertices)
+        self.bulges.extend(other.bulges)
+        self.offsets.extend(base + offset for offset in other.offsets[1:])
+        self.unclosed_count += other.unclosed_count
+        return self
+
+    def update_polyline_geometry(self):
+        """用快照中的顶点和凸度批量计算多段线面积和形心"""
+        if not len(self):
+            return
+        areas, centroids = polygon_properties(self.vertices, self.offsets, self.bulges)
+        is_polyline = np.frombuffer(self.type_codes, dtype=np.int8) == TYPE_POLYLINE
+        area_view = np.frombuffer(self.areas, dtype=float)
+        center_view = np.frombuffer(self.centers, dtype=float).reshape(-1, 2)
+        area_view[is_polyline] = areas[is_polyline]
+        center_view[is_polyline] = centroids[is_polyline]
+
+    def label_points(self, precision=1.0):
+        """计算每个图形的标注锚点（WCS），多段线取不可达极点，圆和椭圆取圆心"""
+        anchors = np.frombuffer(self.centers, dtype=float).reshape(-1, 2).copy()
+        is_polyline = np.frombuffer(self.type_codes, dtype=np.int8) == TYPE_POLYLINE
+        if is_polyline.any():
+            indices = np.flatnonzero(is_polyline)
+            vertices, offsets, bulges = subset_buffers(self.vertices, self.offsets, indices, self.bulges)
+            anchors[indices], _ = polylabels(vertices, offsets, bulges, precision)
+        return anchors
+
+    def outlines(self, order=None):
+        """按 order 顺序返回全部图形的多边形轮廓 (vertices, offsets)，圆弧段已离散"""
+        indices = np.arange(len(self)) if order is None else order
+        vertices, offsets, bulges = subset_buffers(self.vertices, self.offsets, indices, self.bulges)
+        return densify_arcs(vertices, offsets, bulges)
+
+    def label_sizes(self):
+        """按图形大小计算建议字高：多段线为 √面积/20，圆为半径/5，椭圆为短半轴/5"""
+        areas = np.frombuffer(self.areas, dtype=float)
+        radii = np.frombuffer(self.radii, dtype=float)
+        return np.where(radii > 0, radii / 5, np.sqrt(areas) / 20)
+
+    def geometry_hashes(self, decimals=6):
+        """计算每个图形的几何哈希（类型、图层、顶点、凸度、圆心和半径），用于判断图形是否被修改"""
+        vertices = np.round(np.frombuffer(self.vertices, dtype=float), decimals)
+        bulges = np.round(np.frombuffer(self.bulges, dtype=float), decimals)
+        centers = np.round(np.frombuffer(self.centers, dtype=float), decimals)
+        radii = np.round(np.frombuffer(self.radii, dtype=float), decimals)
+        hashes = []
+        for i in range(len(self)):
+            start, stop = self.offsets[i], self.offsets[i + 1]
+            digest = hashlib.blake2b(digest_size=8)
+            digest.update(f"{self.type_codes[i]}|{self.layer_name(i)}|{self.closed[i]}|".encode("utf-8"))
+            digest.update(vertices[2 * start:2 * stop].tobytes())
+            digest.update(bulges[start:stop].tobytes())
+            digest.update(centers[2 * i:2 * i + 2].tobytes())
+            digest.update(radii[i:i + 1].tobytes())
+            hashes.append(digest.hexdigest())
+        return hashes
+
+    @classmethod
+    def from_objects(cls, objects, layer_names=None, min_area=1, detect_arcs=False,
+                     progress_callback=None, chunk_size=500):
+        """遍历选择集生成快照，每个属性只读取一次
+
+        layer_names 为 None 时不按图层过滤，图层名不区分大小写；面积不足 min_area 的多段线被跳过。
+        多段线面积和形心在本地批量计算，默认按直线段计算。COM 没有批量读取凸度的接口，
+        detect_arcs 为 True 时每条多段线多读取一次 Area 与直线面积比对，仅对含圆弧段的多段线逐点读取凸度。
+        每读取 chunk_size 个图形调用一次 progress_callback(已读取, 总数)，回调抛出异常即中止读取。
+        """
+        snapshot = cls()
+        allowed_layers = layer_set(layer_names)
+        total = getattr(objects, "Count", None)
+        if total is None and hasattr(objects, "__len__"):
+            total = len(objects)
+        done = 0
+        for obj in objects:
+            try:
+                snapshot._read_object(obj, allowed_layers, detect_arcs)
+            except Exception as e:
+                print(f"读取图形时出错: {str(e)}")
+            done += 1
+            if progress_callback and done % chunk_size == 0:
+                progress_callback(done, total)
+        if progress_callback:
+            progress_callback(done, total if total is not None else done)
+
+        return snapshot.finalize(min_area)
+
+    def finalize(self, min_area=1):
+        """批量计算多段线面积和形心，去掉面积不足 min_area 的多段线，返回结果快照"""
+        self.update_polyline_geometry()
+
+        # 闭合多段线面积不小于 min_area，未闭合的需大于 min_area
+        keep = [
+            i for i in range(len(self))
+            if self.type_codes[i] != TYPE_POLYLINE
+            or (self.areas[i] > min_area if not self.closed[i] else self.areas[i] >= min_area)
+        ]
+        if len(keep) != len(self):
+            return self.take(keep)
+        self.unclosed_count = sum(
+            1 for i in range(len(self))
+            if self.type_codes[i] == TYPE_POLYLINE and not self.closed[i]
+        )
+        return self
+
+    def _read_object(self, obj, allowed_layers, detect_arcs):
+        """读取单个图形并写入快照"""
+        type_code = OBJECT_TYPES.get(obj.ObjectName)
+        if type_code is None:
+            return False
+
+        layer_name = obj.Layer
+        if allowed_layers is not None and layer_key(layer_name) not in allowed_layers:
+            return False
+
+        if type_code == TYPE_POLYLINE:
+            closed = bool(obj.Closed)
+            coords = tuple(obj.Coordinates)
+            count = len(coords) // 2
+            if not count:
+                return False
+            coords = coords[:2 * count]
+            bulges = None
+            if detect_arcs and self._has_arcs(obj, coords):
+                bulges = [obj.GetBulge(k) for k in range(count)]
+            # 面积和形心稍后由 update_polyline_geometry 批量计算
+            self.append(obj.Handle, obj, type_code, layer_name, closed, 0.0, (0.0, 0.0), 0.0, coords, bulges)
+
+        elif type_code == TYPE_CIRCLE:
+            return self.append_circle(obj.Handle, obj, layer_name, obj.Center, obj.Radius)
+
+        else:
+            return self.append_ellipse(obj.Handle, obj, layer_name, obj.Center, obj.MajorAxis, obj.RadiusRatio)
+        return True
+
+    def append_circle(self, handle, obj, layer_name, center, radius):
+        """追加一个圆，面积为0时跳过"""
+        area = 3.14159 * radius * radius
+        if area <= 0:
+            return False
+        outline = ellipse_outline(center, (radius, 0.0))
+        self.append(handle, obj, TYPE_CIRCLE, layer_name, True, area, center, radius, outline)
+        return True
+
+    def append_ellipse(self, handle, obj, layer_name, center, major_axis, ratio):
+        """追加一个椭圆（按整椭圆计算面积），面积为0时跳过"""
+        major_radius = (major_axis[0] ** 2 + major_axis[1] ** 2) ** 0.5
+        minor_radius = major_radius * ratio
+        area = 3.14159 * major_radius * minor_radius
+        if area <= 0:
+            return False
+        outline = ellipse_outline(center, major_axis, ratio)
+        self.append(handle, obj, TYPE_ELLIPSE, layer_name, True, area, center,
+                    min(major_radius, minor_radius), outline)
+        return True
+
+    @staticmethod
+    def _has_arcs(obj, coords):
+        """比对CAD面积与直线多边形面积，判断多段线是否含圆弧段
+
+        直线面积在以包围盒中心为原点的坐标下计算；容差按包围盒大小和坐标量级确定，
+        测绘坐标（1e5~1e6）下的舍入误差不会被误判为圆弧。
+        """
+        xy = np.asarray(coords, dtype=float).reshape(-1, 2)
+        low, high = xy.min(axis=0), xy.max(axis=0)
+        local = xy - (low + high) / 2
+        x, y = local[:, 0], local[:, 1]
+        straight = abs(float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))) / 2
+        width, height = high - low
+        magnitude = float(np.abs(xy).max())
+        tolerance = 1e-9 * max(1.0, width * height) + 4 * len(xy) * np.finfo(float).eps * magnitude ** 2
+        return abs(abs(obj.Area) - straight) > tolerance
@@ -0,0 +1,104 @@
+"""
+填充批量生成模块
+
+功能说明:
+- 先收集全部填充边界，再按图层分组、按边界数量拆分为若干填充对象
+- 每个填充对象先设置一次样式属性，再追加边界，只计算（Evaluate）一次
+- 全部完成后只刷新一次视图，并记录每批的耗时
+- 脚本模式下按同样的分批写入AutoLISP脚本（emit），由CAD一次执行
+"""
+
+import math
+import time
+
+
+class HatchBuilder:
+    """批量填充生成器"""
+
+    DEFAULT_MAX_LOOPS = 200
+
+    def __init__(self, plant, pattern="CROSS", scale=1.0, angle=0.0, color=3,
+                 max_loops=DEFAULT_MAX_LOOPS):
+        self.plant = plant
+        self.doc = plant.doc
+        self.msp = plant.msp
+        self.pattern = pattern or "CROSS"
+        self.scale = scale
+        self.angle = angle
+        self.color = color
+        self.max_loops = max(1, int(max_loops or self.DEFAULT_MAX_LOOPS))
+        self.loops = {}      # 图层 -> 边界对象列表
+        self.hatches = []    # 已创建的填充对象
+        self.timings = []    # 每批的边界数量和耗时
+
+    def add_loop(self, obj, layer):
+        """登记一个填充边界"""
+        self.loops.setdefault(layer, []).append(obj)
+
+    @property
+    def loop_count(self):
+        return sum(len(objs) for objs in self.loops.values())
+
+    def batches(self):
+        """按图层分组并按最大边界数量拆分，返回 (图层, 边界列表)"""
+        for layer, objs in self.loops.items():
+            for start in range(0, len(objs), self.max_loops):
+                yield layer, objs[start:start + self.max_loops]
+
+    def build(self):
+        """生成全部填充，成功返回 True；计算失败时删除本次创建的填充并返回 False"""
+        try:
+            for layer, objs in self.batches():
+                start = time.perf_counter()
+                hatch = self.msp.AddHatch(1, self.pattern, True)
+                self.hatches.append(hatch)
+
+                # 先设置样式，追加边界时不再重复计算
+                hatch.PatternAngle = math.radians(self.angle)
+                hatch.PatternScale = self.scale
+                hatch.Color = self.color
+                hatch.Layer = layer
+
+                for obj in objs:
+                    try:
+                        hatch.AppendInnerLoop(self.plant.vtobj([obj]))
+                    except Exception as e:
+                        print(f"添加填充边界时出错: {str(e)}")
+
+                hatch.Evaluate()
+                self.timings.append({
+                    'layer': layer,
+                    'loops': len(objs),
+                    'seconds': time.perf_counter() - start
+                })
+        except Exception as e:
+            print(f"生成填充时出错: {str(e)}")
+            self.rollback()
+            return False
+        finally:
+            self.doc.Regen(1)
+        return True
+
+    def emit(self, emitter):
+        """脚本模式：把全部填充写入 ScriptEmitter 并一次提交，边界按句柄传入脚本"""
+        for layer, objs in self.batches():
+            emitter.add_hatch(layer, [obj.Handle for obj in objs], self.pattern, self.scale, self.angle,
+                              self.color)
+            self.timings.append({'layer': layer, 'loops': len(objs), 'seconds': 0.0})
+        return emitter.submit()
+
+    def rollback(self):
+        """删除本次创建的填充"""
+        for hatch in self.hatches:
+            try:
+                hatch.Delete()
+            except Exception:
+                pass
+        self.hatches = []
+
+    def report(self):
+        """生成每批耗时的提示文字"""
+        lines = []
+        for i, timing in enumerate(self.timings, 1):
+            lines.append(f"第{i}批 图层{timing['layer']}: {timing['loops']}个边界, {timing['seconds']:.2f}秒")
+        return "\n".join(lines)
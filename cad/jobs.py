@@ -0,0 +1,48 @@
+"""
+任务取消和进度模块
+
+功能说明:
+- JobCancelled: 任务被取消时抛出的异常
+- JobContext: 任务上下文，提供进度报告（report）和取消检查（check_cancelled）
+- 不依赖 pywin32 和工作线程，标注流程（PlantMark）只通过这两个接口响应取消和报告进度
+"""
+
+import threading
+import time
+
+
+class JobCancelled(Exception):
+    """任务被取消"""
+
+
+class JobContext:
+    """任务上下文：报告进度、检查取消"""
+
+    def __init__(self, worker, future, on_progress=None):
+        self.worker = worker
+        self.future = future
+        self.on_progress = on_progress
+        self.cancel_event = threading.Event()
+        self.started = time.perf_counter()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def check_cancelled(self):
+        """已请求取消时抛出 JobCancelled，在分块之间调用"""
+        if self.cancel_event.is_set():
+            raise JobCancelled("操作已取消")
+
+    def report(self, stage, done, total):
+        """报告进度，回调在界面线程中以 (阶段, 已完成, 总数, 耗时秒数) 调用"""
+        if not self.on_progress:
+            return
+        elapsed = time.perf_counter() - self.started
+        if self.worker is None:
+            self.on_progress(stage, done, total, elapsed)
+        else:
+            self.worker.post(self.on_progress, stage, done, total, elapsed)
@@ -1,17 +1,64 @@
 import math
 import time
-from datetime import datetime
+import numpy as np
 import os
+import tempfile
 from .cad_utils import CadUtils
+from .jobs import JobCancelled
+from .entity_snapshot import DXF_NAMES, EntitySnapshot
+from .annotation_batch import AnnotationBatch
+from .annotation_style import BLOCK_MARK_TYPE, LAYER_COLOR, AnnotationStyle, read_label_options
+from .hatch_builder import HatchBuilder
+from .script_emitter import DEFAULT_SCRIPT_NAME, ScriptEmitter, read_results
+from utils.reading_order import reading_order, sort_points
+from utils.geometry import as_points, polygon_centroids, subset_buffers
+from utils.label_layout import UNPLACED, layout_labels, text_width
+from utils.overlap import overlap_fractions, split_factor
+from utils.spatial_index import GridIndex
+from utils.ucs_transform import UcsCache
 
 class PlantMark(CadUtils):
     def __init__(self, app_name):
         super().__init__(app_name)
         self.ui = None
         self.ucs_matrix = None  # 存储UCS变换矩阵
+        self.ucs = None  # 当前UCS的仿射变换（UcsTransform），未获取时为 None
+        self.ucs_cache = UcsCache()  # 按 UCSORG/UCSXDIR/UCSYDIR 缓存的变换
+        self.snapshot = None  # 最近一次框选的图形快照
+        self.label_order = None  # 标注顺序（快照下标的排列）
+        self.label_handles = []  # 按标注顺序排列的图形句柄
+        self.label_outlines = None  # 按标注顺序排列的图形轮廓 (vertices, offsets)，WCS
+        self.annotation_chunk_size = AnnotationBatch.DEFAULT_CHUNK_SIZE  # 标注分块提交的大小
+        self.label_precision = 1.0  # 标注锚点的计算精度（图纸单位）
+        self.label_layout = False  # 标注避让：避开其他标注和图形边界，移动过的标注加引线（也可在界面上勾选）
+        self.unplaced_labels = []  # 最近一次标注中无法避让的标注序号
+        self.hatch_max_loops = HatchBuilder.DEFAULT_MAX_LOOPS  # 单个填充对象的最大边界数
+        self.scan_chunk_size = 2000  # 扫描模型空间时每块读取的图形数
+        self.annotation_registry = None  # 当前图纸的标注登记表，设置后再次标注只处理变化的图形
+        self.label_options = None  # 界面线程读取的标注选项（read_label_options），未设置时直接读取界面
+        self.label_blocks = set()  # 当前图纸中已确认定义的标注块名称
+        self.label_arcs = False  # 读取多段线圆弧段（每条多段线多一次COM调用），也可在界面上勾选
+        self.label_script = False  # 脚本模式：标注和填充渲染为一个AutoLISP脚本，一次提交执行
+        self.label_script_path = None  # 脚本文件路径，未设置时写到临时目录；内容为AutoLISP，提交时用 load 加载
+        self.progress_callback = None  # 当前运行的进度回调 (阶段, 已完成, 总数)
+        self.cancel_check = None  # 当前运行的取消检查，抛出异常即取消
+        self.stage_timings = []  # 最近一次运行各阶段的耗时
+        self._stage = None
+
+    def bind(self, application, document=None):
+        """绑定CAD文档，切换文档时清除上一张图纸的快照和UCS"""
+        super().bind(application, document)
+        self.ucs_matrix = None
+        self.ucs = None
+        self.ucs_cache = UcsCache()  # 每张图纸单独缓存
+        self.snapshot = None
+        self.label_order = None
+        self.label_handles = []
+        self.label_outlines = None
+        self.label_blocks = set()  # 当前图纸中已确认定义的标注块名称
 
     def get_ucs_matrix(self):
-        """获取当前UCS变换矩阵"""
+        """获取当前UCS变换矩阵，三个系统变量未变化时沿用缓存的变换"""
         try:
             # 获取当前UCS
             current_ucs = self.doc.GetVariable("UCSORG")  # UCS原点
@@ -19,51 +66,49 @@ class PlantMark(CadUtils):
             ucs_yaxis = self.doc.GetVariable("UCSYDIR")   # UCS Y轴方向
             
             # 构建变换矩阵
+            self.ucs = self.ucs_cache.get(current_ucs, ucs_xaxis, ucs_yaxis)
             self.ucs_matrix = {
-                'origin': [current_ucs[0], current_ucs[1]],
-                'xaxis': [ucs_xaxis[0], ucs_xaxis[1]],
-                'yaxis': [ucs_yaxis[0], ucs_yaxis[1]]
+                'origin': self.ucs.origin.tolist(),
+                'xaxis': self.ucs.xaxis.tolist(),
+                'yaxis': self.ucs.yaxis.tolist()
             }
             return True
         except Exception as e:
             print(f"获取UCS信息时出错: {str(e)}")
             self.ucs_matrix = None
+            self.ucs = None
             return False
 
+    def transform_points(self, points):
+        """将 N×2 坐标数组从WCS转换到UCS"""
+        if self.ucs is None:
+            return np.array(points, dtype=float)
+        return self.ucs.to_ucs(points)
+
+    def transform_points_to_wcs(self, points):
+        """将 N×2 坐标数组从UCS转换回WCS"""
+        if self.ucs is None:
+            return np.array(points, dtype=float)
+        return self.ucs.to_wcs(points)
+
     def transform_point(self, point):
         """将点从WCS转换到UCS"""
-        if not self.ucs_matrix:
+        if self.ucs is None:
             return point
         
         try:
-            # 将点相对于UCS原点进行平移
-            x = point[0] - self.ucs_matrix['origin'][0]
-            y = point[1] - self.ucs_matrix['origin'][1]
-            
-            # 计算在UCS中的坐标
-            ux = (x * self.ucs_matrix['xaxis'][0] + y * self.ucs_matrix['xaxis'][1])
-            uy = (x * self.ucs_matrix['yaxis'][0] + y * self.ucs_matrix['yaxis'][1])
-            
-            return [ux, uy]
+            return self.ucs.to_ucs(point).tolist()
         except Exception as e:
             print(f"坐标转换时出错: {str(e)}")
             return point
 
     def transform_point_to_wcs(self, point):
         """将点从UCS转换回WCS"""
-        if not self.ucs_matrix:
+        if self.ucs is None:
             return point
         
         try:
-            # 计算在WCS中的坐标
-            x = (point[0] * self.ucs_matrix['xaxis'][0] + 
-                 point[1] * self.ucs_matrix['yaxis'][0] + 
-                 self.ucs_matrix['origin'][0])
-            y = (point[0] * self.ucs_matrix['xaxis'][1] + 
-                 point[1] * self.ucs_matrix['yaxis'][1] + 
-                 self.ucs_matrix['origin'][1])
-            
-            return [x, y]
+            return self.ucs.to_wcs(point).tolist()
         except Exception as e:
             print(f"坐标转换回WCS时出错: {str(e)}")
             return point
@@ -80,31 +125,21 @@ class PlantMark(CadUtils):
             print(f"应用标注时出错: {str(e)}")
             return [], []
 
-    def draw_leader(self, layer_name):
-        """绘制引线和标注的主方法"""
+    def draw_leader(self, layer_name, progress_callback=None, cancel_check=None):
+        """绘制引线和标注的主方法
+
+        按 选择 → 读取 → 计算 → 排序 → 标注 分阶段执行，每个阶段通过
+        progress_callback(阶段, 已完成, 总数) 报告进度；cancel_check 在分块之间调用，
+        抛出异常即取消，已绘制的标注随之回滚，取消异常继续向上抛出。
+        """
+        self._begin_pipeline(progress_callback, cancel_check)
+        object_select = None
         try:
             # 获取UCS信息
             self.get_ucs_matrix()
             
-            # 获取当前选择的标注图层名称
-            annotation_layer_name = None
-            if hasattr(self, 'ui') and hasattr(self.ui, 'annotation_layer_var'):
-                annotation_layer_name = self.ui.annotation_layer_var.get()
-            
-            # 创建或获取标注图层
-            try:
-                new_layer = self.doc.Layers.Add(annotation_layer_name)
-                new_layer.Color = 3  # 设置图层颜色为绿色
-            except:
-                # 如果图层已存在，获取该图层
-                new_layer = self.doc.Layers.Item(annotation_layer_name)
-            
-            count = 0
-            polyline_averge_xy = []
-            area_set = []
-            direct_fontsize = []
-            unclose_line_number = 0
-            lenth_set = []
+            # 创建或获取标注图层，本次运行的标注样式只构造一次
+            style = self.annotation_style(create_layer=True)
             
             # 清空选择集
             while self.doc.SelectionSets.Count > 0:
@@ -113,225 +148,568 @@ class PlantMark(CadUtils):
             # 创建选择集
             object_select = self.doc.SelectionSets.Add("cad_object_select")
 
-            # 提示用户选择对象
+            # 提示用户选择对象，由CAD按图形类型和图层过滤，只返回候选图形
+            layer_filter = None if "全部图层" in layer_name else layer_name
+            self._report("选择", 0, 1)
             self.doc.Utility.Prompt("请选择要标注的图形...")
-            object_select.SelectOnScreen()
-            
-            # 处理选择的对象
-            filtered_objects = []
-            self.ui.original_objects = []  # 新增：保存原始对象和它们的图层
-            for obj in object_select:
-                # 如果指定了特定图层且对象不在该图层上，则跳过
-                if layer_name != ["全部图层"] and obj.Layer != layer_name[0]:
-                    continue
-                filtered_objects.append(obj)
-                self.ui.original_objects.append({
-                    'object': obj,
-                    'layer': obj.Layer,
-                    'type': obj.ObjectName
-                })
-            
-            # 获取地库线范围（如果存在）
-            basement_bounds = None
-            if hasattr(self, 'ui') and hasattr(self.ui, 'basement_bounds'):
-                basement_bounds = self.ui.basement_bounds
-
-            # 在绘制序号时使用选定的标注图层
-            current_layer = self.doc.ActiveLayer
-            self.doc.ActiveLayer = self.doc.Layers.Item(annotation_layer_name)
-            
-            # 处理过滤后的对象
-            unclosed_count = 0
-            for obj in filtered_objects:
-                area = 0
-                center_point = None
-                
-                try:
-                    # 处理多段线
-                    if obj.ObjectName == "AcDbPolyline":
-                        if not obj.Closed:
-                            # 检查是否有面积
-                            if obj.Area > 1:
-                                unclosed_count += 1
-                                area = obj.Area
-                                center = self.calculate_center(obj.Coordinates)
-                                # 转换中心点坐标到UCS
-                                center_point = self.transform_point([center[0], center[1]])
-                                polyline_averge_xy.append(center_point)
-                                direct_fontsize.append(math.sqrt(area) / 20)
-                            else:
-                                continue
-                        else:
-                            if obj.Area < 1:
-                                continue
-                            area = obj.Area
-                            center = self.calculate_center(obj.Coordinates)
-                            # 转换中心点坐标到UCS
-                            center_point = self.transform_point([center[0], center[1]])
-                            polyline_averge_xy.append(center_point)
-                            direct_fontsize.append(math.sqrt(area) / 20)
-                    
-                    # 处理圆
-                    elif obj.ObjectName == "AcDbCircle":
-                        area = 3.14159 * obj.Radius * obj.Radius
-                        center = obj.Center
-                        # 转换中心点坐标到UCS
-                        center_point = self.transform_point([center[0], center[1]])
-                        polyline_averge_xy.append(center_point)
-                        # 计算字体大小
-                        direct_fontsize.append(obj.Radius / 5)
-                    
-                    # 处理椭圆
-                    elif obj.ObjectName == "AcDbEllipse":
-                        major_axis = obj.MajorAxis
-                        major_radius = math.sqrt(major_axis[0]**2 + major_axis[1]**2)
-                        minor_radius = major_radius * obj.RadiusRatio
-                        area = 3.14159 * major_radius * minor_radius
-                        
-                        center = obj.Center
-                        # 转换中心点坐标到UCS
-                        center_point = self.transform_point([center[0], center[1]])
-                        polyline_averge_xy.append(center_point)
-                        # 计算字体大小
-                        direct_fontsize.append(min(major_radius, minor_radius) / 5)
-                    
-                    # 如果找到有效图形，添加到面积集合
-                    if area > 0 and center_point is not None:
-                        area_set.append([obj.ObjectID, area])
-                        count += 1
-
-                except Exception as e:
-                    print(f"处理图形时出错: {str(e)}")
-                    continue
+            self.select_on_screen(object_select, DXF_NAMES, layer_filter)
+            self._report("选择", 1, 1)
+            
+            # 一次遍历选择集生成快照，之后不再逐个读取COM属性
+            snapshot = EntitySnapshot.from_objects(
+                object_select, layer_filter, detect_arcs=self.use_arcs(),
+                progress_callback=lambda done, total: self._report("读取", done, total))
+            self.snapshot = snapshot
+            
+            # 保存原始对象和它们的图层
+            self.ui.original_objects = [
+                {
+                    'object': snapshot.objects[i],
+                    'handle': snapshot.handles[i],
+                    'layer': snapshot.layer_name(i),
+                    'type': snapshot.type_name(i),
+                    'closed': bool(snapshot.closed[i])
+                }
+                for i in range(len(snapshot))
+            ]
+
+            # 从快照表计算面积、中心点和标注锚点（UCS）
+            count = len(snapshot)
+            self._report("计算", 0, count)
+            areas, centers, anchor_points = self._label_data(snapshot)
+            hashes = snapshot.geometry_hashes()
+            sizes = snapshot.label_sizes()
+            self._report("计算", count, count)
             
             # 如果有未闭合的多段线，显示提示
+            unclosed_count = snapshot.unclosed_count
             if unclosed_count > 0:
                 self.doc.Utility.Prompt(f"\n注意：发现{unclosed_count}条未闭合的多段线，但仍计入面积计算。")
             
-            # 进行标注
-            if count > 0:
-                # 对中心点进行排序
-                sorted_points = self.sort_points(polyline_averge_xy)
-                
-                # 创建映射关系
-                point_to_index = {}
-                for i, point in enumerate(polyline_averge_xy):
-                    point_to_index[tuple(point)] = i
-                
-                # 获取排序后的索引
-                sorted_indices = [point_to_index[tuple(p)] for p in sorted_points]
-                
-                # 获取标注类型
-                mark_type = "标记"  # 默认值
-                if hasattr(self, 'ui') and hasattr(self.ui, 'mark_type_var'):
-                    mark_type = self.ui.mark_type_var.get()
-                
-                # 按标注顺序重新排列面积和中心点
-                sorted_areas = [area_set[i][1] for i in sorted_indices]
-                sorted_centers = [polyline_averge_xy[i] for i in sorted_indices]
-                
-                # 根据不同标注类型进行标注
-                for i, (center, area) in enumerate(zip(sorted_centers, sorted_areas), 1):
-                    if mark_type == "标记":
-                        # 只绘制圆圈和序号
-                        self.draw_circle_number(center, i)
-                    elif mark_type == "数字":
-                        # 只标注面积数值
-                        self.draw_area_text(center, area)
-                    elif mark_type == "综合":
-                        # 先绘制面积数值（在圆的左边），再绘制圆圈序号
-                        self.draw_area_text(center, area, is_combined=True)
-                        self.draw_circle_number(center, i)
-                
-                object_select.Delete()
-                return sorted_areas, sorted_centers
-                               
-            object_select.Delete()
-            return [], []
-            
+            if count == 0:
+                return [], []
+            
+            # 按标注锚点的阅读顺序得到排序下标，面积、中心点、锚点和句柄按同一下标重排
+            self._report("排序", 0, count)
+            order = reading_order(anchor_points)
+            self.label_order = order
+            self.label_handles = [snapshot.handles[i] for i in order]
+            self.label_outlines = snapshot.outlines(order)
+            
+            # 按标注顺序重新排列面积和中心点
+            sorted_areas = areas[order].tolist()
+            sorted_centers = centers[order].tolist()
+            self._report("排序", count, count)
+            
+            # 在标注锚点处进行标注，分块提交，每块之间检查取消
+            self._draw_labels(style, anchor_points[order].tolist(), sorted_areas,
+                              lambda done, total: self._report("标注", done, total),
+                              handles=self.label_handles, hashes=[hashes[i] for i in order],
+                              sizes=sizes[order])
+            return sorted_areas, sorted_centers
+            
+        except JobCancelled:
+            self.doc.Utility.Prompt("\n标注已取消")
+            raise
         except Exception as e:
             print(f"绘制过程出错: {str(e)}")
             return [], []
+        finally:
+            if object_select is not None:
+                try:
+                    object_select.Delete()
+                except Exception:
+                    pass
+            self._end_pipeline()
 
-    def calculate_center(self, coords):
-        """计算多段线的中心点"""
-        x_coords = []
-        y_coords = []
-        for i in range(0, len(coords), 2):
-            x_coords.append(coords[i])
-            y_coords.append(coords[i + 1])
-        return [sum(x_coords) / len(x_coords), sum(y_coords) / len(y_coords)]
+    def _begin_pipeline(self, progress_callback=None, cancel_check=None):
+        """开始分阶段执行，记录进度回调、取消检查和各阶段耗时"""
+        self.progress_callback = progress_callback
+        self.cancel_check = cancel_check
+        self.stage_timings = []
+        self._stage = None
 
-    def get_ucs_rotation(self):
-        """计算UCS相对于WCS的旋转角度"""
-        if not self.ucs_matrix:
-            return 0
+    def _end_pipeline(self):
+        self._close_stage()
+        self.progress_callback = None
+        self.cancel_check = None
+
+    def _close_stage(self):
+        if self._stage is not None:
+            name, started = self._stage
+            self.stage_timings.append({'stage': name, 'seconds': time.perf_counter() - started})
+            self._stage = None
+
+    def _report(self, stage, done, total):
+        """报告阶段进度，并在分块之间检查是否已取消"""
+        if self._stage is None or self._stage[0] != stage:
+            self._close_stage()
+            self._stage = (stage, time.perf_counter())
+        if self.cancel_check:
+            self.cancel_check()
+        if self.progress_callback:
+            self.progress_callback(stage, done, total)
+
+    def _label_data(self, snapshot):
+        """从快照表取出面积，并计算UCS下的中心点和标注锚点，返回三个数组"""
+        count = len(snapshot)
+        areas = np.frombuffer(snapshot.areas, dtype=float).copy()
+        if not count:
+            return areas, np.zeros((0, 2)), np.zeros((0, 2))
+        anchors = snapshot.label_points(self.label_precision)
+        centers = np.frombuffer(snapshot.centers, dtype=float).reshape(-1, 2)
+        return areas, self.transform_points(centers), self.transform_points(np.asarray(anchors, dtype=float))
+
+    def _get_mark_type(self):
+        """获取标注类型（标记/数字/综合）"""
+        return self.get_label_options()["mark_type"]
+
+    def get_label_options(self):
+        """本次运行的标注选项：优先使用界面线程传入的 label_options"""
+        if self.label_options is not None:
+            return self.label_options
+        return read_label_options(getattr(self, 'ui', None))
+
+    def annotation_style(self, layer_name=None, create_layer=False):
+        """按当前标注选项和UCS构造本次运行的标注样式，并取得标注图层对象
+
+        create_layer 为 True 时图层不存在则新建（绿色）。
+        """
+        options = self.get_label_options()
+        layer_name = layer_name or options["layer_name"]
+        layer = None
+        if create_layer:
+            try:
+                layer = self.doc.Layers.Add(layer_name)
+                layer.Color = LAYER_COLOR  # 设置图层颜色为绿色
+            except Exception:
+                layer = None
+        if layer is None:
+            try:
+                layer = self.doc.Layers.Item(layer_name)
+            except Exception as e:
+                print(f"获取标注图层时出错: {str(e)}")
+        ucs = None
+        if self.ucs_matrix:
+            ucs = [self.ucs_matrix['origin'], self.ucs_matrix['xaxis'], self.ucs_matrix['yaxis']]
+        options = dict(options, layer_name=layer_name)
+        layout = self.label_layout or bool(options.get("layout"))
+        return AnnotationStyle.from_options(options, layer, self.get_ucs_rotation(), ucs, layout)
+
+    def _draw_labels(self, style, anchors, areas, progress_callback=None, handles=None, hashes=None, sizes=None):
+        """在同一批次中按标注类型绘制标注，序号为位置+1
+
+        设置了标注登记表且提供了源图形句柄和几何哈希时，只处理与上次标注相比有变化的图形。
+        样式启用自适应字高且提供了各图形的建议字高 sizes 时，每个标注使用所在档位的样式。
+        """
+        styles = None
+        if style.adaptive and sizes is not None and len(sizes) == len(anchors):
+            styles = style.level_styles(sizes)
+        anchors, leaders = self._layout_labels(style, anchors, areas, styles)
+        if self.annotation_registry is not None and handles is not None and hashes is not None:
+            return self._draw_labels_incremental(style, anchors, areas, handles, hashes, progress_callback,
+                                                 leaders, styles)
         
+        with self.annotation_batch(progress_callback=progress_callback, style=style) as batch:
+            self._queue_labels(batch, range(len(anchors)), anchors, areas, leaders=leaders, styles=styles)
+        return batch.created
+
+    def _label_boxes(self, style, areas, styles=None):
+        """估算每个标注相对放置点的标注框 (xmin, ymin, xmax, ymax)，UCS，N×4 数组
+
+        styles 为各标注的样式（自适应字高），同一档位的标注一起计算。
+        """
+        if styles is None:
+            return self._style_boxes(style, areas, np.arange(len(areas)))
+        boxes = np.zeros((len(areas), 4))
+        groups = {}
+        for i, label_style in enumerate(styles):
+            groups.setdefault(id(label_style), (label_style, []))[1].append(i)
+        for label_style, indices in groups.values():
+            indices = np.asarray(indices)
+            boxes[indices] = self._style_boxes(label_style, [areas[i] for i in indices.tolist()], indices)
+        return boxes
+
+    def _style_boxes(self, style, areas, indices):
+        """按一个样式估算标注框，indices 为标注的位置（序号为位置+1）"""
+        count = len(areas)
+        boxes = np.zeros((count, 4))
+        if style.has_area:
+            widths = np.array([text_width(style.format_area(area), style.text_height) for area in areas])
+            # 综合模式的面积文字在WCS中沿X轴偏移（属性块随块参照旋转），换算为UCS下的偏移
+            dx = dy = 0.0
+            if style.combined:
+                dx, dy = style.combined_offset, 0.0
+                if style.mark_type == BLOCK_MARK_TYPE:
+                    angle = style.text_rotation
+                    dx, dy = style.combined_offset * math.cos(angle), style.combined_offset * math.sin(angle)
+                if self.ucs is not None:
+                    dx, dy = dx * self.ucs.xaxis[0] + dy * self.ucs.xaxis[1], dx * self.ucs.yaxis[0] + dy * self.ucs.yaxis[1]
+            half_height = style.text_height / 2
+            boxes[:] = np.column_stack((dx - widths / 2, np.full(count, dy - half_height),
+                                        dx + widths / 2, np.full(count, dy + half_height)))
+        if style.has_number:
+            widths = np.array([text_width(str(i + 1), style.number_height) for i in np.asarray(indices).tolist()])
+            half_width = np.maximum(style.radius, widths / 2)
+            half_height = max(style.radius, style.number_height / 2)
+            circle = np.column_stack((-half_width, np.full(count, -half_height),
+                                      half_width, np.full(count, half_height)))
+            if style.combined:
+                circle[:, :2] = np.minimum(circle[:, :2], boxes[:, :2])
+                circle[:, 2:] = np.maximum(circle[:, 2:], boxes[:, 2:])
+            boxes = circle
+        return boxes
+
+    def _layout_labels(self, style, anchors, areas, styles=None):
+        """标注避让：按估算的标注框贪心放置，返回 (放置点列表, 引线列表)
+
+        未启用避让时原样返回锚点，引线列表为 None。移动过的标注从锚点引线到标注框边缘，
+        不需要引线的为 None。无法避让的标注留在原位置，序号记录在 unplaced_labels 中。
+        """
+        self.unplaced_labels = []
+        if not style.layout or not len(anchors):
+            return anchors, None
+        
+        anchor_array = np.asarray(anchors, dtype=float)
+        boxes = self._label_boxes(style, areas, styles)
+        vertices = offsets = None
+        if self.label_outlines is not None and len(self.label_outlines[1]) == len(anchor_array) + 1:
+            vertices = self.transform_points(as_points(self.label_outlines[0]))
+            offsets = self.label_outlines[1]
+        positions, results = layout_labels(anchor_array, boxes, vertices, offsets, gap=style.text_height * 0.2)
+        
+        # 引线终点：从放置点沿指向锚点的方向与标注框边缘的交点
+        delta = anchor_array - positions
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tx = np.where(delta[:, 0] > 0, boxes[:, 2] / delta[:, 0],
+                          np.where(delta[:, 0] < 0, boxes[:, 0] / delta[:, 0], np.inf))
+            ty = np.where(delta[:, 1] > 0, boxes[:, 3] / delta[:, 1],
+                          np.where(delta[:, 1] < 0, boxes[:, 1] / delta[:, 1], np.inf))
+        scale = np.minimum(tx, ty)
+        ends = positions + delta * np.where(scale < 1, scale, 0)[:, None]
+        leaders = [None] * len(positions)
+        for i in np.flatnonzero(scale < 1).tolist():
+            leaders[i] = (anchor_array[i].tolist(), ends[i].tolist())
+        
+        moved = sum(1 for leader in leaders if leader is not None)
+        self.unplaced_labels = (np.flatnonzero(results == UNPLACED) + 1).tolist()
+        if self.unplaced_labels:
+            shown = "、".join(str(number) for number in self.unplaced_labels[:20])
+            more = "等" if len(self.unplaced_labels) > 20 else ""
+            self.doc.Utility.Prompt(
+                f"\n标注避让：移动{moved}个，{len(self.unplaced_labels)}个无法避开其他标注，"
+                f"已放在原位置（序号{shown}{more}）")
+        elif moved:
+            self.doc.Utility.Prompt(f"\n标注避让：移动{moved}个")
+        return positions.tolist(), leaders
+
+    def _queue_labels(self, batch, indices, anchors, areas, handles=None, leaders=None, styles=None):
+        """把指定位置的标注按标注类型登记到批次中
+
+        leaders 为各标注的引线（可为 None），styles 为各标注的样式（自适应字高，可为 None）。
+        """
+        mark_type = batch.style.mark_type
+        for i in indices:
+            center = anchors[i]
+            area = areas[i]
+            key = handles[i] if handles is not None else None
+            style = styles[i] if styles is not None else None
+            if leaders is not None and leaders[i] is not None:
+                batch.add_leader(leaders[i][0], leaders[i][1], key=key)
+            if mark_type == "标记":
+                # 只绘制圆圈和序号
+                batch.add_circle_number(center, i + 1, key=key, style=style)
+            elif mark_type == "数字":
+                # 只标注面积数值
+                batch.add_area_text(center, area, key=key, style=style)
+            elif mark_type == "综合":
+                # 先绘制面积数值（在圆的左边），再绘制圆圈序号
+                batch.add_area_text(center, area, is_combined=True, key=key, style=style)
+                batch.add_circle_number(center, i + 1, key=key, style=style)
+            elif mark_type == BLOCK_MARK_TYPE:
+                # 圆圈、序号和面积在同一个属性块中
+                batch.add_label_block(center, i + 1, area, key=key, style=style)
+
+    def _draw_labels_incremental(self, style, anchors, areas, handles, hashes, progress_callback=None, leaders=None,
+                                 styles=None):
+        """按标注登记表增量标注：跳过未变化的图形，只修改序号、重画变化的图形、删除已删除图形的标注
+
+        删除旧标注和修改序号都登记在批次中，全部新标注创建成功后才执行，登记表也在提交后才更新；
+        中途取消时图纸和登记表都保持原样。
+        """
+        registry = self.annotation_registry
+        self._merge_script_results(registry)
+        plan = registry.plan(handles, hashes, style.registry_key())
+        draw = plan["draw"]
+        
+        with self.annotation_batch(progress_callback=progress_callback, style=style) as batch:
+            # 几何或样式变化的图形删除旧标注
+            for entry in plan["remove"]:
+                batch.delete_handles(entry["labels"].values())
+            
+            # 源图形已被删除的，删除其标注并移出登记表
+            stale = [handle for handle in registry.stale_handles(handles) if not self._handle_exists(handle)]
+            for handle in stale:
+                batch.delete_handles(registry.get(handle)["labels"].values())
+            
+            # 只有序号变化的修改序号文字，序号文字已不存在的重画
+            renumbered = []
+            for i, entry in plan["renumber"]:
+                number_handle = entry["labels"].get("number")
+                if number_handle is not None:
+                    if not self._handle_exists(number_handle):
+                        batch.delete_handles(entry["labels"].values())
+                        draw.append(i)
+                        continue
+                    batch.renumber(number_handle, i + 1)
+                renumbered.append((i, entry))
+            
+            self._queue_labels(batch, sorted(draw), anchors, areas, handles, leaders, styles)
+            changed = len(batch)
+        
+        # 批次提交成功后再更新登记表
+        for handle in stale:
+            registry.discard(handle)
+        for i, entry in renumbered:
+            entry["number"] = i + 1
+        for i in draw:
+            labels = batch.created_by_key.get(handles[i], {})
+            registry.record(handles[i], hashes[i], i + 1, {role: entity.Handle for role, entity in labels.items()})
+        registry.style = style.registry_key()
+        if isinstance(batch, ScriptEmitter) and changed:
+            registry.script_results = batch.results_path
+        
+        removed = len(stale)
+        renumbered = len(renumbered)
+        self.doc.Utility.Prompt(
+            f"\n增量标注：新画{len(draw)}个，修改序号{renumbered}个，跳过{plan['skip']}个，删除{removed}个")
+        return batch.created
+
+    def _merge_script_results(self, registry):
+        """读回上次脚本写出的标注句柄；脚本没有执行时移除缺少标注句柄的登记项，本次重画"""
+        if not registry.script_results:
+            return
+        labels = read_results(registry.script_results)
+        if labels is not None:
+            registry.merge_labels(labels)
+        for handle in registry.unlabelled_handles():
+            registry.discard(handle)
+        registry.script_results = None
+
+    def _handle_exists(self, handle):
+        """判断句柄对应的图形是否仍在图纸中"""
+        try:
+            return self.doc.HandleToObject(handle) is not None
+        except Exception:
+            return False
+
+    def iter_model_space_chunks(self, layer_name, chunk_size=None):
+        """分块遍历模型空间中符合类型和图层条件的图形，每次产出 (图形列表, 总数)"""
+        chunk_size = chunk_size or self.scan_chunk_size
+        layer_filter = None if "全部图层" in layer_name else layer_name
+        yield from self.backend.iter_objects(layer_filter, chunk_size)
+
+    def scan_model_space(self, layer_name, chunk_size=None, progress_callback=None, cancel_check=None):
+        """扫描整个模型空间，无需框选即可计算面积并标注全部符合条件的图形
+
+        每块图形读入快照后只保留面积、中心点、锚点、句柄和轮廓等数值，随即释放COM对象；
+        全部扫描完成后按阅读顺序统一编号标注。progress_callback(阶段, 已完成, 总数)
+        用于报告进度，阶段为 "扫描"、"排序" 或 "标注"；cancel_check 与 draw_leader 相同。
+        返回 (面积列表, 中心点列表)。
+        """
+        self._begin_pipeline(progress_callback, cancel_check)
+        chunks = None
         try:
-            # 计算UCS X轴与WCS X轴的夹角
-            x_axis = self.ucs_matrix['xaxis']
-            angle = math.atan2(x_axis[1], x_axis[0])  # 返回弧度
-            return angle
+            self.get_ucs_matrix()
+            style = self.annotation_style(create_layer=True)
+            
+            layer_filter = None if "全部图层" in layer_name else layer_name
+            areas = []
+            centers = []
+            anchors = []
+            handles = []
+            hashes = []
+            sizes = []
+            outline_vertices = []
+            outline_counts = []
+            unclosed_count = 0
+            
+            self.backend.detect_arcs = self.use_arcs()
+            chunks = self.backend.iter_snapshots(layer_filter, chunk_size or self.scan_chunk_size)
+            for snapshot, done, total in chunks:
+                chunk_areas, chunk_centers, chunk_anchors = self._label_data(snapshot)
+                areas.append(chunk_areas)
+                centers.append(chunk_centers)
+                anchors.append(chunk_anchors)
+                handles.extend(snapshot.handles)
+                hashes.extend(snapshot.geometry_hashes())
+                sizes.append(snapshot.label_sizes())
+                vertices, offsets = snapshot.outlines()
+                outline_vertices.append(np.asarray(vertices, dtype=float))
+                outline_counts.append(np.diff(offsets))
+                unclosed_count += snapshot.unclosed_count
+                
+                self.doc.Utility.Prompt(f"\n已扫描 {done}/{total}")
+                self._report("扫描", done, total)
+            
+            self.snapshot = None
+            if hasattr(self, 'ui') and self.ui is not None:
+                self.ui.original_objects = []  # 扫描模式不保留COM对象，填充按句柄查找
+            if not handles:
+                return [], []
+            if unclosed_count > 0:
+                self.doc.Utility.Prompt(f"\n注意：发现{unclosed_count}条未闭合的多段线，但仍计入面积计算。")
+            
+            areas = np.concatenate(areas)
+            centers = np.concatenate(centers)
+            anchors = np.concatenate(anchors)
+            counts = np.concatenate(outline_counts)
+            
+            self._report("排序", 0, len(handles))
+            order = reading_order(anchors)
+            self.label_order = order
+            self.label_handles = [handles[i] for i in order]
+            offsets = np.concatenate(([0], np.cumsum(counts)))
+            vertices, sorted_offsets, _ = subset_buffers(np.concatenate(outline_vertices), offsets, order)
+            self.label_outlines = (vertices, sorted_offsets)
+            
+            sorted_areas = areas[order].tolist()
+            self._report("排序", len(handles), len(handles))
+            self._draw_labels(style, anchors[order].tolist(), sorted_areas,
+                              lambda done, total: self._report("标注", done, total),
+                              handles=self.label_handles, hashes=[hashes[i] for i in order],
+                              sizes=np.concatenate(sizes)[order])
+            return sorted_areas, centers[order].tolist()
+        
+        except JobCancelled:
+            self.doc.Utility.Prompt("\n扫描标注已取消")
+            raise
+        except Exception as e:
+            print(f"扫描模型空间时出错: {str(e)}")
+            return [], []
+        finally:
+            if chunks is not None:
+                chunks.close()  # 提前结束时删除扫描用的选择集
+            self._end_pipeline()
+
+    def scan_applicate(self, layer_name, progress_callback=None):
+        """扫描模型空间并标注（与 applicate 对应的非交互入口）"""
+        try:
+            areas, center_points = self.scan_model_space(layer_name, progress_callback=progress_callback)
+            if hasattr(self, 'ui') and self.ui is not None:
+                self.ui.update_area_list(areas)
+            return areas, center_points
         except Exception as e:
-            print(f"计算UCS旋转角度时出错: {str(e)}")
+            print(f"扫描标注时出错: {str(e)}")
+            return [], []
+
+    def calculate_center(self, coords):
+        """计算多段线的中心点（面积加权形心）"""
+        return polygon_centroids(coords, [0, len(coords) // 2])[0].tolist()
+
+    def get_ucs_rotation(self):
+        """UCS相对于WCS的旋转角度（弧度），在获取UCS时已算好"""
+        if self.ucs is None:
             return 0
+        return self.ucs.rotation
+
+    def label_outline_data(self):
+        """按标注顺序返回图形轮廓的可保存形式 {"vertices": [...], "offsets": [...]}"""
+        if self.label_outlines is None:
+            return {}
+        vertices, offsets = self.label_outlines
+        return {"vertices": np.asarray(vertices).tolist(), "offsets": np.asarray(offsets).tolist()}
+
+    def get_annotation_layer_name(self):
+        """获取当前选择的标注图层名称"""
+        return self.get_label_options()["layer_name"]
+
+    def annotation_batch(self, layer_name=None, chunk_size=None, progress_callback=None, style=None):
+        """创建标注批处理，提交时统一设置图层并只刷新一次
 
-    def draw_circle_number(self, point, number):
+        style 为本次运行的标注样式，未提供时在提交时按 layer_name 构造一次。
+        脚本模式下返回接口相同的 ScriptEmitter，提交时写出并加载一个脚本。
+        """
+        if self.use_script():
+            return self.script_emitter(layer_name, progress_callback, style)
+        return AnnotationBatch(
+            self,
+            layer_name or (style.layer_name if style is not None else self.get_annotation_layer_name()),
+            chunk_size or self.annotation_chunk_size,
+            progress_callback,
+            style
+        )
+
+    def use_arcs(self):
+        """是否读取多段线的圆弧段（label_arcs 或界面上的圆弧选项）"""
+        return self.label_arcs or bool(self.get_label_options().get("arcs"))
+
+    def use_script(self):
+        """是否使用脚本模式（label_script 或界面上的脚本选项）"""
+        return self.label_script or bool(self.get_label_options().get("script"))
+
+    def script_emitter(self, layer_name=None, progress_callback=None, style=None, kind=""):
+        """创建AutoLISP脚本输出器，kind 不为空时（如填充）脚本文件名加后缀，避免覆盖尚未执行的标注脚本"""
+        path = self.label_script_path
+        if kind:
+            root, ext = os.path.splitext(path or os.path.join(tempfile.gettempdir(), DEFAULT_SCRIPT_NAME))
+            path = f"{root}_{kind}{ext}"
+        return ScriptEmitter(
+            self,
+            layer_name or (style.layer_name if style is not None else self.get_annotation_layer_name()),
+            style,
+            path,
+            progress_callback
+        )
+
+    def draw_circle_number(self, point, number, style=None):
         """绘制带序号的圆圈"""
         try:
-            # 获取字高
-            text_height = 3.0
-            if hasattr(self, 'ui'):
-                try:
-                    text_height = float(self.ui.text_height_var.get())
-                    if self.ui.unit_var.get() == "米":
-                        text_height = text_height
-                except ValueError:
-                    text_height = 3.0
-            
-            # 确保字高不小于最小值
-            MIN_TEXT_HEIGHT = 2.5
-            if text_height < MIN_TEXT_HEIGHT:
-                text_height = MIN_TEXT_HEIGHT
-            
-            # 将UCS坐标转换回WCS用于绘制
-            wcs_point = self.transform_point_to_wcs(point)
-            center = self.vtpnt(wcs_point[0], wcs_point[1])
-            radius = max(text_height * 0.6, 1.5)
-            
-            # 获取UCS旋转角度（弧度）
-            rotation_angle = self.get_ucs_rotation()
-            
-            # 获取当前选择的标注图层名称
-            annotation_layer_name = None
-            if hasattr(self, 'ui') and hasattr(self.ui, 'annotation_layer_var'):
-                annotation_layer_name = self.ui.annotation_layer_var.get()
-            else:
-                annotation_layer_name = "绿化面积标注"  # 默认图层名称
+            style = style or self.annotation_style()
             
             # 设置当前图层
             current_layer = self.doc.ActiveLayer
-            self.doc.ActiveLayer = self.doc.Layers.Item(annotation_layer_name)
+            self.doc.ActiveLayer = style.layer
             
             try:
-                # 创建圆
-                circle = self.msp.AddCircle(center, radius)
-                circle.Color = 1
-                
-                # 创建文字并根据UCS旋转角度调整
-                text = self.msp.AddText(str(number), center, text_height)
-                text.Color = 1
-                text.Alignment = 4  # 中心对齐
-                text.TextAlignmentPoint = center
-                text.Rotation = -rotation_angle * 180 / math.pi
+                entities = self._add_circle_number(point, number, style)
                 
                 # 刷新显示
                 self.doc.Regen(1)
                 
-                return True
+                return bool(entities)
             finally:
                 self.doc.ActiveLayer = current_layer
                 
+        except Exception as e:
+            print(f"绘制序号圆圈时出错: {str(e)}")
+            return False
+
+    def _add_circle_number(self, point, number, style=None):
+        """在当前图层创建圆圈和序号，不切换图层也不刷新，返回创建的图形
+
+        style 为本次运行的标注样式，绘制时不读取界面也不查找图层。
+        """
+        try:
+            style = style or self.annotation_style()
+            
+            # 将UCS坐标转换回WCS用于绘制
+            wcs_point = self.transform_point_to_wcs(point)
+            center = self.vtpnt(wcs_point[0], wcs_point[1])
+            
+            # 创建圆
+            circle = self.msp.AddCircle(center, style.radius)
+            circle.Color = style.circle_color
+            
+            # 创建文字并根据UCS旋转角度调整
+            text = self.msp.AddText(str(number), center, style.number_height)
+            text.Color = style.text_color
+            text.Alignment = 4  # 中心对齐
+            text.TextAlignmentPoint = center
+            text.Rotation = style.text_rotation
+            
+            return [circle, text]
+                
         except Exception as e:
             print(f"绘制序号圆圈时出错: {str(e)}")
             try:
@@ -341,79 +719,35 @@ class PlantMark(CadUtils):
                     text.Delete()
             except:
                 pass
-            return False
+            return []
 
     def sort_points(self, points):
         """按从上到下，从左到右排序点"""
-        if not points:
-            return []
-            
-        # 计算所有点的Y坐标范围
-        y_coords = [p[1] for p in points]
-        y_min, y_max = min(y_coords), max(y_coords)
-        y_range = y_max - y_min
-        
-        # 计算所有点的X坐标范围
-        x_coords = [p[0] for p in points]
-        x_min, x_max = min(x_coords), max(x_coords)
-        x_range = x_max - x_min
-        
-        # 根据图形分布动态调整容差
-        y_tolerance = y_range / 10  # 将Y轴范围分成10个区域
-        y_tolerance = max(min(y_tolerance, y_range / 3), 100)  # 设置合理的容差范围
-        
-        # 将点按y坐标分组
-        rows = {}
-        for point in points:
-            y = point[1]
-            assigned = False
-            
-            # 查找最近的行，优先使用已存在的行
-            closest_row = None
-            min_distance = float('inf')
-            for existing_y in rows.keys():
-                distance = abs(y - existing_y)
-                if distance < min_distance and distance < y_tolerance:
-                    min_distance = distance
-                    closest_row = existing_y
-                    
-            if closest_row is not None:
-                rows[closest_row].append(point)
-            else:
-                # 创建新行
-                rows[y] = [point]
-        
-        # 对每一行内的点按x坐标排序，并确保行与行之间有足够的距离
-        sorted_points = []
-        sorted_y = sorted(rows.keys(), reverse=True)  # 从上到下
-        
-        for y in sorted_y:
-            # 对当前行的点按x坐标从左到右排序
-            row_points = sorted(rows[y], key=lambda p: p[0])
-            sorted_points.extend(row_points)
-        
-        return sorted_points 
+        return sort_points(points)
 
     def check_basement_overlap(self, obj, basement_bounds):
-        """检查对象是否与地库线重叠并计算折算系数"""
+        """按对象位于地库内的面积比例计算折算系数
+
+        basement_bounds 可以是地库线顶点列表，也可以是 [最小点, 最大点] 形式的范围。
+        """
         try:
-            # 获取对象的边界框
-            obj_bounds = obj.GetBoundingBox()
-            obj_min = [obj_bounds[0][0], obj_bounds[0][1]]
-            obj_max = [obj_bounds[1][0], obj_bounds[1][1]]
-
-            # 检查是否与地库线范围重叠
-            if (obj_min[0] <= basement_bounds[1][0] and obj_max[0] >= basement_bounds[0][0] and
-                obj_min[1] <= basement_bounds[1][1] and obj_max[1] >= basement_bounds[0][1]):
-                # 如果重叠，返回配置的折算系数（可以从UI获取）
-                if hasattr(self, 'ui') and hasattr(self.ui, 'basement_factor'):
-                    return float(self.ui.basement_factor)
-                return 0.5  # 默认折算系数
-            
-            return 1.0  # 如果不重叠，返回1.0（不进行折算）
+            garage_factor = 0.5  # 默认折算系数
+            if hasattr(self, 'ui') and hasattr(self.ui, 'basement_factor'):
+                garage_factor = float(self.ui.basement_factor)
+
+            if len(basement_bounds) == 2:
+                (x0, y0), (x1, y1) = basement_bounds[0][:2], basement_bounds[1][:2]
+                basement_bounds = [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+
+            snapshot = EntitySnapshot.from_objects([obj], min_area=0)
+            if not len(snapshot):
+                return 1.0
+            vertices, offsets = snapshot.outlines()
+            fraction = overlap_fractions(vertices, offsets, basement_bounds)[0]
+            return float(split_factor(fraction, garage_factor))
         except Exception as e:
             print(f"检查地库线重叠时出错: {str(e)}")
-            return 1.0 
+            return 1.0
 
     def get_hatch_patterns(self):
         """获取CAD中所有可用的填充样式"""
@@ -440,134 +774,186 @@ class PlantMark(CadUtils):
             print(f"获取填充样式时出错: {str(e)}")
             return ["CROSS", "GRASS", "ANSI31"]  # 返回基本默认样式
 
-    def apply_hatch(self, pattern, scale):
-        """应用填充到已标注的对象"""
+    def resolve_hatch_targets(self):
+        """确定需要填充的已标注对象
+
+        优先按标注时记录的句柄查找；没有句柄时（如旧版本保存的数据）
+        用已标注中心点的网格空间哈希匹配，每个标注点只匹配一个对象。
+        """
+        hatch_types = ["AcDbPolyline", "AcDbCircle", "AcDbEllipse"]
+        original_objects = getattr(self.ui, 'original_objects', None) or []
+        mark_handles = getattr(self.ui, 'mark_handles', None) or []
+
+        if mark_handles:
+            by_handle = {info['handle']: info for info in original_objects if info.get('handle')}
+            targets = []
+            for handle in mark_handles:
+                obj_info = by_handle.get(handle)
+                if obj_info is None:
+                    obj_info = self.object_info_from_handle(handle)
+                if obj_info and obj_info['type'] in hatch_types:
+                    targets.append(obj_info)
+            return targets
+
+        center_points = getattr(self.ui, 'center_points', None) or []
+        if not center_points:
+            return []
+        tolerance = 1
+        index = GridIndex.from_points(center_points, tolerance)
+        matched = set()
+        targets = []
+        for obj_info in original_objects:
+            try:
+                if obj_info['type'] not in hatch_types:
+                    continue
+                obj = obj_info['object']
+                if obj_info['type'] == "AcDbPolyline":
+                    center = self.calculate_center(obj.Coordinates)
+                else:
+                    center = list(obj.Center)
+                nearest = index.nearest(center, tolerance, exclude=matched)
+                if nearest is not None:
+                    matched.add(nearest)
+                    targets.append(obj_info)
+            except Exception as e:
+                print(f"处理对象时出错: {str(e)}")
+                continue
+        return targets
+
+    def object_info_from_handle(self, handle):
+        """通过句柄获取图形及其图层和类型"""
         try:
-            if not hasattr(self, 'ui') or not hasattr(self.ui, 'original_objects'):
+            obj = self.doc.HandleToObject(handle)
+            return {
+                'object': obj,
+                'handle': handle,
+                'layer': obj.Layer,
+                'type': obj.ObjectName,
+                'closed': obj.Closed if obj.ObjectName == "AcDbPolyline" else True
+            }
+        except Exception as e:
+            print(f"通过句柄获取图形时出错: {str(e)}")
+            return None
+
+    def apply_hatch(self, pattern, scale, angle, color):
+        """应用填充到已标注的对象，angle 为度，color 为颜色索引（均在界面线程中读取）"""
+        try:
+            if not hasattr(self, 'ui') or not (getattr(self.ui, 'original_objects', None)
+                                               or getattr(self.ui, 'mark_handles', None)):
                 self.doc.Utility.Prompt("请先进行面积标注！")
                 return
 
-            # 获取填充参数
-            angle = float(self.ui.hatch_angle_var.get())
-            
-            # 获取颜色值
-            color_name = self.ui.hatch_color_var.get()
-            color = self.ui.color_map.get(color_name, self.ui.color_map["默认"])
-
             # 记录未闭合的多段线数量
             unclosed_count = 0
 
-            try:
-                # 创建填充
-                [PatternType, patternName, bAss] = [1, pattern or "CROSS", True]  # 设置默认值为CROSS
-                hatch = self.msp.AddHatch(PatternType, patternName, bAss)
-                
-                # 遍历所有原始对象
-                for obj_info in self.ui.original_objects:
-                    try:
-                        obj = obj_info['object']
-                        if obj_info['type'] not in ["AcDbPolyline", "AcDbCircle", "AcDbEllipse"]:
-                            continue
-                            
-                        # 检查是否是未闭合的多段线
-                        if obj_info['type'] == "AcDbPolyline" and not obj.Closed:
-                            unclosed_count += 1
-                            
-                        # 获取对象中心点
-                        center = None
-                        if obj_info['type'] == "AcDbPolyline":
-                            coords = obj.Coordinates
-                            x_sum = sum(coords[i] for i in range(0, len(coords), 2))
-                            y_sum = sum(coords[i+1] for i in range(0, len(coords), 2))
-                            points_count = len(coords) // 2
-                            center = [x_sum/points_count, y_sum/points_count]
-                        elif obj_info['type'] == "AcDbCircle":
-                            center = list(obj.Center)
-                        elif obj_info['type'] == "AcDbEllipse":
-                            center = list(obj.Center)
-
-                        # 检查这个对象是否是我们标注的对象
-                        if center and self.ui.center_points:
-                            for marked_point in self.ui.center_points:
-                                if (abs(center[0] - marked_point[0]) < 1 and 
-                                    abs(center[1] - marked_point[1]) < 1):
-                                    # 创建对象数组并添加边界
-                                    outerloop = []
-                                    outerloop.append(obj)
-                                    outerloop = self.vtobj(outerloop)
-                                    try:
-                                        hatch.AppendInnerLoop(outerloop)
-                                        # 设置填充到原始对象的图层
-                                        hatch.Layer = obj_info['layer']
-                                    except Exception as e:
-                                        print(f"添加填充边界时出错: {str(e)}")
-                                    break
-                    
-                    except Exception as e:
-                        print(f"处理对象时出错: {str(e)}")
-                        continue
+            # 先收集全部边界，再批量生成填充
+            builder = HatchBuilder(self, pattern, scale, angle, color, self.hatch_max_loops)
+            for obj_info in self.resolve_hatch_targets():
+                # 检查是否是未闭合的多段线
+                if obj_info['type'] == "AcDbPolyline" and not obj_info.get('closed', True):
+                    unclosed_count += 1
+                # 填充放在原始对象的图层
+                builder.add_loop(obj_info['object'], obj_info['layer'])
 
-                    # 设置填充属性
-                    hatch.PatternAngle = math.radians(angle)
-                    hatch.PatternScale = scale
-                    hatch.Color = color
-
-                    # 计算填充
-                    try:
-                        hatch.Evaluate()
-                    except:
-                        self.doc.Utility.Prompt("填充比例有误，请尝试其他数值\n")
-                        if 'hatch' in locals():
-                            hatch.Delete()
-                        return
-
-                    # 刷新显示
-                    self.doc.Regen(1)
-                    
-                    # 显示未闭合多段线的提示
-                    if unclosed_count > 0:
-                        self.doc.Utility.Prompt(f"\n注意：发现{unclosed_count}条未闭合的多段线\n")
-                    self.doc.Utility.Prompt("已完成填充\n")
+            if not builder.loop_count:
+                self.doc.Utility.Prompt("没有找到需要填充的已标注对象\n")
+                return
 
-            except Exception as e:
-                print(f"填充过程出错: {str(e)}")
-                if 'hatch' in locals():
-                    try:
-                        hatch.Delete()
-                    except:
-                        pass
+            # 脚本模式：全部填充写入一个脚本提交
+            if self.use_script():
+                builder.emit(self.script_emitter(kind="hatch"))
+                self.doc.Utility.Prompt(f"\n已提交填充脚本：{builder.loop_count}个边界\n")
+                return builder.timings
+
+            # 计算填充
+            if not builder.build():
+                self.doc.Utility.Prompt("填充比例有误，请尝试其他数值\n")
+                return
+
+            # 显示每批耗时和未闭合多段线的提示
+            self.doc.Utility.Prompt(f"\n{builder.report()}\n")
+            if unclosed_count > 0:
+                self.doc.Utility.Prompt(f"\n注意：发现{unclosed_count}条未闭合的多段线\n")
+            self.doc.Utility.Prompt("已完成填充\n")
+            return builder.timings
 
         except Exception as e:
             print(f"填充过程出错: {str(e)}") 
 
-    def draw_area_text(self, point, area, offset_y=0, offset_x=0, is_combined=False):
-        """绘制面积数值"""
+    def _label_block(self, style):
+        """确保当前图纸中定义了该样式的标注块（圆圈 + NUMBER、AREA 属性），返回块名称
+
+        几何和颜色相同的样式共用一个块，每张图纸只定义一次。
+        """
+        name = style.block_name
+        if name in self.label_blocks:
+            return name
         try:
-            # 获取字高
-            text_height = 3.0
-            if hasattr(self, 'ui'):
+            self.doc.Blocks.Item(name)
+        except Exception:
+            origin = self.vtpnt(0, 0)
+            block = self.doc.Blocks.Add(origin, name)
+            circle = block.AddCircle(origin, style.radius)
+            circle.Color = style.circle_color
+            # 属性顺序固定为 NUMBER、AREA，插入时按顺序填写
+            area_point = self.vtpnt(style.combined_offset, 0)
+            for tag, prompt, height, point in (("NUMBER", "序号", style.number_height, origin),
+                                               ("AREA", "面积", style.text_height, area_point)):
+                attribute = block.AddAttribute(height, 0, prompt, point, tag, "")
+                attribute.Color = style.text_color
+                attribute.Alignment = 4  # 中心对齐
+                attribute.TextAlignmentPoint = point
+        self.label_blocks.add(name)
+        return name
+
+    def _add_label_block(self, point, number, area, style=None):
+        """插入一个属性块标注并填写序号和面积，返回 [块参照, 序号属性]"""
+        try:
+            style = style or self.annotation_style()
+            name = self._label_block(style)
+            wcs_point = self.transform_point_to_wcs(point)
+            block = self.msp.InsertBlock(self.vtpnt(wcs_point[0], wcs_point[1]), name, 1, 1, 1,
+                                         style.text_rotation)
+            number_attribute, area_attribute = block.GetAttributes()[:2]
+            number_attribute.TextString = str(number)
+            area_attribute.TextString = style.format_area(area)
+            return [block, number_attribute]
+        except Exception as e:
+            print(f"插入标注块时出错: {str(e)}")
+            if 'block' in locals():
                 try:
-                    text_height = float(self.ui.text_height_var.get())
-                except ValueError:
-                    text_height = 3.0
+                    block.Delete()
+                except:
+                    pass
+            return []
+
+    def _add_leader(self, start, end, style=None):
+        """在当前图层创建从标注锚点到标注的引线（UCS坐标），返回创建的图形"""
+        try:
+            style = style or self.annotation_style()
+            points = self.transform_points_to_wcs([start[:2], end[:2]])
+            line = self.msp.AddLine(self.vtpnt(points[0][0], points[0][1]), self.vtpnt(points[1][0], points[1][1]))
+            line.Color = style.text_color
+            return [line]
+        except Exception as e:
+            print(f"绘制引线时出错: {str(e)}")
+            return []
+
+    def draw_area_text(self, point, area, offset_y=0, offset_x=0, is_combined=False, style=None):
+        """绘制面积数值"""
+        return bool(self._add_area_text(point, area, offset_y, offset_x, is_combined, style))
+
+    def _add_area_text(self, point, area, offset_y=0, offset_x=0, is_combined=False, style=None):
+        """在当前图层创建面积文字，返回创建的图形"""
+        try:
+            style = style or self.annotation_style()
             
             # 将UCS坐标转换回WCS用于绘制
             wcs_point = self.transform_point_to_wcs(point)
             
-            # 处理单位转换和数值格式化
-            if hasattr(self, 'ui') and self.ui.unit_var.get() == "米":
-                # 将平方毫米转换为平方米（除以1,000,000）
-                converted_area = area / 1000000
-                area_text = f"{converted_area:.2f}㎡"
-            else:
-                area_text = f"{area:.2f}㎟"
-            
-            # 如果是综合模式，调整文本位置到圆的左侧
+            # 如果是综合模式，将文本向左偏移圆的直径加上一个字高
             if is_combined:
-                # 计算圆的半径（与draw_circle_number中保持一致）
-                radius = max(text_height * 0.6, 1.5)
-                # 将文本位置向左偏移圆的直径加上一些间距
-                offset_x =radius *2 + text_height
+                offset_x = style.combined_offset
             
             # 添加偏移
             text_point = self.vtpnt(
@@ -575,23 +961,14 @@ class PlantMark(CadUtils):
                 wcs_point[1] + offset_y
             )
             
-            # 获取UCS旋转角度（弧度）
-            rotation_angle = self.get_ucs_rotation()
-            
             # 创建文字
-            text = self.msp.AddText(area_text, text_point, text_height)
-            text.Color = 1
-            
-            # 如果是综合模式，使用右对齐
-            if is_combined:
-                text.Alignment = 4  # 右对齐
-            else:
-                text.Alignment = 4  # 中心对齐
-            
+            text = self.msp.AddText(style.format_area(area), text_point, style.text_height)
+            text.Color = style.text_color
+            text.Alignment = 4  # 中心对齐
             text.TextAlignmentPoint = text_point
-            text.Rotation = -rotation_angle * 180 / math.pi
+            text.Rotation = style.text_rotation
             
-            return True
+            return [text]
         except Exception as e:
             print(f"绘制面积文本时出错: {str(e)}")
             if 'text' in locals():
@@ -599,7 +976,7 @@ class PlantMark(CadUtils):
                     text.Delete()
                 except:
                     pass
-            return False 
+            return [] 
 
     def get_current_drawing_name(self):
         """获取当前CAD图纸的名称"""
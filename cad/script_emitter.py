@@ -0,0 +1,290 @@
+"""
+AutoLISP脚本输出模块
+
+功能说明:
+- ScriptEmitter: 把一次标注运行（标注图层、圆圈序号、面积文字、引线、属性块、填充）
+  渲染为一个AutoLISP脚本，一次提交后在CAD内部执行，不再为每个图形属性产生一次COM调用
+- 接口与 AnnotationBatch 相同（add_circle_number/add_area_text/add_label_block/add_leader），
+  PlantMark 的标注流程可直接使用；commit 时写出脚本文件并通过 SendCommand 加载
+- 脚本内容只由输入决定（坐标按固定格式输出），可在任意平台生成并与基准文件逐行比较
+- 脚本执行后把创建的标注句柄写入结果文件（源图形句柄、角色、标注句柄，制表符分隔），
+  由 read_results 读回标注登记表
+"""
+
+import math
+import os
+import tempfile
+
+from .annotation_style import LAYER_COLOR
+
+DEFAULT_SCRIPT_NAME = "green_area_labels.lsp"
+DEFAULT_ENCODING = "gb18030"  # 中文版CAD按ANSI代码页读取LSP文件
+
+# 脚本中使用的函数定义
+PRELUDE = r""";; 绿化面积标注脚本（自动生成）
+(vl-load-com)
+(setq gl:doc (vla-get-ActiveDocument (vlax-get-acad-object))
+      gl:msp (vla-get-ModelSpace gl:doc)
+      gl:results nil)
+(defun gl:keep (key role ename)
+  (if (and key ename)
+    (setq gl:results (cons (list key role (cdr (assoc 5 (entget ename)))) gl:results)))
+  ename)
+(defun gl:layer (name color)
+  (if (not (tblsearch "LAYER" name))
+    (vla-put-Color (vla-Add (vla-get-Layers gl:doc) name) color)))
+(defun gl:circle (layer x y r color)
+  (entmake (list '(0 . "CIRCLE") (cons 8 layer) (cons 62 color) (list 10 x y 0.0) (cons 40 r)))
+  (entlast))
+(defun gl:text (layer s x y h angle color)
+  (entmake (list '(0 . "TEXT") (cons 8 layer) (cons 62 color) (list 10 x y 0.0) (list 11 x y 0.0)
+                 (cons 40 h) (cons 1 s) (cons 50 angle) '(72 . 4) '(73 . 0)))
+  (entlast))
+(defun gl:line (layer x1 y1 x2 y2 color)
+  (entmake (list '(0 . "LINE") (cons 8 layer) (cons 62 color) (list 10 x1 y1 0.0) (list 11 x2 y2 0.0)))
+  (entlast))
+(defun gl:define-block (name r nh th offset color text-color / blk obj)
+  (if (not (tblsearch "BLOCK" name))
+    (progn
+      (setq blk (vla-Add (vla-get-Blocks gl:doc) (vlax-3d-point 0.0 0.0 0.0) name))
+      (setq obj (vla-AddCircle blk (vlax-3d-point 0.0 0.0 0.0) r))
+      (vla-put-Color obj color)
+      (foreach att (list (list "NUMBER" "序号" nh 0.0) (list "AREA" "面积" th offset))
+        (setq obj (vla-AddAttribute blk (caddr att) acAttributeModeNormal (cadr att)
+                                    (vlax-3d-point (cadddr att) 0.0 0.0) (car att) ""))
+        (vla-put-Color obj text-color)
+        (vla-put-Alignment obj acAlignmentMiddle)
+        (vla-put-TextAlignmentPoint obj (vlax-3d-point (cadddr att) 0.0 0.0))))))
+(defun gl:block (layer name x y angle number area / ref atts)
+  (setq ref (vla-InsertBlock gl:msp (vlax-3d-point x y 0.0) name 1.0 1.0 1.0 angle))
+  (vla-put-Layer ref layer)
+  (setq atts (vlax-invoke ref 'GetAttributes))
+  (vla-put-TextString (car atts) number)
+  (vla-put-TextString (cadr atts) area)
+  (list (vlax-vla-object->ename ref) (vlax-vla-object->ename (car atts))))
+(defun gl:delete (handle / ename)
+  (if (setq ename (handent handle)) (entdel ename)))
+(defun gl:renumber (handle text / ename)
+  (if (setq ename (handent handle))
+    (vla-put-TextString (vlax-ename->vla-object ename) text)))
+(defun gl:hatch (layer pattern scale angle color handles / hatch ename)
+  (setq hatch (vla-AddHatch gl:msp acHatchPatternTypePreDefined pattern :vlax-true))
+  (vla-put-PatternAngle hatch angle)
+  (vla-put-PatternScale hatch scale)
+  (vla-put-Color hatch color)
+  (vla-put-Layer hatch layer)
+  (foreach handle handles
+    (if (setq ename (handent handle))
+      (vl-catch-all-apply 'vla-AppendInnerLoop
+        (list hatch (vlax-make-variant
+                      (vlax-safearray-fill (vlax-make-safearray vlax-vbObject '(0 . 0))
+                                           (list (vlax-ename->vla-object ename))))))))
+  (vla-Evaluate hatch))
+(defun gl:write-results (path / file)
+  (setq file (open path "w"))
+  (foreach item (reverse gl:results)
+    (write-line (strcat (car item) "\t" (cadr item) "\t" (caddr item)) file))
+  (close file))
+"""
+
+
+def lisp_number(value):
+    """按固定格式输出实数，保证同样的输入得到同样的脚本"""
+    text = f"{float(value):.6f}".rstrip("0")
+    if text.endswith("."):
+        text += "0"
+    return "0.0" if text == "-0.0" else text
+
+
+def lisp_string(value):
+    """输出带引号并转义的字符串"""
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def read_results(path):
+    """读取脚本写出的结果文件，返回 {源图形句柄: {角色: 标注句柄}}；文件不存在时返回 None"""
+    if not path or not os.path.exists(path):
+        return None
+    labels = {}
+    with open(path, encoding=DEFAULT_ENCODING, errors="replace") as stream:
+        for line in stream:
+            parts = line.rstrip("\r\n").split("\t")
+            if len(parts) == 3:
+                labels.setdefault(parts[0], {})[parts[1]] = parts[2]
+    return labels
+
+
+class ScriptEmitter:
+    """把标注和填充渲染为AutoLISP脚本，用法与 AnnotationBatch 相同:
+
+        with plant.annotation_batch() as batch:   # plant.label_script 为 True 时
+            batch.add_circle_number(center, 1)
+    """
+
+    def __init__(self, plant, layer_name, style=None, path=None, progress_callback=None,
+                 encoding=DEFAULT_ENCODING, submit=True):
+        self.plant = plant
+        self.layer_name = layer_name
+        self.style = style
+        self.path = path or os.path.join(tempfile.gettempdir(), DEFAULT_SCRIPT_NAME)
+        self.results_path = os.path.splitext(self.path)[0] + ".txt"
+        self.progress_callback = progress_callback
+        self.encoding = encoding
+        self.submit_script = submit  # 为 False 时只写出脚本文件，由用户自行加载
+        self.pending = []
+        self.forms = []      # 已渲染的脚本语句
+        self.changes = []    # 删除旧标注、修改序号的语句，放在新标注之后执行
+        self.blocks = {}     # 块名称 -> 样式，需要在脚本开头定义
+        self.layers = {}     # 图层名称 -> 颜色，需要在脚本开头创建
+        self.keys = 0        # 需要记录句柄的标注数量
+        # 与 AnnotationBatch 一致的属性；句柄在脚本执行后才有，由结果文件读回
+        self.created = []
+        self.created_by_key = {}
+
+    def __len__(self):
+        return len(self.pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.pending = []
+            self.changes = []
+        return False
+
+    def add_circle_number(self, point, number, key=None, style=None):
+        self.pending.append(('circle', point, number, key, style))
+
+    def add_area_text(self, point, area, is_combined=False, key=None, style=None):
+        self.pending.append(('area', point, area, key, style, is_combined))
+
+    def add_label_block(self, point, number, area, key=None, style=None):
+        self.pending.append(('block', point, number, key, style, area))
+
+    def add_leader(self, start, end, key=None):
+        self.pending.append(('leader', start, end, key))
+
+    def delete_handles(self, handles):
+        """删除已有图形（如旧标注），在新标注之后执行"""
+        for handle in handles:
+            self.changes.append(f"(gl:delete {lisp_string(handle)})")
+
+    def renumber(self, handle, number):
+        """修改已有序号文字（或序号属性），在新标注之后执行"""
+        self.changes.append(f"(gl:renumber {lisp_string(handle)} {lisp_string(number)})")
+
+    def add_hatch(self, layer, handles, pattern, scale, angle, color):
+        """按边界图形句柄生成一个填充，angle 为度"""
+        self.forms.append(
+            f"(gl:hatch {lisp_string(layer)} {lisp_string(pattern)} {lisp_number(scale)} "
+            f"{lisp_number(math.radians(angle))} {int(color)} "
+            f"(list {' '.join(lisp_string(handle) for handle in handles)}))")
+
+    def _wcs(self, point):
+        return self.plant.transform_point_to_wcs(point)
+
+    def _keep(self, key, role, expression):
+        if key is None:
+            return expression
+        self.keys += 1
+        return f"(gl:keep {lisp_string(key)} {lisp_string(role)} {expression})"
+
+    def _render_item(self, item, style):
+        """把一个登记的标注渲染为脚本语句"""
+        kind, point, value, key = item[0], item[1], item[2], item[3]
+        style = (item[4] if len(item) > 4 else None) or style
+        layer = lisp_string(style.layer_name)
+        angle = lisp_number(style.text_rotation)
+        if kind == 'leader':
+            start, end = self._wcs(point), self._wcs(value)
+            return [self._keep(key, "leader",
+                               f"(gl:line {layer} {lisp_number(start[0])} {lisp_number(start[1])} "
+                               f"{lisp_number(end[0])} {lisp_number(end[1])} {style.text_color})")]
+        x, y = self._wcs(point)[:2]
+        if kind == 'circle':
+            return [
+                self._keep(key, "circle", f"(gl:circle {layer} {lisp_number(x)} {lisp_number(y)} "
+                                          f"{lisp_number(style.radius)} {style.circle_color})"),
+                self._keep(key, "number", f"(gl:text {layer} {lisp_string(value)} {lisp_number(x)} "
+                                          f"{lisp_number(y)} {lisp_number(style.number_height)} {angle} "
+                                          f"{style.text_color})"),
+            ]
+        if kind == 'block':
+            self.blocks.setdefault(style.block_name, style)
+            expression = (f"(gl:block {layer} {lisp_string(style.block_name)} {lisp_number(x)} {lisp_number(y)} "
+                          f"{angle} {lisp_string(value)} {lisp_string(style.format_area(item[5]))})")
+            if key is None:
+                return [expression]
+            self.keys += 1
+            return [f"(setq gl:ref {expression})",
+                    f"(gl:keep {lisp_string(key)} \"block\" (car gl:ref))",
+                    f"(gl:keep {lisp_string(key)} \"number\" (cadr gl:ref))"]
+        # 面积文字，综合模式在WCS中沿X轴偏移
+        if item[5]:
+            x += style.combined_offset
+        return [self._keep(key, "area", f"(gl:text {layer} {lisp_string(style.format_area(value))} "
+                                        f"{lisp_number(x)} {lisp_number(y)} {lisp_number(style.text_height)} "
+                                        f"{angle} {style.text_color})")]
+
+    def render(self):
+        """渲染全部已登记的标注，返回完整的脚本文字"""
+        pending, self.pending = self.pending, []
+        if pending and self.style is None:
+            self.style = self.plant.annotation_style(self.layer_name)
+        if self.style is not None:
+            self.layers.setdefault(self.style.layer_name, LAYER_COLOR)
+        for item in pending:
+            self.forms.extend(self._render_item(item, self.style))
+
+        lines = [PRELUDE.rstrip("\n"), "(vla-StartUndoMark gl:doc)"]
+        for name, color in self.layers.items():
+            lines.append(f"(gl:layer {lisp_string(name)} {int(color)})")
+        for name, style in self.blocks.items():
+            lines.append(f"(gl:define-block {lisp_string(name)} {lisp_number(style.radius)} "
+                         f"{lisp_number(style.number_height)} {lisp_number(style.text_height)} "
+                         f"{lisp_number(style.combined_offset)} {style.circle_color} {style.text_color})")
+        lines.extend(self.forms)
+        lines.extend(self.changes)
+        lines.append("(vla-EndUndoMark gl:doc)")
+        lines.append("(vla-Regen gl:doc acAllViewports)")
+        if self.keys:
+            lines.append(f"(gl:write-results {lisp_string(self.results_path.replace(os.sep, '/'))})")
+        lines.append("(princ)")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path=None):
+        """写出脚本文件，返回路径"""
+        path = path or self.path
+        script = self.render()
+        # 删除上次的结果文件，结果文件出现即表示本次脚本已执行完
+        if self.keys and os.path.exists(self.results_path):
+            os.remove(self.results_path)
+        with open(path, "w", encoding=self.encoding, errors="replace", newline="\r\n") as stream:
+            stream.write(script)
+        return path
+
+    def submit(self):
+        """写出脚本并一次性提交给CAD执行；文件内容是 AutoLISP，不论扩展名都用 load 加载"""
+        total = len(self.pending)
+        path = self.write()
+        if self.progress_callback:
+            self.progress_callback(total, total)
+        if self.submit_script:
+            cad_path = path.replace(os.sep, "/")
+            self.plant.doc.SendCommand(f'(load "{cad_path}") ')
+        return path
+
+    def commit(self):
+        """与 AnnotationBatch.commit 对应：写出并提交脚本"""
+        if self.pending or self.forms or self.changes:
+            self.submit()
+        return self.created
+
+    def rollback(self):
+        """脚本提交前没有创建任何图形，放弃已登记的内容即可"""
+        self.pending = []
+        self.forms = []
+        self.changes = []
@@ -7,6 +7,7 @@ PlantMark 是一个CAD图纸处理工具，用于计算和标注CAD图纸中的
 目录结构:
 PlantMark/
 ├── main.py # 程序入口文件
+├── batch_report.py # 批量计算绿地率（命令行，读取DXF）
 ├── assets/ # 资源文件目录
 │ ├── icon.py # 程序图标数据
 │ ├── qr_codes.py # 收款码数据
@@ -42,6 +43,7 @@ PlantMark/
 
 模块说明:
 - main.py: 程序入口点，负责启动检查和初始化
+- batch_report.py: 命令行批量计算目录中DXF图纸的绿地率，多进程并行并输出汇总表
 - ui/plant_mark_ui.py: 主界面实现，包含用户交互逻辑
 - ui/ui_components.py: 自定义UI组件库
 - ui/window_manager.py: 窗口管理器，控制程序窗口行为
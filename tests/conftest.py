@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_cad  # noqa: E402
+
+fake_cad.install_com_modules()
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """假的CAD应用程序，PlantMark 连接时得到它"""
+    import win32com.client
+
+    fake_cad.reset_handles()
+    application = fake_cad.FakeApplication()
+    monkeypatch.setattr(win32com.client, "Dispatch", lambda name: application)
+    return application
+
+
+@pytest.fixture
+def doc(app):
+    return app.ActiveDocument
+
+
+@pytest.fixture
+def plant(app):
+    from cad.plant_mark import PlantMark
+
+    plant = PlantMark("AutoCAD.Application")
+    plant.ui = fake_cad.FakeUI()
+    return plant
@@ -0,0 +1,346 @@
+"""
+测试用的假CAD对象
+
+功能说明:
+- FakeApplication/FakeDocument 模拟 PlantMark 用到的 AutoCAD COM 接口
+  （模型空间、图层、选择集、块、系统变量、HandleToObject、SendCommand）
+- 记录 Regen、ActiveLayer 等调用次数，供测试检查
+- install_com_modules 在没有 pywin32 的环境中注册假的 pythoncom/win32com 模块
+"""
+
+import itertools
+import sys
+import types
+from collections import Counter
+
+_handles = itertools.count(1)
+
+
+def reset_handles():
+    """重置句柄计数，使生成的句柄可重复"""
+    global _handles
+    _handles = itertools.count(1)
+
+
+class FakeVariant:
+    def __init__(self, vt, value):
+        self.vt = vt
+        self.value = value
+
+    def __iter__(self):
+        return iter(self.value)
+
+    def __getitem__(self, index):
+        return self.value[index]
+
+    def __repr__(self):
+        return f"VARIANT({self.value!r})"
+
+
+def install_com_modules():
+    """注册假的 pythoncom、win32com.client 和 win32 模块（已安装 pywin32 时不替换）"""
+    try:
+        import pythoncom  # noqa: F401
+        import win32com.client  # noqa: F401
+        return False
+    except ImportError:
+        pass
+    pythoncom = types.ModuleType("pythoncom")
+    pythoncom.VT_ARRAY = 0x2000
+    pythoncom.VT_R8 = 5
+    pythoncom.VT_I2 = 2
+    pythoncom.VT_DISPATCH = 9
+    pythoncom.VT_VARIANT = 12
+    pythoncom.Empty = None
+    pythoncom.CoInitialize = lambda: None
+    pythoncom.CoUninitialize = lambda: None
+    pythoncom.PumpWaitingMessages = lambda: None
+    pythoncom.com_error = type("com_error", (Exception,), {"hresult": 0})
+
+    client = types.ModuleType("win32com.client")
+    client.VARIANT = FakeVariant
+    client.application = None
+    client.Dispatch = lambda name: client.application
+    client.GetActiveObject = lambda name: client.application
+    win32com = types.ModuleType("win32com")
+    win32com.client = client
+
+    sys.modules.update({
+        "pythoncom": pythoncom,
+        "win32com": win32com,
+        "win32com.client": client,
+        "win32": types.ModuleType("win32"),
+    })
+    return True
+
+
+class FakeEntity:
+    def __init__(self, **values):
+        self.Handle = format(next(_handles), "X")
+        self.Layer = "0"
+        self.deleted = False
+        self.__dict__.update(values)
+
+    def Delete(self):
+        self.deleted = True
+
+
+def polyline(coords, layer="G", closed=True):
+    """闭合多段线，面积按鞋带公式计算"""
+    n = len(coords) // 2
+    xs, ys = coords[0::2], coords[1::2]
+    area = abs(sum(xs[i] * ys[(i + 1) % n] - xs[(i + 1) % n] * ys[i] for i in range(n))) / 2
+    return FakeEntity(ObjectName="AcDbPolyline", Coordinates=tuple(coords), Closed=closed, Layer=layer,
+                      Area=area, ObjectID=next(_handles))
+
+
+def square(x, y, size=40, layer="G"):
+    return polyline([x, y, x + size, y, x + size, y + size, x, y + size], layer)
+
+
+class FakeLayers(dict):
+    def __init__(self, doc):
+        super().__init__()
+        self.doc = doc
+
+    def __iter__(self):
+        return iter(list(self.values()))
+
+    def Add(self, name):
+        if name in self:
+            raise Exception("图层已存在")
+        self[name] = FakeEntity(Name=name)
+        return self[name]
+
+    def Item(self, name):
+        self.doc.calls["Layers.Item"] += 1
+        return self.setdefault(name, FakeEntity(Name=name))
+
+    @property
+    def Count(self):
+        return len(self)
+
+
+class FakeSelection(list):
+    def __init__(self, doc, name):
+        super().__init__()
+        self.doc = doc
+        self.Name = name
+        self.filters = None
+
+    def SelectOnScreen(self, *filters):
+        self.filters = filters
+        self.extend(self.doc.pick)
+
+    def Select(self, *filters):
+        self.filters = filters
+        self.extend(self.doc.pick)
+
+    def Delete(self):
+        self.doc.SelectionSets.sets.remove(self)
+
+    @property
+    def Count(self):
+        return len(self)
+
+    def Item(self, index):
+        return self[index]
+
+
+class FakeSelectionSets:
+    def __init__(self, doc):
+        self.doc = doc
+        self.sets = []
+
+    @property
+    def Count(self):
+        return len(self.sets)
+
+    def Item(self, key):
+        if isinstance(key, int):
+            return self.sets[key]
+        for selection in self.sets:
+            if selection.Name == key:
+                return selection
+        raise Exception("选择集不存在")
+
+    def Add(self, name):
+        selection = FakeSelection(self.doc, name)
+        self.sets.append(selection)
+        self.doc.selections.append(selection)
+        return selection
+
+
+class FakeBlock(list):
+    def __init__(self, name):
+        super().__init__()
+        self.Name = name
+
+    def AddCircle(self, center, radius):
+        entity = FakeEntity(ObjectName="AcDbCircle", Radius=radius)
+        self.append(entity)
+        return entity
+
+    def AddAttribute(self, height, mode, prompt, point, tag, value):
+        entity = FakeEntity(ObjectName="AcDbAttributeDefinition", Height=height, TagString=tag, TextString=value)
+        self.append(entity)
+        return entity
+
+
+class FakeBlocks(dict):
+    def __init__(self, doc):
+        super().__init__()
+        self.doc = doc
+
+    def Item(self, name):
+        if name not in self:
+            raise Exception("块不存在")
+        return self[name]
+
+    def Add(self, point, name):
+        self.doc.calls["Blocks.Add"] += 1
+        self[name] = FakeBlock(name)
+        return self[name]
+
+
+class FakeModelSpace(list):
+    def __init__(self, doc):
+        super().__init__()
+        self.doc = doc
+
+    def _add(self, **values):
+        entity = FakeEntity(Layer=self.doc.ActiveLayer.Name, **values)
+        self.append(entity)
+        return entity
+
+    def AddCircle(self, center, radius):
+        return self._add(ObjectName="AcDbCircle", Center=list(center), Radius=radius)
+
+    def AddText(self, text, point, height):
+        return self._add(ObjectName="AcDbText", TextString=text, InsertionPoint=list(point), Height=height)
+
+    def AddLine(self, start, end):
+        return self._add(ObjectName="AcDbLine", StartPoint=list(start), EndPoint=list(end))
+
+    def AddHatch(self, pattern_type, pattern, associative):
+        hatch = self._add(ObjectName="AcDbHatch", PatternName=pattern, loops=[], evaluations=0)
+        hatch.AppendOuterLoop = hatch.loops.append
+        hatch.AppendInnerLoop = hatch.loops.append
+
+        def evaluate():
+            hatch.evaluations += 1
+        hatch.Evaluate = evaluate
+        return hatch
+
+    def InsertBlock(self, point, name, sx, sy, sz, rotation):
+        self.doc.calls["InsertBlock"] += 1
+        block = self.doc.Blocks.Item(name)
+        attributes = [FakeEntity(ObjectName="AcDbAttribute", TagString=item.TagString, TextString="")
+                      for item in block if item.ObjectName == "AcDbAttributeDefinition"]
+        reference = self._add(ObjectName="AcDbBlockReference", Name=name, InsertionPoint=list(point),
+                              Rotation=rotation)
+        reference.attributes = attributes
+        reference.GetAttributes = lambda: tuple(attributes)
+        self.doc.extra_handles.update({item.Handle: item for item in attributes})
+        return reference
+
+    @property
+    def Count(self):
+        return len(self)
+
+    def Item(self, index):
+        return self[index]
+
+    def live(self, object_name=None):
+        """未删除的图形"""
+        return [e for e in self if not e.deleted and (object_name is None or e.ObjectName == object_name)]
+
+
+class FakeUtility:
+    def __init__(self):
+        self.prompts = []
+
+    def Prompt(self, text):
+        self.prompts.append(text)
+
+
+class FakeDocument:
+    def __init__(self):
+        self.calls = Counter()
+        self.Layers = FakeLayers(self)
+        self._active = self.Layers.Add("0")
+        self.SelectionSets = FakeSelectionSets(self)
+        self.selections = []  # 创建过的全部选择集
+        self.ModelSpace = FakeModelSpace(self)
+        self.Blocks = FakeBlocks(self)
+        self.Utility = FakeUtility()
+        self.pick = []        # SelectOnScreen/Select 返回的图形
+        self.extra_handles = {}
+        self.commands = []
+        self.variables = {"UCSORG": (0, 0, 0), "UCSXDIR": (1, 0, 0), "UCSYDIR": (0, 1, 0)}
+        self.FullName = "C:/drawings/test.dwg"
+        self.Name = "test.dwg"
+
+    @property
+    def ActiveLayer(self):
+        return self._active
+
+    @ActiveLayer.setter
+    def ActiveLayer(self, layer):
+        self.calls["ActiveLayer"] += 1
+        self._active = layer
+
+    def Regen(self, which):
+        self.calls["Regen"] += 1
+
+    def GetVariable(self, name):
+        self.calls["GetVariable"] += 1
+        return self.variables[name]
+
+    def SendCommand(self, command):
+        self.commands.append(command)
+
+    def HandleToObject(self, handle):
+        for entity in list(self.ModelSpace) + list(self.pick):
+            if entity.Handle == handle and not entity.deleted:
+                return entity
+        if handle in self.extra_handles:
+            return self.extra_handles[handle]
+        raise Exception("无效句柄")
+
+
+class FakeApplication:
+    def __init__(self):
+        self.ActiveDocument = FakeDocument()
+        self.Visible = True
+        self.WindowState = 1
+
+
+class FakeVar:
+    """代替 Tk 变量"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class FakeUI:
+    """PlantMark 读取的界面变量"""
+
+    def __init__(self, mark_type="综合"):
+        self.annotation_layer_var = FakeVar("0-绿化面积标注")
+        self.text_height_var = FakeVar("3.0")
+        self.unit_var = FakeVar("毫米")
+        self.mark_type_var = FakeVar(mark_type)
+        self.hatch_angle_var = FakeVar("0")
+        self.hatch_color_var = FakeVar("绿")
+        self.color_map = {"绿": 3, "默认": 3}
+        self.center_points = []
+
+    def update_area_list(self, areas):
+        pass
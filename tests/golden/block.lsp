@@ -0,0 +1,13 @@
+(vla-StartUndoMark gl:doc)
+(gl:layer "绿化面积标注" 3)
+(gl:define-block "GREEN_LABEL_CFA585C2" 1.5 2.5 2.5 5.5 1 1)
+(gl:define-block "GREEN_LABEL_87FC07AF" 3.0 5.0 5.0 11.0 1 1)
+(setq gl:ref (gl:block "绿化面积标注" "GREEN_LABEL_CFA585C2" 10.0 20.0 -0.3 "1" "1.23㎡"))
+(gl:keep "A1" "block" (car gl:ref))
+(gl:keep "A1" "number" (cadr gl:ref))
+(gl:block "绿化面积标注" "GREEN_LABEL_CFA585C2" 30.0 40.0 -0.3 "2" "7.65㎡")
+(gl:block "绿化面积标注" "GREEN_LABEL_87FC07AF" 50.0 60.0 -0.3 "3" "0.00㎡")
+(vla-EndUndoMark gl:doc)
+(vla-Regen gl:doc acAllViewports)
+(gl:write-results "C:/green/labels.txt")
+(princ)
@@ -0,0 +1,11 @@
+(vla-StartUndoMark gl:doc)
+(gl:layer "绿化面积标注" 3)
+(gl:keep "A1" "circle" (gl:circle "绿化面积标注" 10.0 20.0 1.5 1))
+(gl:keep "A1" "number" (gl:text "绿化面积标注" "1" 10.0 20.0 2.5 -0.3 1))
+(gl:keep "A1" "area" (gl:text "绿化面积标注" "1.23㎡" 15.5 20.0 2.5 -0.3 1))
+(gl:circle "绿化面积标注" 30.0 40.0 1.5 1)
+(gl:text "绿化面积标注" "2" 30.0 40.0 2.5 -0.3 1)
+(vla-EndUndoMark gl:doc)
+(vla-Regen gl:doc acAllViewports)
+(gl:write-results "C:/green/labels.txt")
+(princ)
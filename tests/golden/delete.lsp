@@ -0,0 +1,8 @@
+(vla-StartUndoMark gl:doc)
+(gl:layer "绿化面积标注" 3)
+(gl:delete "1F")
+(gl:delete "20")
+(gl:renumber "3C" "7")
+(vla-EndUndoMark gl:doc)
+(vla-Regen gl:doc acAllViewports)
+(princ)
@@ -0,0 +1,6 @@
+(vla-StartUndoMark gl:doc)
+(gl:layer "绿化面积标注" 3)
+(gl:hatch "绿化填充" "ANSI31" 0.5 0.785398 3 (list "2A" "2B"))
+(vla-EndUndoMark gl:doc)
+(vla-Regen gl:doc acAllViewports)
+(princ)
@@ -0,0 +1,9 @@
+(vla-StartUndoMark gl:doc)
+(gl:layer "绿化面积标注" 3)
+(gl:keep "A1" "leader" (gl:line "绿化面积标注" 0.0 0.0 15.0 25.0 1))
+(gl:keep "A1" "circle" (gl:circle "绿化面积标注" 15.0 25.0 1.5 1))
+(gl:keep "A1" "number" (gl:text "绿化面积标注" "1" 15.0 25.0 2.5 -0.3 1))
+(vla-EndUndoMark gl:doc)
+(vla-Regen gl:doc acAllViewports)
+(gl:write-results "C:/green/labels.txt")
+(princ)
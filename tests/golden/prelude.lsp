@@ -0,0 +1,64 @@
+;; 绿化面积标注脚本（自动生成）
+(vl-load-com)
+(setq gl:doc (vla-get-ActiveDocument (vlax-get-acad-object))
+      gl:msp (vla-get-ModelSpace gl:doc)
+      gl:results nil)
+(defun gl:keep (key role ename)
+  (if (and key ename)
+    (setq gl:results (cons (list key role (cdr (assoc 5 (entget ename)))) gl:results)))
+  ename)
+(defun gl:layer (name color)
+  (if (not (tblsearch "LAYER" name))
+    (vla-put-Color (vla-Add (vla-get-Layers gl:doc) name) color)))
+(defun gl:circle (layer x y r color)
+  (entmake (list '(0 . "CIRCLE") (cons 8 layer) (cons 62 color) (list 10 x y 0.0) (cons 40 r)))
+  (entlast))
+(defun gl:text (layer s x y h angle color)
+  (entmake (list '(0 . "TEXT") (cons 8 layer) (cons 62 color) (list 10 x y 0.0) (list 11 x y 0.0)
+                 (cons 40 h) (cons 1 s) (cons 50 angle) '(72 . 4) '(73 . 0)))
+  (entlast))
+(defun gl:line (layer x1 y1 x2 y2 color)
+  (entmake (list '(0 . "LINE") (cons 8 layer) (cons 62 color) (list 10 x1 y1 0.0) (list 11 x2 y2 0.0)))
+  (entlast))
+(defun gl:define-block (name r nh th offset color text-color / blk obj)
+  (if (not (tblsearch "BLOCK" name))
+    (progn
+      (setq blk (vla-Add (vla-get-Blocks gl:doc) (vlax-3d-point 0.0 0.0 0.0) name))
+      (setq obj (vla-AddCircle blk (vlax-3d-point 0.0 0.0 0.0) r))
+      (vla-put-Color obj color)
+      (foreach att (list (list "NUMBER" "序号" nh 0.0) (list "AREA" "面积" th offset))
+        (setq obj (vla-AddAttribute blk (caddr att) acAttributeModeNormal (cadr att)
+                                    (vlax-3d-point (cadddr att) 0.0 0.0) (car att) ""))
+        (vla-put-Color obj text-color)
+        (vla-put-Alignment obj acAlignmentMiddle)
+        (vla-put-TextAlignmentPoint obj (vlax-3d-point (cadddr att) 0.0 0.0))))))
+(defun gl:block (layer name x y angle number area / ref atts)
+  (setq ref (vla-InsertBlock gl:msp (vlax-3d-point x y 0.0) name 1.0 1.0 1.0 angle))
+  (vla-put-Layer ref layer)
+  (setq atts (vlax-invoke ref 'GetAttributes))
+  (vla-put-TextString (car atts) number)
+  (vla-put-TextString (cadr atts) area)
+  (list (vlax-vla-object->ename ref) (vlax-vla-object->ename (car atts))))
+(defun gl:delete (handle / ename)
+  (if (setq ename (handent handle)) (entdel ename)))
+(defun gl:renumber (handle text / ename)
+  (if (setq ename (handent handle))
+    (vla-put-TextString (vlax-ename->vla-object ename) text)))
+(defun gl:hatch (layer pattern scale angle color handles / hatch ename)
+  (setq hatch (vla-AddHatch gl:msp acHatchPatternTypePreDefined pattern :vlax-true))
+  (vla-put-PatternAngle hatch angle)
+  (vla-put-PatternScale hatch scale)
+  (vla-put-Color hatch color)
+  (vla-put-Layer hatch layer)
+  (foreach handle handles
+    (if (setq ename (handent handle))
+      (vl-catch-all-apply 'vla-AppendInnerLoop
+        (list hatch (vlax-make-variant
+                      (vlax-safearray-fill (vlax-make-safearray vlax-vbObject '(0 . 0))
+                                           (list (vlax-ename->vla-object ename))))))))
+  (vla-Evaluate hatch))
+(defun gl:write-results (path / file)
+  (setq file (open path "w"))
+  (foreach item (reverse gl:results)
+    (write-line (strcat (car item) "\t" (cadr item) "\t" (caddr item)) file))
+  (close file))
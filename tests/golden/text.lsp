@@ -0,0 +1,8 @@
+(vla-StartUndoMark gl:doc)
+(gl:layer "绿化面积标注" 3)
+(gl:keep "A1" "area" (gl:text "绿化面积标注" "1.23㎡" 10.0 20.0 2.5 -0.3 1))
+(gl:text "绿化面积标注" "0.00㎡" -5.5 0.25 2.5 -0.3 1)
+(vla-EndUndoMark gl:doc)
+(vla-Regen gl:doc acAllViewports)
+(gl:write-results "C:/green/labels.txt")
+(princ)
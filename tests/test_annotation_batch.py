@@ -0,0 +1,52 @@
+import pytest
+
+from fake_cad import square
+
+
+def test_draw_leader_regens_once_per_batch(plant, doc):
+    doc.pick = [square(x, 0) for x in range(0, 1000, 100)]
+    areas, centers = plant.draw_leader(["全部图层"])
+
+    assert len(areas) == 10
+    assert doc.calls["Regen"] == 1
+    # 整个批次只切换一次图层，结束后恢复
+    assert doc.calls["ActiveLayer"] == 2
+    assert doc.ActiveLayer.Name == "0"
+    assert len(doc.ModelSpace.live("AcDbCircle")) == 10
+    assert len(doc.ModelSpace.live("AcDbText")) == 20
+
+
+def test_batch_commits_in_chunks_with_one_regen(plant, doc):
+    plant.annotation_chunk_size = 3
+    reports = []
+    with plant.annotation_batch(progress_callback=lambda done, total: reports.append((done, total))) as batch:
+        for i in range(7):
+            batch.add_circle_number((i * 10.0, 0.0), i + 1)
+
+    assert reports == [(3, 7), (6, 7), (7, 7)]
+    assert doc.calls["Regen"] == 1
+    assert [e.TextString for e in doc.ModelSpace.live("AcDbText")] == [str(i) for i in range(1, 8)]
+    assert all(e.Layer == "0-绿化面积标注" for e in doc.ModelSpace.live())
+
+
+def test_batch_rolls_back_on_error(plant, doc):
+    plant.annotation_chunk_size = 2
+
+    def progress(done, total):
+        if done >= 4:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        with plant.annotation_batch(progress_callback=progress) as batch:
+            for i in range(6):
+                batch.add_circle_number((i * 10.0, 0.0), i + 1)
+
+    assert doc.ModelSpace.live() == []
+    assert doc.calls["Regen"] == 1
+    assert doc.ActiveLayer.Name == "0"
+
+
+def test_empty_batch_does_not_regen(plant, doc):
+    with plant.annotation_batch():
+        pass
+    assert doc.calls["Regen"] == 0
@@ -0,0 +1,68 @@
+import math
+
+import numpy as np
+import pytest
+
+from cad.annotation_style import (
+    ADAPTIVE_LEVELS, MIN_RADIUS, MIN_TEXT_HEIGHT, AnnotationStyle, adaptive_heights, read_label_options,
+)
+from fake_cad import FakeUI, FakeVar
+
+
+def test_adaptive_heights_picks_nearest_level_in_log_space():
+    sizes = [0.1, 1.5, 2.5, 3.0, 4.0, 100.0]
+    indices = adaptive_heights(sizes, 3.0)
+    assert [ADAPTIVE_LEVELS[i] * 3.0 for i in indices] == [1.5, 1.5, 2.25, 3.0, 4.5, 12.0]
+
+
+def test_number_levels_do_not_collapse_at_minimum_height():
+    style = AnnotationStyle("标记", "3.0")
+    sizes = np.geomspace(0.5, 20, 200)
+    heights = sorted({s.number_height for s in style.level_styles(sizes)})
+
+    assert heights[0] == pytest.approx(MIN_TEXT_HEIGHT)
+    # 每个档位都是不同的字高，不再有被限制到同一字高的档位
+    assert len(heights) == len(style.effective_levels())
+    assert len(style.effective_levels()) == len(ADAPTIVE_LEVELS) - 1
+
+
+def test_area_levels_keep_small_heights():
+    style = AnnotationStyle("数字", "3.0")
+    assert style.effective_levels() == ADAPTIVE_LEVELS
+    heights = {s.text_height for s in style.level_styles([0.1, 100])}
+    assert heights == {1.5, 12.0}
+
+
+def test_level_styles_share_objects_per_level():
+    style = AnnotationStyle("综合", "3.0")
+    styles = style.level_styles([3.0, 3.1, 9.0])
+    assert styles[0] is styles[1] is style
+    assert styles[2].text_height == 9.0
+
+
+def test_style_is_immutable_and_derives_sizes():
+    style = AnnotationStyle("综合", "1", "米", rotation=math.radians(30))
+    assert style.number_height == MIN_TEXT_HEIGHT
+    assert style.radius == pytest.approx(max(MIN_TEXT_HEIGHT * 0.6, MIN_RADIUS))
+    assert style.format_area(2500000) == "2.50㎡"
+    with pytest.raises(AttributeError):
+        style.text_height = 5
+
+
+def test_read_label_options_from_ui():
+    ui = FakeUI("属性块")
+    options = read_label_options(ui)
+    assert options["mark_type"] == "属性块"
+    assert options["layer_name"] == "0-绿化面积标注"
+    assert read_label_options(None)["mark_type"] == "标记"
+
+
+def test_label_layout_is_opt_in(plant, doc):
+    style = plant.annotation_style()
+    assert not style.layout
+    # 未开启避让时登记表样式与以前相同，已保存的图纸不会全部重画
+    assert style.registry_key() == ["综合", "3.0", "毫米", "0-绿化面积标注", None]
+
+    plant.ui.label_layout_var = FakeVar(True)
+    assert read_label_options(plant.ui)["layout"]
+    assert plant.annotation_style().layout
@@ -0,0 +1,170 @@
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from cad.com_worker import ComWorker
+from cad.jobs import JobCancelled
+
+TIMEOUT = 5
+
+
+class FakeApartment:
+    """代替 pythoncom，记录调用所在的线程"""
+
+    def __init__(self):
+        self.initialized = []
+        self.uninitialized = []
+
+    def CoInitialize(self):
+        self.initialized.append(threading.current_thread())
+
+    def CoUninitialize(self):
+        self.uninitialized.append(threading.current_thread())
+
+    def PumpWaitingMessages(self):
+        pass
+
+
+class FakeSession:
+    """假的CAD会话，记录创建它的线程"""
+
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.calls = []
+
+
+@pytest.fixture
+def apartment():
+    return FakeApartment()
+
+
+@pytest.fixture
+def worker(apartment):
+    worker = ComWorker(session_factory=FakeSession, apartment=apartment)
+    yield worker
+    worker.cancel_all()
+    worker.stop(TIMEOUT)
+
+
+def blocking_job(started, release):
+    """开始后等待 release，用于让后续任务排队"""
+    def job(session, context):
+        started.set()
+        release.wait(TIMEOUT)
+        return "blocked"
+    return job
+
+
+def test_import_does_not_need_pywin32():
+    code = ("import sys; sys.modules['pythoncom'] = None; sys.modules['win32com'] = None; "
+            "import cad.jobs, cad.com_worker")
+    root = __file__.rsplit("tests", 1)[0]
+    subprocess.run([sys.executable, "-c", code], cwd=root, check=True)
+
+
+def test_submit_runs_in_worker_thread(worker, apartment):
+    future = worker.submit(lambda session, context, x, y=0: (session, threading.current_thread(), x + y), 2, y=3)
+    session, thread, value = future.result(TIMEOUT)
+
+    assert value == 5
+    assert thread is worker.thread
+    assert session.thread is worker.thread
+    assert apartment.initialized == [worker.thread]
+
+    worker.stop(TIMEOUT)
+    assert apartment.uninitialized == [worker.thread]
+    assert worker.session is None
+
+
+def test_jobs_run_in_submission_order(worker):
+    order = []
+    futures = [worker.submit(lambda session, context, i=i: order.append(i) or i) for i in range(20)]
+    assert [f.result(TIMEOUT) for f in futures] == list(range(20))
+    assert order == list(range(20))
+
+
+def test_exception_propagates_through_future(worker):
+    errors = []
+
+    def job(session, context):
+        raise ValueError("图层不存在")
+
+    future = worker.submit(job, on_error=errors.append)
+    with pytest.raises(ValueError, match="图层不存在"):
+        future.result(TIMEOUT)
+    assert isinstance(errors[0], ValueError)
+
+    # 出错后工作线程继续处理后续任务
+    assert worker.submit(lambda session, context: "ok").result(TIMEOUT) == "ok"
+
+
+def test_on_done_and_progress_callbacks(worker):
+    results = []
+    progress = []
+
+    def job(session, context):
+        context.report("标注", 1, 2)
+        context.report("标注", 2, 2)
+        return "done"
+
+    future = worker.submit(job, on_done=results.append, on_progress=lambda *args: progress.append(args[:3]))
+    future.result(TIMEOUT)
+    assert results == ["done"]
+    assert progress == [("标注", 1, 2), ("标注", 2, 2)]
+
+
+def test_cancel_queued_job(worker):
+    started, release = threading.Event(), threading.Event()
+    first = worker.submit(blocking_job(started, release))
+    started.wait(TIMEOUT)
+    ran = []
+    errors = []
+    second = worker.submit(lambda session, context: ran.append(1), on_error=errors.append)
+
+    worker.cancel(second)
+    release.set()
+
+    assert first.result(TIMEOUT) == "blocked"
+    assert second.cancelled()
+    assert ran == []
+    assert isinstance(errors[0], JobCancelled)
+
+
+def test_cancel_running_job(worker):
+    started = threading.Event()
+
+    def job(session, context):
+        started.set()
+        while True:
+            context.check_cancelled()
+            threading.Event().wait(0.01)
+
+    future = worker.submit(job)
+    started.wait(TIMEOUT)
+    worker.cancel(future)
+    with pytest.raises(JobCancelled):
+        future.result(TIMEOUT)
+
+
+def test_cancel_all(worker):
+    started = threading.Event()
+
+    def running(session, context):
+        started.set()
+        while True:
+            context.check_cancelled()
+            threading.Event().wait(0.01)
+
+    first = worker.submit(running)
+    started.wait(TIMEOUT)
+    queued = [worker.submit(lambda session, context: "never") for _ in range(3)]
+    assert worker.busy
+
+    worker.cancel_all()
+
+    with pytest.raises(JobCancelled):
+        first.result(TIMEOUT)
+    assert all(f.cancelled() for f in queued)
+    assert worker.submit(lambda session, context: "after").result(TIMEOUT) == "after"
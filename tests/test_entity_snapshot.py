@@ -0,0 +1,53 @@
+import math
+
+import pytest
+
+from cad.entity_snapshot import EntitySnapshot
+from fake_cad import FakeEntity, polyline, square
+
+
+class NoAreaEntity(FakeEntity):
+    """读取 Area 即失败，用来确认默认不读取CAD面积"""
+
+    @property
+    def Area(self):
+        raise AssertionError("不应读取 Area")
+
+
+def bulged_square(x, y, size, bulge):
+    """第一条边为圆弧段的正方形，Area 为CAD计算的真实面积"""
+    theta = 4 * math.atan(bulge)
+    radius = size / (2 * math.sin(theta / 2))
+    segment = radius * radius / 2 * (theta - math.sin(theta))
+    obj = square(x, y, size)
+    obj.Area += segment
+    obj.bulges = [bulge, 0.0, 0.0, 0.0]
+    obj.GetBulge = lambda k: obj.bulges[k]
+    return obj
+
+
+def test_arc_detection_is_off_by_default():
+    obj = NoAreaEntity(ObjectName="AcDbPolyline", Coordinates=(0, 0, 40, 0, 40, 40, 0, 40), Closed=True)
+    snapshot = EntitySnapshot.from_objects([obj])
+    assert len(snapshot) == 1
+    assert snapshot.areas[0] == pytest.approx(1600)
+
+
+@pytest.mark.parametrize("offset", [0.0, 123456.7, 2345678.9])
+@pytest.mark.parametrize("width, height", [(2.3, 1.7), (10000.3, 5000.9)])
+def test_straight_polylines_at_survey_coordinates_are_not_arcs(offset, width, height):
+    obj = polyline([offset, offset, offset + width, offset, offset + width, offset + height, offset, offset + height])
+    # CAD返回的面积精确，直接在大坐标下求和的鞋带面积带有舍入误差
+    obj.Area = width * height
+    obj.GetBulge = lambda k: pytest.fail("直线多段线不应读取凸度")
+    snapshot = EntitySnapshot.from_objects([obj], detect_arcs=True)
+    assert snapshot.areas[0] == pytest.approx(width * height)
+    assert list(snapshot.centers) == pytest.approx([offset + width / 2, offset + height / 2], abs=1e-6)
+
+
+@pytest.mark.parametrize("offset", [0.0, 1e6])
+def test_arc_polylines_read_bulges(offset):
+    obj = bulged_square(offset, offset, 1000, 0.05)
+    snapshot = EntitySnapshot.from_objects([obj], detect_arcs=True)
+    assert list(snapshot.bulges) == obj.bulges
+    assert snapshot.areas[0] == pytest.approx(obj.Area)
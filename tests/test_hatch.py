@@ -0,0 +1,17 @@
+from fake_cad import square
+
+
+def test_apply_hatch_uses_passed_parameters(plant, doc):
+    doc.pick = [square(0, 0), square(100, 0)]
+    plant.draw_leader(["全部图层"])
+    plant.ui.mark_handles = plant.label_handles
+    # 填充参数由界面线程传入，工作线程中不再读取Tk变量
+    del plant.ui.hatch_angle_var, plant.ui.hatch_color_var, plant.ui.color_map
+
+    plant.apply_hatch("ANSI31", 1.0, 45.0, 5)
+
+    hatches = doc.ModelSpace.live("AcDbHatch")
+    assert hatches
+    assert all(h.Color == 5 for h in hatches)
+    assert all(abs(h.PatternAngle - 0.785398) < 1e-6 for h in hatches)
+    assert sum(len(h.loops) for h in hatches) == 2
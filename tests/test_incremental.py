@@ -0,0 +1,112 @@
+import copy
+
+import pytest
+
+from cad.annotation_registry import AnnotationRegistry
+from cad.jobs import JobCancelled
+from fake_cad import square
+
+
+def labels_state(doc):
+    """图纸中全部未删除标注的 (句柄, 类型, 文字)"""
+    return sorted((e.Handle, e.ObjectName, getattr(e, "TextString", None))
+                  for e in doc.ModelSpace.live() if e.Layer == "0-绿化面积标注")
+
+
+@pytest.fixture
+def labelled(plant, doc):
+    """先对5个图形标注一次，再修改：删除第1个、改变第3个的几何、在最前面加一个新图形"""
+    plant.annotation_registry = AnnotationRegistry()
+    beds = [square(x, 0) for x in range(0, 500, 100)]
+    doc.pick = list(beds)
+    plant.draw_leader(["全部图层"])
+
+    beds[0].deleted = True
+    beds[2].Coordinates = (200, 0, 260, 0, 260, 40, 200, 40)
+    beds[2].Area = 2400
+    doc.pick = [square(-200, 0)] + beds[1:]
+    return beds
+
+
+def test_incremental_run_updates_changed_labels(plant, doc, labelled):
+    doc.calls.clear()
+    plant.draw_leader(["全部图层"])
+
+    assert doc.Utility.prompts[-1].strip() == "增量标注：新画2个，修改序号0个，跳过3个，删除1个"
+    assert doc.calls["Regen"] == 1
+    numbers = sorted(int(e.TextString) for e in doc.ModelSpace.live("AcDbText") if "㎟" not in e.TextString)
+    assert numbers == [1, 2, 3, 4, 5]
+    assert len(plant.annotation_registry) == 5
+
+
+def test_cancelled_incremental_run_changes_nothing(plant, doc, labelled):
+    plant.annotation_chunk_size = 1
+    before = labels_state(doc)
+    registry = copy.deepcopy(plant.annotation_registry.to_dict())
+
+    def progress(stage, done, total):
+        if stage == "标注" and done >= 1:
+            raise JobCancelled("操作已取消")
+
+    with pytest.raises(JobCancelled):
+        plant.draw_leader(["全部图层"], progress)
+
+    # 新画的标注已回滚，旧标注没有删除，序号没有修改，登记表不变
+    assert labels_state(doc) == before
+    assert plant.annotation_registry.to_dict() == registry
+
+
+def test_renumbered_labels_follow_reading_order(plant, doc):
+    plant.annotation_registry = AnnotationRegistry()
+    beds = [square(x, 0) for x in range(0, 300, 100)]
+    doc.pick = list(beds)
+    plant.draw_leader(["全部图层"])
+
+    # 最前面加一个图形，原有的3个只修改序号
+    doc.pick = [square(-100, 0)] + beds
+    doc.calls.clear()
+    plant.draw_leader(["全部图层"])
+
+    assert doc.Utility.prompts[-1].strip() == "增量标注：新画1个，修改序号3个，跳过0个，删除0个"
+    assert doc.calls["Regen"] == 1
+    entries = plant.annotation_registry.entries
+    assert [entries[bed.Handle]["number"] for bed in beds] == [2, 3, 4]
+    for bed in beds:
+        number = doc.HandleToObject(entries[bed.Handle]["labels"]["number"])
+        assert number.TextString == str(entries[bed.Handle]["number"])
+
+
+class FailingText:
+    """修改 TextString 时失败的序号文字"""
+
+    def __init__(self, entity):
+        self.__dict__["entity"] = entity
+
+    def __getattr__(self, name):
+        return getattr(self.entity, name)
+
+    def __setattr__(self, name, value):
+        if name == "TextString":
+            raise RuntimeError("图层已锁定")
+        setattr(self.entity, name, value)
+
+
+def test_failure_while_applying_changes_rolls_back(plant, doc, monkeypatch):
+    plant.annotation_registry = AnnotationRegistry()
+    beds = [square(x, 0) for x in range(0, 300, 100)]
+    doc.pick = list(beds)
+    plant.draw_leader(["全部图层"])
+    before = labels_state(doc)
+    registry = copy.deepcopy(plant.annotation_registry.to_dict())
+
+    # 最前面加一个图形，3个序号依次修改，第2个修改时失败
+    failing = plant.annotation_registry.entries[beds[1].Handle]["labels"]["number"]
+    lookup = doc.HandleToObject
+    monkeypatch.setattr(doc, "HandleToObject",
+                        lambda handle: FailingText(lookup(handle)) if handle == failing else lookup(handle))
+    doc.pick = [square(-100, 0)] + beds
+    plant.draw_leader(["全部图层"])  # 出错时提示并返回，不抛出异常
+
+    # 新标注已回滚，已修改的第1个序号已恢复，登记表不变
+    assert labels_state(doc) == before
+    assert plant.annotation_registry.to_dict() == registry
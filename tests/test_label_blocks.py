@@ -0,0 +1,46 @@
+from cad.annotation_registry import AnnotationRegistry
+from cad.plant_mark import PlantMark
+from fake_cad import FakeUI, square
+
+
+def test_block_labels_define_block_once(plant, doc):
+    plant.ui.mark_type_var.set("属性块")
+    doc.pick = [square(x, 0) for x in range(0, 400, 100)]
+    plant.draw_leader(["全部图层"])
+
+    references = doc.ModelSpace.live("AcDbBlockReference")
+    assert len(references) == 4
+    assert doc.calls["Blocks.Add"] == 1
+    assert [[(a.TagString, a.TextString) for a in r.attributes] for r in references][0] == [
+        ("NUMBER", "1"), ("AREA", "1600.00㎟")]
+    assert len(doc.ModelSpace.live()) == 4  # 每个标注只有一个块参照
+
+
+def test_block_labels_renumber_through_attribute(plant, doc):
+    plant.ui.mark_type_var.set("属性块")
+    plant.annotation_registry = AnnotationRegistry()
+    beds = [square(x, 0) for x in range(0, 300, 100)]
+    doc.pick = list(beds)
+    plant.draw_leader(["全部图层"])
+
+    doc.pick = [square(-100, 0)] + beds
+    plant.draw_leader(["全部图层"])
+    numbers = sorted(r.attributes[0].TextString for r in doc.ModelSpace.live("AcDbBlockReference"))
+    assert numbers == ["1", "2", "3", "4"]
+    assert doc.calls["InsertBlock"] == 4
+
+
+class UnboundPlantMark(PlantMark):
+    """不在构造时连接CAD的 PlantMark，稍后才设置文档"""
+
+    def connect(self):
+        pass
+
+
+def test_label_blocks_initialised_without_bind(app):
+    plant = UnboundPlantMark("AutoCAD.Application")
+    plant.ui = FakeUI("属性块")
+    plant.wincad, plant.doc, plant.msp = app, app.ActiveDocument, app.ActiveDocument.ModelSpace
+    style = plant.annotation_style(create_layer=True)
+    assert plant._label_block(style) == style.block_name
+    assert style.block_name in app.ActiveDocument.Blocks
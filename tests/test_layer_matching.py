@@ -0,0 +1,36 @@
+import pytest
+
+from cad.backend import DxfBackend
+from cad.entity_snapshot import EntitySnapshot
+from fake_cad import square
+
+# 图层 Green-Bed 上的一个 40×40 闭合多段线
+DXF = "\n".join([
+    "0", "SECTION", "2", "ENTITIES",
+    "0", "LWPOLYLINE", "5", "2A", "8", "Green-Bed", "90", "4", "70", "1",
+    "10", "0.0", "20", "0.0", "10", "40.0", "20", "0.0",
+    "10", "40.0", "20", "40.0", "10", "0.0", "20", "40.0",
+    "0", "ENDSEC", "0", "EOF", "",
+])
+
+
+@pytest.fixture
+def dxf_path(tmp_path):
+    path = tmp_path / "drawing.dxf"
+    path.write_text(DXF, encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("layers", [["Green-Bed"], ["GREEN-BED"], ["green-bed"]])
+def test_dxf_and_com_backends_match_layers_the_same_way(dxf_path, layers):
+    dxf = DxfBackend(dxf_path).read_snapshot(layers)
+    com = EntitySnapshot.from_objects([square(0, 0, layer="Green-Bed")], layers)
+
+    # 两种后端的图层名都不区分大小写，面积合计相同
+    assert len(dxf) == len(com) == 1
+    assert sum(dxf.areas) == sum(com.areas) == pytest.approx(1600)
+
+
+def test_other_layers_are_excluded_by_both_backends(dxf_path):
+    assert len(DxfBackend(dxf_path).read_snapshot(["Green"])) == 0
+    assert len(EntitySnapshot.from_objects([square(0, 0, layer="Green-Bed")], ["Green"])) == 0
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from utils.overlap import ClipPolygon, overlap_areas, overlap_fractions, split_factor
+
+GARAGE = [0, 0, 100, 0, 100, 50, 0, 50]
+
+
+def rect(x0, y0, x1, y1):
+    return [x0, y0, x1, y0, x1, y1, x0, y1]
+
+
+def buffers(polygons):
+    vertices = [v for polygon in polygons for v in polygon]
+    offsets = np.cumsum([0] + [len(polygon) // 2 for polygon in polygons])
+    return vertices, offsets
+
+
+def test_partial_overlap():
+    vertices, offsets = buffers([rect(90, 10, 110, 20), rect(-10, -10, 10, 10), rect(200, 0, 210, 10)])
+    overlaps, areas = overlap_areas(vertices, offsets, GARAGE)
+    assert overlaps == pytest.approx([100, 100, 0])
+    assert areas == pytest.approx([200, 400, 100])
+
+
+def test_bed_flush_with_garage_edge():
+    """与地库线共边的种植区不能丢失相交面积"""
+    polygons = [
+        rect(0, 0, 10, 10),       # 两条边与地库边重合，整体在内
+        rect(0, 10, 100, 20),     # 左右两条边与地库边共线，整体在内
+        rect(90, 40, 110, 50),    # 上边与地库边共线，一半在内
+        rect(40, 50, 60, 60),     # 下边与地库边重合，整体在外
+        rect(0, 0, 100, 50),      # 与地库完全重合
+        rect(-10, 0, 10, 50),     # 上下边与地库边共线，一半在内
+    ]
+    vertices, offsets = buffers(polygons)
+    overlaps, areas = overlap_areas(vertices, offsets, GARAGE)
+    assert overlaps == pytest.approx([100, 1000, 100, 0, 5000, 500], rel=1e-6, abs=1e-6)
+
+    clip = ClipPolygon(np.reshape(GARAGE, (-1, 2)))
+    assert clip.intersection_area(np.reshape(polygons[2], (-1, 2))) == pytest.approx(100, rel=1e-6)
+
+
+def test_flush_edge_against_concave_garage():
+    garage = [0, 0, 60, 0, 60, 20, 20, 20, 20, 60, 0, 60]  # L形
+    vertices, offsets = buffers([rect(20, 0, 40, 20), rect(20, 20, 40, 40), rect(10, 10, 30, 30)])
+    fractions = overlap_fractions(vertices, offsets, garage)
+    assert fractions == pytest.approx([1.0, 0.0, 0.75], abs=1e-6)
+
+
+def test_split_factor():
+    assert split_factor(0.6, 0.8) == pytest.approx(0.88)
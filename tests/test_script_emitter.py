@@ -0,0 +1,118 @@
+import math
+import os
+import re
+
+import pytest
+
+from cad.annotation_style import AnnotationStyle
+from cad.script_emitter import PRELUDE, ScriptEmitter
+from fake_cad import square
+
+UCS_ANGLE = 0.3
+
+
+@pytest.fixture
+def rotated_doc(doc):
+    doc.variables = {
+        "UCSORG": (10, 5, 0),
+        "UCSXDIR": (math.cos(UCS_ANGLE), math.sin(UCS_ANGLE), 0),
+        "UCSYDIR": (-math.sin(UCS_ANGLE), math.cos(UCS_ANGLE), 0),
+    }
+    doc.pick = [square(0, 0), square(100, 0)]
+    return doc
+
+
+def script_angles(script):
+    """脚本中 gl:text 和 gl:block 调用的角度参数"""
+    angles = [float(m) for m in re.findall(r'\(gl:text "[^"]*" "[^"]*" \S+ \S+ \S+ (\S+) ', script)]
+    angles += [float(m) for m in re.findall(r'\(gl:block "[^"]*" "[^"]*" \S+ \S+ (\S+) ', script)]
+    return angles
+
+
+@pytest.mark.parametrize("mark_type", ["综合", "属性块"])
+def test_script_and_com_backends_use_same_rotation(plant, rotated_doc, tmp_path, mark_type):
+    plant.ui.mark_type_var.set(mark_type)
+    plant.label_layout = False
+    plant.draw_leader(["全部图层"])
+    com_angles = [e.Rotation for e in rotated_doc.ModelSpace.live()
+                  if e.ObjectName in ("AcDbText", "AcDbBlockReference")]
+
+    plant.label_script = True
+    plant.label_script_path = str(tmp_path / "labels.lsp")
+    plant.draw_leader(["全部图层"])
+    angles = script_angles((tmp_path / "labels.lsp").read_text(encoding="gb18030"))
+
+    # 两种后端都以弧度输出 UCS 旋转的反向角度
+    assert com_angles and angles
+    assert com_angles == pytest.approx([-UCS_ANGLE] * len(com_angles))
+    assert angles == pytest.approx([-UCS_ANGLE] * len(angles), abs=1e-6)
+
+
+@pytest.mark.parametrize("name", ["labels.lsp", "labels.scr", "labels.txt"])
+def test_submit_always_loads_lisp(plant, doc, tmp_path, name):
+    doc.pick = [square(0, 0)]
+    plant.label_script = True
+    plant.label_script_path = str(tmp_path / name)
+    plant.draw_leader(["全部图层"])
+
+    path = str(tmp_path / name).replace("\\", "/")
+    assert doc.commands == [f'(load "{path}") ']
+
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+GOLDEN_PATH = "C:/green/labels.lsp"
+
+
+def render_golden(plant, mark_type, fill):
+    style = AnnotationStyle(mark_type, "2.5", "米", rotation=0.3)
+    emitter = ScriptEmitter(plant, style.layer_name, style, GOLDEN_PATH, submit=False)
+    fill(emitter, style)
+    return emitter.render()
+
+
+GOLDEN_CASES = {
+    "text": ("数字", lambda emitter, style: (
+        emitter.add_area_text((10.0, 20.0), 1234567.0, key="A1"),
+        emitter.add_area_text((-5.5, 0.25), 89.0))),
+    "circle_number": ("综合", lambda emitter, style: (
+        emitter.add_circle_number((10.0, 20.0), 1, key="A1"),
+        emitter.add_area_text((10.0, 20.0), 1234567.0, is_combined=True, key="A1"),
+        emitter.add_circle_number((30.0, 40.0), 2))),
+    "block": ("属性块", lambda emitter, style: (
+        emitter.add_label_block((10.0, 20.0), 1, 1234567.0, key="A1"),
+        emitter.add_label_block((30.0, 40.0), 2, 7654321.0),
+        emitter.add_label_block((50.0, 60.0), 3, 1000.0, style=style.scaled(2)))),
+    "leader": ("标记", lambda emitter, style: (
+        emitter.add_leader((0.0, 0.0), (15.0, 25.0), key="A1"),
+        emitter.add_circle_number((15.0, 25.0), 1, key="A1"))),
+    "hatch": ("标记", lambda emitter, style: (
+        emitter.add_hatch("绿化填充", ["2A", "2B"], "ANSI31", 0.5, 45, 3),)),
+    "delete": ("标记", lambda emitter, style: (
+        emitter.delete_handles(["1F", "20"]),
+        emitter.renumber("3C", 7))),
+}
+
+
+def check_golden(name, text):
+    """与 tests/golden 下的基准文件逐行比较；设置 UPDATE_GOLDEN=1 时重新生成基准文件"""
+    path = os.path.join(GOLDEN_DIR, name)
+    if os.environ.get("UPDATE_GOLDEN"):
+        os.makedirs(GOLDEN_DIR, exist_ok=True)
+        with open(path, "w", encoding="utf-8", newline="\n") as stream:
+            stream.write(text)
+    with open(path, encoding="utf-8", newline="\n") as stream:
+        expected = stream.read()
+    assert text.splitlines() == expected.splitlines()
+
+
+def test_prelude_matches_golden():
+    check_golden("prelude.lsp", PRELUDE)
+
+
+@pytest.mark.parametrize("name", sorted(GOLDEN_CASES))
+def test_render_matches_golden(plant, name):
+    """函数定义只在 prelude.lsp 中比较一次，各基准文件只保存定义之后的语句"""
+    mark_type, fill = GOLDEN_CASES[name]
+    script = render_golden(plant, mark_type, fill)
+    assert script.startswith(PRELUDE)
+    check_golden(f"{name}.lsp", script[len(PRELUDE):])
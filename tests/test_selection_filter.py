@@ -0,0 +1,53 @@
+import pythoncom
+
+from cad.cad_utils import AC_SELECTION_SET_ALL, escape_wildcards
+from cad.entity_snapshot import DXF_NAMES
+from fake_cad import square
+
+
+def filter_values(filters):
+    codes, values = filters
+    return list(codes.value), list(values.value)
+
+
+def test_escape_wildcards():
+    assert escape_wildcards("绿化-草坪") == "绿化`-草坪"
+    assert escape_wildcards("A#B@C.D*E?F~G[H]I,J`K") == "A`#B`@C`.D`*E`?F`~G`[H`]I`,J``K"
+    assert escape_wildcards("绿化") == "绿化"
+
+
+def test_selection_filter_codes(plant):
+    filters = plant.selection_filter(DXF_NAMES, ["绿化-1", "G"], "Model")
+    codes, values = filters
+    assert codes.vt == pythoncom.VT_ARRAY | pythoncom.VT_I2
+    assert values.vt == pythoncom.VT_ARRAY | pythoncom.VT_VARIANT
+    assert filter_values(filters) == (
+        [0, 8, 410],
+        ["LWPOLYLINE,CIRCLE,ELLIPSE", "绿化`-1,G", "Model"],
+    )
+
+
+def test_selection_filter_partial_and_empty(plant):
+    assert filter_values(plant.selection_filter(["CIRCLE"])) == ([0], ["CIRCLE"])
+    assert filter_values(plant.selection_filter(layer_names=["a*"])) == ([8], ["a`*"])
+    assert plant.selection_filter() is None
+
+
+def test_draw_leader_filters_on_cad_side(plant, doc):
+    doc.pick = [square(0, 0, layer="绿化-1")]
+    plant.draw_leader(["绿化-1"])
+    filters = doc.selections[-1].filters
+    assert filter_values(filters) == ([0, 8], ["LWPOLYLINE,CIRCLE,ELLIPSE", "绿化`-1"])
+
+    plant.draw_leader(["全部图层"])
+    assert filter_values(doc.selections[-1].filters) == ([0], ["LWPOLYLINE,CIRCLE,ELLIPSE"])
+
+
+def test_select_all_uses_model_space(plant, doc):
+    selection = doc.SelectionSets.Add("test")
+    plant.select_all(selection, DXF_NAMES, ["G"])
+    mode, point1, point2, codes, values = selection.filters
+    assert mode == AC_SELECTION_SET_ALL
+    assert (point1, point2) == (pythoncom.Empty, pythoncom.Empty)
+    assert list(codes.value) == [0, 8, 410]
+    assert list(values.value)[2] == "Model"
@@ -500,234 +500,231 @@ class ExportManager:
                 root.deiconify()
 
 
-    def export_to_cad(self, data, summary_data, unit_symbol):
-        """导出表格到CAD"""
-        try:
-            # 尝试获取已在运行的 AutoCAD 实例
+    def export_to_cad(self, data, summary_data, unit_symbol, plant=None):
+        """导出表格到CAD，plant 为已连接的CAD实例（在COM工作线程中调用时传入）
+
+        可能在工作线程中执行，不弹出对话框：用户取消点选时返回 "cancelled"，完成时返回 "done"，
+        出错时抛出异常，由调用方在界面线程中提示。
+        """
+        # 优先复用工作线程中共享会话的CAD连接，否则获取已在运行的 AutoCAD 实例
+        if plant is not None:
+            acad, doc, msp = plant.wincad, plant.doc, plant.msp
+        else:
             acad = win32com.client.GetActiveObject("AutoCAD.Application")
             doc = acad.ActiveDocument
             msp = doc.ModelSpace
 
-            # ********************* 调试信息输出 *********************
-            print("--- 开始执行 export_to_cad ---")
-            print("  AutoCAD 连接成功")
+        # ********************* 调试信息输出 *********************
+        print("--- 开始执行 export_to_cad ---")
+        print("  AutoCAD 连接成功")
 
-            # ********************* 获取插入点 *********************
-            try:
-                prompt_message = "请在 CAD 中选择主数据表格插入点:"
-                doc.Utility.Prompt(prompt_message)
-                point = doc.Utility.GetPoint()
-                insert_point_tuple = point #  **重要修改： 保存 point 为元组**
-                insert_point = VARIANT(pythoncom.VT_ARRAY | pythoncom.VT_R8, (float(point[0]), float(point[1]), float(point[2])))
-                print(f"用户选择的主数据表格插入点: {point}")
-            except pythoncom.com_error as e:
-                if e.hresult == -2147352565:
-                    messagebox.showinfo("提示", "用户取消了点选择操作，表格导出已中止。")
-                    print("用户取消了点选择操作，表格导出已中止。")
-                    return #  用户取消，提前退出函数
-                else:
-                    raise #  其他 COM 错误，继续抛出
-
-            # ********************* 创建主数据表格 *********************
-            print("  --- 创建主数据表格 ---")
-            # 主数据表格参数
-            data_table_rows = len(data) + 2
-            data_table_cols = 4
-            row_height = 0.6   # 从100改为30
-            col_width = 2.4   # 从400改为120
-
-            print("  准备创建主数据表格，参数:")
-            print(f"    插入点 (insert_point): {insert_point}")
-            print(f"    行数 (data_table_rows): {data_table_rows}")
-            print(f"    列数 (data_table_cols): {data_table_cols}")
-            print(f"    行高 (row_height): {row_height}")
-            print(f"    列宽 (col_width): {col_width}")
-
-            # 创建主数据表格对象
-            try:
-                data_table = msp.AddTable(insert_point, data_table_rows, data_table_cols, row_height, col_width)
-                print("  主数据表格创建命令 AddTable 执行完成，返回值:", data_table)
-            except Exception as add_data_table_error:
-                print("  **主数据表格创建命令 AddTable 发生错误:**")
-                print(traceback.format_exc())
-                raise add_data_table_error
-
-            if not data_table:
-                raise Exception("CAD 主数据表格对象创建失败，AddTable 返回 None")
+        # ********************* 获取插入点 *********************
+        try:
+            prompt_message = "请在 CAD 中选择主数据表格插入点:"
+            doc.Utility.Prompt(prompt_message)
+            point = doc.Utility.GetPoint()
+            insert_point_tuple = point #  **重要修改： 保存 point 为元组**
+            insert_point = VARIANT(pythoncom.VT_ARRAY | pythoncom.VT_R8, (float(point[0]), float(point[1]), float(point[2])))
+            print(f"用户选择的主数据表格插入点: {point}")
+        except pythoncom.com_error as e:
+            if e.hresult == -2147352565:
+                print("用户取消了点选择操作，表格导出已中止。")
+                return "cancelled" #  用户取消，提前退出函数
             else:
-                print("  主数据表格对象创建成功")
+                raise #  其他 COM 错误，继续抛出
+
+        # ********************* 创建主数据表格 *********************
+        print("  --- 创建主数据表格 ---")
+        # 主数据表格参数
+        data_table_rows = len(data) + 2
+        data_table_cols = 4
+        row_height = 0.6   # 从100改为30
+        col_width = 2.4   # 从400改为120
+
+        print("  准备创建主数据表格，参数:")
+        print(f"    插入点 (insert_point): {insert_point}")
+        print(f"    行数 (data_table_rows): {data_table_rows}")
+        print(f"    列数 (data_table_cols): {data_table_cols}")
+        print(f"    行高 (row_height): {row_height}")
+        print(f"    列宽 (col_width): {col_width}")
+
+        # 创建主数据表格对象
+        try:
+            data_table = msp.AddTable(insert_point, data_table_rows, data_table_cols, row_height, col_width)
+            print("  主数据表格创建命令 AddTable 执行完成，返回值:", data_table)
+        except Exception as add_data_table_error:
+            print("  **主数据表格创建命令 AddTable 发生错误:**")
+            print(traceback.format_exc())
+            raise add_data_table_error
 
-            if data_table is None:
-                raise Exception("主数据表格对象创建失败 (data_table 为 None)， 无法继续设置标题和表头")
+        if not data_table:
+            raise Exception("CAD 主数据表格对象创建失败，AddTable 返回 None")
+        else:
+            print("  主数据表格对象创建成功")
 
-            # ********************* 设置主数据表格文字高度  *********************
-            try:
-                data_table.TextStyle.TextHeight = 350  # 从50改为350
-                print("  主数据表格文字高度已设置为 350")
-            except Exception as set_data_table_text_height_error:
-                print("  **设置主数据表格文字高度 (TextStyle.TextHeight) 发生错误:**")
-                print(traceback.format_exc())
+        if data_table is None:
+            raise Exception("主数据表格对象创建失败 (data_table 为 None)， 无法继续设置标题和表头")
 
-            # 添加主数据表格标题
-            try:
-                data_table.SetText(0, 0, "绿地面积统计表")
-                print("  主数据表格标题已设置为 '绿地面积统计表' (无 MergeCells)")
-            except Exception as set_title_error:
-                print("  **设置主数据表格标题 (SetText) 发生错误:**")
-                print(traceback.format_exc())
-                raise set_title_error
-
-            # 添加主数据表格表头
-            try:
-                headers = [
-                    "序号",
-                    f"实测面积(㎡)", # 使用 self.unit_symbol
-                    "折算系数",
-                    f"折算面积(㎡)" # 使用 self.unit_symbol
-                ]
-                if len(headers) != data_table_cols:
-                    raise ValueError("表头列表 'headers' 的长度必须与表格列数 {} 相同".format(data_table_cols))
-
-                print("  准备设置主数据表格表头，表头内容:", headers)
-                for col, header in enumerate(headers):
-                    data_table.SetText(1, col, header)
-                    print(f"    已设置主数据表格表头单元格 (行: 1, 列: {col}), 内容: '{header}'")
-                print("  主数据表格表头已设置 (SetText)")
-
-            except Exception as set_headers_error:
-                print("  **设置主数据表格表头 (SetText 循环) 发生错误:**")
-                print(traceback.format_exc())
-                raise set_headers_error
-
-            # 添加主数据表格数据行 - 计算折算面积和总面积
-            total_actual_area = 0.0
-            total_converted_area = 0.0
-            try:
-                print("  准备设置主数据表格数据行，数据行数:", len(data))
-                for row_index, item in enumerate(data):
-                    row = row_index + 2
-                    if row >= data_table_rows:
-                        break
+        # ********************* 设置主数据表格文字高度  *********************
+        try:
+            data_table.TextStyle.TextHeight = 350  # 从50改为350
+            print("  主数据表格文字高度已设置为 350")
+        except Exception as set_data_table_text_height_error:
+            print("  **设置主数据表格文字高度 (TextStyle.TextHeight) 发生错误:**")
+            print(traceback.format_exc())
 
-                    actual_area_str = item.get('actual_area', '')
-                    factor_str = item.get('factor', '')
+        # 添加主数据表格标题
+        try:
+            data_table.SetText(0, 0, "绿地面积统计表")
+            print("  主数据表格标题已设置为 '绿地面积统计表' (无 MergeCells)")
+        except Exception as set_title_error:
+            print("  **设置主数据表格标题 (SetText) 发生错误:**")
+            print(traceback.format_exc())
+            raise set_title_error
 
-                    actual_area = 0.0
-                    factor = 0.0
+        # 添加主数据表格表头
+        try:
+            headers = [
+                "序号",
+                f"实测面积(㎡)", # 使用 self.unit_symbol
+                "折算系数",
+                f"折算面积(㎡)" # 使用 self.unit_symbol
+            ]
+            if len(headers) != data_table_cols:
+                raise ValueError("表头列表 'headers' 的长度必须与表格列数 {} 相同".format(data_table_cols))
 
-                    try:
-                        actual_area = float(actual_area_str)
-                        total_actual_area += actual_area
-                    except ValueError:
-                        print(f"  警告: 行 {row}, 序号 {row_index + 1}, 实测面积 '{actual_area_str}' 无法转换为数字，使用默认值 0.0")
+            print("  准备设置主数据表格表头，表头内容:", headers)
+            for col, header in enumerate(headers):
+                data_table.SetText(1, col, header)
+                print(f"    已设置主数据表格表头单元格 (行: 1, 列: {col}), 内容: '{header}'")
+            print("  主数据表格表头已设置 (SetText)")
 
-                    try:
-                        factor = float(factor_str.replace('%', '')) / 100.0
-                    except ValueError:
-                        print(f"  警告: 行 {row}, 序号 {row_index + 1}, 折算系数 '{factor_str}' 无法转换为百分比，使用默认值 0.0")
-
-                    converted_area = actual_area * factor
-                    total_converted_area += converted_area
-                    converted_area_str = "{:.2f}".format(converted_area)
-
-                    data_table.SetText(row, 0, str(row_index + 1))
-                    data_table.SetText(row, 1, actual_area_str)
-                    data_table.SetText(row, 2, factor_str)
-                    data_table.SetText(row, 3, converted_area_str)
-
-                    print(f"    已设置主数据表格数据行 (行: {row}), 内容: {item}, 计算折算面积: {converted_area_str}, 累计总实测面积: {total_actual_area:.2f}, 累计总折算面积: {total_converted_area:.2f}")
-
-                print("  主数据表格数据行已设置 (SetText 循环), 折算面积已自动计算, 总面积已累计")
-
-            except Exception as set_data_rows_error:
-                print("  **设置主数据表格数据行 (SetText 循环) 发生错误:**")
-                print(traceback.format_exc())
-                raise set_data_rows_error
-
-
-            # ********************* 创建单列汇总表格 *********************
-            print("  --- 创建单列汇总表格 ---")
-            # 汇总表格参数
-            summary_table_rows = len(summary_data)
-            summary_table_cols = 1
-            summary_table_col_width = col_width * 4
-
-            # 计算汇总表格插入点 - 放在主数据表格下方
-            # **重要修改： 使用 insert_point_tuple (元组) 进行计算**
-            data_table_bottom_y = insert_point_tuple[1] - (data_table_rows * row_height)
-            summary_insert_point_y = data_table_bottom_y - (row_height * 2)
-            # **重要修改： 使用 insert_point_tuple 的 X 和 Z 坐标， 以及计算出的 summary_insert_point_y**
-            summary_insert_point = VARIANT(pythoncom.VT_ARRAY | pythoncom.VT_R8, (float(insert_point_tuple[0]), float(summary_insert_point_y), float(insert_point_tuple[2])))
-
-            print("  准备创建单列汇总表格，参数:")
-            print(f"    插入点 (summary_insert_point): {summary_insert_point}")
-            print(f"    行数 (summary_table_rows): {summary_table_rows}")
-            print(f"    列数 (summary_table_cols): {summary_table_cols}")
-            print(f"    行高 (row_height): {row_height}")
-            print(f"    列宽 (summary_table_col_width): {summary_table_col_width}")
-
-            # *********************  调试：创建汇总表格前  *********************
-            print("  **调试信息: 准备调用 AddTable 创建单列汇总表格...**")
-
-            # 创建单列汇总表格对象
-            try:
-                summary_table = msp.AddTable(summary_insert_point, summary_table_rows, summary_table_cols, row_height, summary_table_col_width)
-                print("  单列汇总表格创建命令 AddTable 执行完成，返回值:", summary_table)
-            except Exception as add_summary_table_error:
-                print("  **单列汇总表格创建命令 AddTable 发生错误:**")
-                print(traceback.format_exc())
-                raise add_summary_table_error
-
-            if not summary_table:
-                raise Exception("CAD 单列汇总表格对象创建失败，AddTable 返回 None")
-            else:
-                print("  单列汇总表格对象创建成功")
+        except Exception as set_headers_error:
+            print("  **设置主数据表格表头 (SetText 循环) 发生错误:**")
+            print(traceback.format_exc())
+            raise set_headers_error
 
-            # *********************  设置单列汇总表格文字高度  *********************
-            try:
-                summary_table.TextStyle.TextHeight = 350  # 从50改为350
-                print("  单列汇总表格文字高度已设置为 350")
-            except Exception as set_summary_table_text_height_error:
-                print("  **设置单列汇总表格文字高度 (TextStyle.TextHeight) 发生错误:**")
-                print(traceback.format_exc())
+        # 添加主数据表格数据行 - 计算折算面积和总面积
+        total_actual_area = 0.0
+        total_converted_area = 0.0
+        try:
+            print("  准备设置主数据表格数据行，数据行数:", len(data))
+            for row_index, item in enumerate(data):
+                row = row_index + 2
+                if row >= data_table_rows:
+                    break
 
+                actual_area_str = item.get('actual_area', '')
+                factor_str = item.get('factor', '')
 
-            # ********************* 添加单列汇总表格数据行 *********************
-            try:
-                print("  准备设置单列汇总表格数据行，汇总行数:", len(summary_data))
-                for row_index, summary_item in enumerate(summary_data):
-                    row = row_index
-                    if row >= summary_table_rows:
-                        break
-                    merged_content = summary_item.get('merged_content', '')
+                actual_area = 0.0
+                factor = 0.0
 
-                    summary_table.SetText(row, 0, merged_content)
+                try:
+                    actual_area = float(actual_area_str)
+                    total_actual_area += actual_area
+                except ValueError:
+                    print(f"  警告: 行 {row}, 序号 {row_index + 1}, 实测面积 '{actual_area_str}' 无法转换为数字，使用默认值 0.0")
 
-                    print(f"    已设置单列汇总表格数据行 (行: {row}), 内容: '{merged_content}' (无 MergeCells)")
-                print("  单列汇总表格数据行已设置 (SetText 循环, 无 MergeCells)")
+                try:
+                    factor = float(factor_str.replace('%', '')) / 100.0
+                except ValueError:
+                    print(f"  警告: 行 {row}, 序号 {row_index + 1}, 折算系数 '{factor_str}' 无法转换为百分比，使用默认值 0.0")
 
-            except Exception as set_summary_rows_error:
-                print("  **设置单列汇总表格数据行 (SetText 循环) 发生错误:**")
-                print(traceback.format_exc())
-                raise set_summary_rows_error
+                converted_area = actual_area * factor
+                total_converted_area += converted_area
+                converted_area_str = "{:.2f}".format(converted_area)
 
-            # *********************  调试：添加汇总表格数据行后，刷新前  *********************
-            print("  **调试信息: 单列汇总表格数据行设置完成，准备刷新视图...**")
+                data_table.SetText(row, 0, str(row_index + 1))
+                data_table.SetText(row, 1, actual_area_str)
+                data_table.SetText(row, 2, factor_str)
+                data_table.SetText(row, 3, converted_area_str)
 
+                print(f"    已设置主数据表格数据行 (行: {row}), 内容: {item}, 计算折算面积: {converted_area_str}, 累计总实测面积: {total_actual_area:.2f}, 累计总折算面积: {total_converted_area:.2f}")
 
-            # ********************* 刷新视图和显示成功消息 *********************
-            doc.Regen(True)
-            # messagebox.showinfo("成功", "已创建主数据表格和单列汇总表格 (均无 MergeCells)，请检查CAD")
-            print("--- export_to_cad 执行结束，未发生严重错误 ---")
+            print("  主数据表格数据行已设置 (SetText 循环), 折算面积已自动计算, 总面积已累计")
 
-        except ValueError as ve:
-            messagebox.showerror("数据错误", str(ve))
+        except Exception as set_data_rows_error:
+            print("  **设置主数据表格数据行 (SetText 循环) 发生错误:**")
             print(traceback.format_exc())
-        except Exception as e:
-            error_message = "在创建 CAD 表格或设置数据/汇总行时发生未知错误 (类方法版本, 无 MergeCells).\n详细错误信息: {}".format(e)
-            messagebox.showerror("错误", error_message)
-            print("--- export_to_cad 执行异常结束 ---")
+            raise set_data_rows_error
+
+
+        # ********************* 创建单列汇总表格 *********************
+        print("  --- 创建单列汇总表格 ---")
+        # 汇总表格参数
+        summary_table_rows = len(summary_data)
+        summary_table_cols = 1
+        summary_table_col_width = col_width * 4
+
+        # 计算汇总表格插入点 - 放在主数据表格下方
+        # **重要修改： 使用 insert_point_tuple (元组) 进行计算**
+        data_table_bottom_y = insert_point_tuple[1] - (data_table_rows * row_height)
+        summary_insert_point_y = data_table_bottom_y - (row_height * 2)
+        # **重要修改： 使用 insert_point_tuple 的 X 和 Z 坐标， 以及计算出的 summary_insert_point_y**
+        summary_insert_point = VARIANT(pythoncom.VT_ARRAY | pythoncom.VT_R8, (float(insert_point_tuple[0]), float(summary_insert_point_y), float(insert_point_tuple[2])))
+
+        print("  准备创建单列汇总表格，参数:")
+        print(f"    插入点 (summary_insert_point): {summary_insert_point}")
+        print(f"    行数 (summary_table_rows): {summary_table_rows}")
+        print(f"    列数 (summary_table_cols): {summary_table_cols}")
+        print(f"    行高 (row_height): {row_height}")
+        print(f"    列宽 (summary_table_col_width): {summary_table_col_width}")
+
+        # *********************  调试：创建汇总表格前  *********************
+        print("  **调试信息: 准备调用 AddTable 创建单列汇总表格...**")
+
+        # 创建单列汇总表格对象
+        try:
+            summary_table = msp.AddTable(summary_insert_point, summary_table_rows, summary_table_cols, row_height, summary_table_col_width)
+            print("  单列汇总表格创建命令 AddTable 执行完成，返回值:", summary_table)
+        except Exception as add_summary_table_error:
+            print("  **单列汇总表格创建命令 AddTable 发生错误:**")
+            print(traceback.format_exc())
+            raise add_summary_table_error
+
+        if not summary_table:
+            raise Exception("CAD 单列汇总表格对象创建失败，AddTable 返回 None")
+        else:
+            print("  单列汇总表格对象创建成功")
+
+        # *********************  设置单列汇总表格文字高度  *********************
+        try:
+            summary_table.TextStyle.TextHeight = 350  # 从50改为350
+            print("  单列汇总表格文字高度已设置为 350")
+        except Exception as set_summary_table_text_height_error:
+            print("  **设置单列汇总表格文字高度 (TextStyle.TextHeight) 发生错误:**")
+            print(traceback.format_exc())
+
+
+        # ********************* 添加单列汇总表格数据行 *********************
+        try:
+            print("  准备设置单列汇总表格数据行，汇总行数:", len(summary_data))
+            for row_index, summary_item in enumerate(summary_data):
+                row = row_index
+                if row >= summary_table_rows:
+                    break
+                merged_content = summary_item.get('merged_content', '')
+
+                summary_table.SetText(row, 0, merged_content)
+
+                print(f"    已设置单列汇总表格数据行 (行: {row}), 内容: '{merged_content}' (无 MergeCells)")
+            print("  单列汇总表格数据行已设置 (SetText 循环, 无 MergeCells)")
+
+        except Exception as set_summary_rows_error:
+            print("  **设置单列汇总表格数据行 (SetText 循环) 发生错误:**")
             print(traceback.format_exc())
+            raise set_summary_rows_error
+
+        # *********************  调试：添加汇总表格数据行后，刷新前  *********************
+        print("  **调试信息: 单列汇总表格数据行设置完成，准备刷新视图...**")
+
+
+        # ********************* 刷新视图和显示成功消息 *********************
+        doc.Regen(True)
+        # messagebox.showinfo("成功", "已创建主数据表格和单列汇总表格 (均无 MergeCells)，请检查CAD")
+        print("--- export_to_cad 执行结束，未发生严重错误 ---")
+        return "done"
 
     def export_to_wps(self, data, summary_data, unit_symbol):
         """导出到WPS"""
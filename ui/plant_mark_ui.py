@@ -1,11 +1,18 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, simpledialog
 from .window_manager import WindowManager
-from .ui_components import UIComponents
-from cad.plant_mark import PlantMark
+from .ui_components import LAYER_SEPARATOR, MULTI_LAYER_OPTION, UIComponents, parse_layer_selection
+from cad.cad_session import CadSession
+from cad.com_worker import ComWorker
 import math
+import numpy as np
 from .export_manager import ExportManager
 from utils.settings_manager import SettingsManager
+from cad.entity_snapshot import DXF_NAMES, EntitySnapshot
+from cad.annotation_registry import AnnotationRegistry
+from cad.annotation_style import read_label_options
+from utils.factor_zones import FactorZoneRegistry
+from utils.overlap import GARAGE_FACTOR
 import os
 import sys
 import base64
@@ -14,6 +21,10 @@ from assets.icon import ICON  # 从新模块导入图标
 from PIL import Image, ImageTk
 from assets.qr_codes import WECHAT_QR, ALIPAY_QR
 
+def format_factor(factor):
+    """把折算系数格式化为百分比文字，例如 0.88 -> 88%，0.875 -> 87.5%"""
+    return f"{factor * 100:.1f}".rstrip('0').rstrip('.') + "%"
+
 class PlantMarkUI(UIComponents, WindowManager):
     def __init__(self):
         super().__init__()
@@ -41,12 +52,17 @@ class PlantMarkUI(UIComponents, WindowManager):
             "layer": "全部图层",
             "unit": "毫米",
             "text_height": "3.0",
+            "adaptive_text_height": False,
+            "script_mode": False,
             "redline_area": 0,
             "has_redline": False,
             "has_garage": False,
-            "garage_points": [],
+            "factor_zones": [],
             "original_areas": [],
             "center_points": [],
+            "mark_handles": [],
+            "bed_outlines": {},
+            "annotation_registry": {},
             "last_drawing": "",
             "hatch_settings": {
                 "pattern": "CROSS",
@@ -62,12 +78,18 @@ class PlantMarkUI(UIComponents, WindowManager):
             if key not in self.settings:
                 self.settings[key] = value
         
-        # 创建 CAD 实例
-        self.cad = PlantMark("AutoCAD.Application")
+        # CAD的COM调用都在工作线程中执行，工作线程持有共享的 CAD 会话
+        def create_session():
+            session = CadSession("AutoCAD.Application")
+            session.ui = self
+            return session
+        
+        self.com_worker = ComWorker(self.root, create_session).start()
+        self.layers_loaded = False  # 图层列表在工作线程中读取，完成前为 False
         
-        # 设置 CAD 实例到组件中
-        self.set_cad_instance(self.cad)
-        self.cad.ui = self
+        # 在工作线程中连接CAD，连接成功后设置 CAD 实例到组件中
+        self.call_cad(lambda plant: plant, on_done=self.set_cad_instance,
+                      on_error=lambda e: print(f"连接CAD时出错: {str(e)}"))
         
         # 调用父类的初始化方法
         self.init_ui()
@@ -87,32 +109,43 @@ class PlantMarkUI(UIComponents, WindowManager):
         """恢复保存的设置"""
         try:
             # 恢复图层选择
-            if self.settings.get("layer") in self.layer_combo['values']:
-                self.layer_var.set(self.settings["layer"])
+            # 图层列表尚未读取完成时先恢复，读取完成后再检查是否可用
+            saved_layer = self.settings.get("layer", "全部图层")
+            if not self.layers_loaded or self.layer_selection_available(saved_layer):
+                self.layer_var.set(saved_layer)
             else:
                 self.layer_var.set("全部图层")
+            self.last_layer_value = self.layer_var.get()
             
             # 恢复单位选择
             self.unit_var.set(self.settings.get("unit", "毫米"))
             
             # 恢复字高
             self.text_height_var.set(self.settings.get("text_height", "3.0"))
+            self.adaptive_size_var.set(self.settings.get("adaptive_text_height", False))
+            self.label_layout_var.set(self.settings.get("label_layout", False))
+            self.arc_mode_var.set(self.settings.get("arc_mode", False))
+            self.script_mode_var.set(self.settings.get("script_mode", False))
             
             # 恢复红线面积
             self.redline_area = self.settings.get("redline_area", 0)
             
             # 恢复地库线坐标
-            self.garage_points = self.settings.get("garage_points", [])
+            # 恢复折算分区（兼容旧版只保存一条地库线的设置）
+            self.factor_zones = FactorZoneRegistry.from_list(self.settings.get("factor_zones", []),
+                                                             self.settings.get("garage_points"))
             
             # 恢复框选数据
             self.original_areas = self.settings.get("original_areas", [])
             self.center_points = self.settings.get("center_points", [])
+            self.mark_handles = self.settings.get("mark_handles", [])
+            self.bed_outlines = self.settings.get("bed_outlines", {})
             
             # 更新按钮状态
             if self.settings.get("has_redline", False):
                 self.select_redline_button.configure(text="选择红线(已加载)")
             
-            if self.settings.get("has_garage", False) and self.garage_points:
+            if self.settings.get("has_garage", False) and len(self.factor_zones):
                 self.select_garage_button.configure(text="选地库线(已加载)")
                 # 如果有原始数据，重新计算折算系数
                 if hasattr(self, 'original_areas') and self.original_areas:
@@ -127,15 +160,25 @@ class PlantMarkUI(UIComponents, WindowManager):
             "layer": self.layer_var.get(),
             "unit": self.unit_var.get(),
             "text_height": self.text_height_var.get(),
+            "adaptive_text_height": self.adaptive_size_var.get(),
+            "label_layout": self.label_layout_var.get(),
+            "arc_mode": self.arc_mode_var.get(),
+            "script_mode": self.script_mode_var.get(),
             "redline_area": self.redline_area,
             "has_redline": self.redline_area > 0,
-            "has_garage": bool(self.garage_points),
-            "garage_points": self.garage_points,  # 保存地库线坐标
+            "has_garage": bool(len(self.factor_zones)),
+            "factor_zones": self.factor_zones.to_list(),  # 保存折算分区
             "original_areas": self.original_areas,
-            "center_points": self.center_points
+            "center_points": self.center_points,
+            "mark_handles": self.mark_handles,
+            "bed_outlines": self.bed_outlines
         })
+        self.settings.pop("garage_points", None)  # 旧版地库线已转换为折算分区
         
         self.settings_manager.save_settings(self.settings)
+        if self.com_worker is not None:
+            self.com_worker.cancel_all()
+            self.com_worker.stop(timeout=2)
         self.root.destroy()
 
     def init_ui(self):
@@ -156,30 +199,78 @@ class PlantMarkUI(UIComponents, WindowManager):
 
     def start_marking(self):
         """开始标注的回调函数"""
+        self.run_marking(scan=False)
+
+    def start_scan(self):
+        """全图标注的回调函数：扫描整个模型空间，不需要框选"""
+        self.run_marking(scan=True)
+
+    def run_marking(self, scan=False):
+        """执行框选标注或全图扫描标注，完成后更新面积列表和保存数据
+
+        CAD操作在COM工作线程中执行，界面保持响应。
+        """
         try:
-            selected_layer = self.layer_var.get()
-            if selected_layer == "全部图层":
-                layer_name = ["全部图层"]
-            else:
-                layer_name = [selected_layer]
-                
-            self.root.iconify()
+            layer_name = parse_layer_selection(self.layer_var.get())
+            registries = self.settings.get("annotation_registry", {})
+            # 标注选项在界面线程中读取，工作线程绘制时不再访问Tk变量
+            label_options = read_label_options(self)
             
-            plant = PlantMark("Autocad.Application")
+            self.root.iconify()
+            self.switch_to_cad()
+        except Exception as e:
+            messagebox.showerror("错误", f"标注过程出错：{str(e)}")
+            self.switch_to_ui()
+            return
+        
+        def job(plant, context):
             plant.ui = self
             
-            # 获取CAD文件名并保存
-            cad_filename = os.path.basename(plant.doc.FullName)
-            self.settings["cad_filename"] = cad_filename
-            self.settings_manager.save_settings(self.settings)
-            
             # 将CAD窗口置于最前
             plant.wincad.Visible = True
             plant.wincad.WindowState = 3  # 3 = 最大化
-            self.switch_to_cad()
             
-            areas, center_points = plant.applicate(layer_name)
+            # 载入当前图纸的标注登记表，再次标注时只处理变化的图形
+            drawing_key = plant.doc.FullName or plant.doc.Name
+            plant.annotation_registry = AnnotationRegistry.from_dict(registries.get(drawing_key))
+            
+            # 分阶段报告进度，取消时回滚本次已绘制的标注
+            progress = cancel_check = None
+            if context is not None:
+                progress, cancel_check = context.report, context.check_cancelled
+            plant.label_options = label_options
+            try:
+                if scan:
+                    areas, center_points = plant.scan_model_space(layer_name, progress_callback=progress,
+                                                                  cancel_check=cancel_check)
+                else:
+                    areas, center_points = plant.draw_leader(layer_name, progress, cancel_check)
+            finally:
+                plant.label_options = None
+            
+            return {
+                "cad_filename": os.path.basename(plant.doc.FullName),
+                "drawing_key": drawing_key,
+                "registry": plant.annotation_registry.to_dict(),
+                "areas": areas,
+                "center_points": center_points,
+                "mark_handles": plant.label_handles,
+                "bed_outlines": plant.label_outline_data(),
+            }
+        
+        def done(result):
+            cad_filename = result["cad_filename"]
+            areas = result["areas"]
+            center_points = result["center_points"]
+            
+            # 保存CAD文件名和标注登记表
+            self.settings["cad_filename"] = cad_filename
+            registries[result["drawing_key"]] = result["registry"]
+            self.settings["annotation_registry"] = registries
+            self.settings_manager.save_settings(self.settings)
             self.center_points = center_points
+            self.mark_handles = result["mark_handles"]
+            self.bed_outlines = result["bed_outlines"]
             
             if areas:
                 self.original_areas = areas
@@ -188,28 +279,31 @@ class PlantMarkUI(UIComponents, WindowManager):
                 # 保存框选数据
                 self.settings["original_areas"] = areas
                 self.settings["center_points"] = center_points
+                self.settings["mark_handles"] = self.mark_handles
+                self.settings["bed_outlines"] = self.bed_outlines
                 self.settings_manager.save_settings(self.settings)
             
             # 设置到导出管理器
             self.export_manager.set_cad_name(cad_filename)
             
             self.switch_to_ui()
-            
-        except Exception as e:
-            messagebox.showerror("错误", f"标注过程出错：{str(e)}")
-            self.switch_to_ui()
+        
+        self.run_cad_job(job, done, error_message="标注过程出错", progress_title="标注进度")
 
     def select_redline(self):
         """选择红线并计算面积"""
         try:
             self.root.iconify()
-            
-            plant = PlantMark("Autocad.Application")
-            
+            self.switch_to_cad()
+        except Exception as e:
+            messagebox.showerror("错误", f"选择红线时出错：{str(e)}")
+            self.switch_to_ui()
+            return
+        
+        def job(plant, context):
             # 将CAD窗口置于最前
             plant.wincad.Visible = True
             plant.wincad.WindowState = 3  # 3 = 最大化
-            self.switch_to_cad()
             
             # 清空现有选择集
             while plant.doc.SelectionSets.Count > 0:
@@ -219,7 +313,7 @@ class PlantMarkUI(UIComponents, WindowManager):
             redline_select = plant.doc.SelectionSets.Add("redline_select")
             
             plant.doc.Utility.Prompt("请选择红线范围的多段线...")
-            redline_select.SelectOnScreen()
+            plant.select_on_screen(redline_select, DXF_NAMES)
             
             total_area = 0
             for obj in redline_select:
@@ -238,7 +332,9 @@ class PlantMarkUI(UIComponents, WindowManager):
                     break
             
             redline_select.Delete()
-            
+            return total_area
+        
+        def done(total_area):
             if total_area > 0:
                 self.redline_area = total_area
                 if self.original_areas:
@@ -247,22 +343,41 @@ class PlantMarkUI(UIComponents, WindowManager):
                 self.select_redline_button.configure(text="选择红线(已加载)")
             
             self.switch_to_ui()
-            
-        except Exception as e:
-            messagebox.showerror("错误", f"选择红线时出错：{str(e)}")
-            self.switch_to_ui()
+        
+        self.run_cad_job(job, done, error_message="选择红线时出错")
 
     def select_garage(self):
-        """选择地下车库线并记录边界"""
+        """选择折算分区（地下车库、屋顶花园等），可一次选择多个闭合边界"""
         try:
-            self.root.iconify()
-            
-            plant = PlantMark("Autocad.Application")
+            # 询问本次所选分区的折算系数
+            factor_text = simpledialog.askstring("折算系数", "请输入所选分区的折算系数（地库一般为80%）：",
+                                                 initialvalue=format_factor(GARAGE_FACTOR), parent=self.root)
+            if factor_text is None:
+                return
+            factor = float(factor_text.strip().strip('%')) / 100
+            if not 0 <= factor <= 1:
+                raise ValueError("折算系数应在0%到100%之间")
+            
+            # 已有分区时选择追加还是替换（选择完成后才替换）
+            replace = False
+            if len(self.factor_zones):
+                choice = messagebox.askyesnocancel(
+                    "折算分区", f"已加载{len(self.factor_zones)}个分区。\n是：追加新分区\n否：替换全部分区")
+                if choice is None:
+                    return
+                replace = not choice
             
+            self.root.iconify()
+            self.switch_to_cad()
+        except Exception as e:
+            messagebox.showerror("错误", f"选择地下车库线时出错：{str(e)}")
+            self.switch_to_ui()
+            return
+        
+        def job(plant, context):
             # 将CAD窗口置于最前
             plant.wincad.Visible = True
             plant.wincad.WindowState = 3  # 3 = 最大化
-            self.switch_to_cad()
             
             # 清空现有选择集
             while plant.doc.SelectionSets.Count > 0:
@@ -271,50 +386,40 @@ class PlantMarkUI(UIComponents, WindowManager):
             # 创建选择集
             garage_select = plant.doc.SelectionSets.Add("garage_select")
             
-            plant.doc.Utility.Prompt("请选择地下车库范围的多段线...")
-            garage_select.SelectOnScreen()
+            plant.doc.Utility.Prompt("请选择地下车库或其他折算分区的闭合边界...")
+            plant.select_on_screen(garage_select, DXF_NAMES)
             
-            # 获取地下车库边界点
-            self.garage_points = []
-            for obj in garage_select:
-                if obj.ObjectName == "AcDbPolyline":
-                    if obj.Closed:
-                        coords = obj.Coordinates
-                        points = []
-                        for i in range(0, len(coords), 2):
-                            points.append([coords[i], coords[i+1]])
-                        self.garage_points = points
-                        break
-                elif obj.ObjectName == "AcDbCircle":
-                    # 对于圆形，创建一个近似的多边形
-                    center = obj.Center
-                    radius = obj.Radius
-                    points = []
-                    for i in range(36):  # 36个点形成一个近似圆
-                        angle = i * 10 * math.pi / 180
-                        x = center[0] + radius * math.cos(angle)
-                        y = center[1] + radius * math.sin(angle)
-                        points.append([x, y])
-                    self.garage_points = points
-                    break
+            # 闭合多段线、圆和椭圆都登记为分区，圆弧段离散为折线
+            snapshot = EntitySnapshot.from_objects(garage_select, min_area=0)
+            vertices, offsets = snapshot.outlines()
+            zones = []
+            for i in range(len(snapshot)):
+                if not snapshot.closed[i] or offsets[i + 1] - offsets[i] < 3:
+                    continue
+                zones.append(np.asarray(vertices[2 * offsets[i]:2 * offsets[i + 1]]).reshape(-1, 2))
             
             garage_select.Delete()
-            
-            if self.garage_points:
+            return zones
+        
+        def done(zones):
+            if zones:
+                if replace:
+                    self.factor_zones.clear()
+                for points in zones:
+                    self.factor_zones.add(points, factor)
                 if self.original_areas:
                     self.update_area_list(self.original_areas)
                 self.select_garage_button.configure(text="选地库线(已加载)")
                 
                 # 保存设置
                 self.settings["has_garage"] = True
-                self.settings["garage_points"] = self.garage_points
+                self.settings["factor_zones"] = self.factor_zones.to_list()
+                self.settings.pop("garage_points", None)
                 self.settings_manager.save_settings(self.settings)
             
             self.switch_to_ui()
-            
-        except Exception as e:
-            messagebox.showerror("错误", f"选择地下车库线时出错：{str(e)}")
-            self.switch_to_ui()
+        
+        self.run_cad_job(job, done, error_message="选择地下车库线时出错")
 
     def update_area_list(self, areas):
         """更新面积列表"""
@@ -328,6 +433,9 @@ class PlantMarkUI(UIComponents, WindowManager):
             conversion = 0.000001 if unit == "米" else 1
             unit_symbol = "㎡" if unit == "米" else "㎡"
             
+            # 按地库内面积比例计算初始折算系数
+            initial_factors = self.garage_factors(len(areas))
+            
             # 添加每个面积项
             for i, area in enumerate(areas, 1):
                 row_frame = ttk.Frame(self.scrollable_frame)
@@ -343,10 +451,7 @@ class PlantMarkUI(UIComponents, WindowManager):
                 area_entry.pack(side=tk.LEFT, padx=2)
                 
                 # 折算系数下拉框
-                initial_factor = "80%" if (self.garage_points and 
-                                        len(self.center_points) > i-1 and 
-                                        self.is_point_in_garage(self.center_points[i-1])) else "100%"
-                factor_var = tk.StringVar(value=initial_factor)
+                factor_var = tk.StringVar(value=initial_factors[i-1])
                 
                 self.factor_vars.append((factor_var, area_var))
                 factor_combo = ttk.Combobox(row_frame, textvariable=factor_var,
@@ -697,26 +802,44 @@ QQ邮箱：lazone@qq.com
         help_window.grab_set()
         self.root.wait_window(help_window)
 
+    def garage_factors(self, count):
+        """计算每个面积项的初始折算系数，部分位于分区内的按面积比例加权"""
+        if not len(self.factor_zones):
+            return ["100%"] * count
+        
+        # 切换单位等重建列表时分区和图形未变，直接复用上次的结果
+        cache_key = (self.selection_version, self.factor_zones.version, count)
+        cached = getattr(self, '_garage_factor_cache', None)
+        if cached and cached[0] == cache_key:
+            return list(cached[1])
+        
+        factors = self._compute_garage_factors(count)
+        self._garage_factor_cache = (cache_key, factors)
+        return list(factors)
+
+    def _compute_garage_factors(self, count):
+        """按轮廓重叠面积计算折算系数，没有轮廓数据时按中心点批量判断"""
+        offsets = self.bed_outlines.get("offsets", []) if self.bed_outlines else []
+        if len(offsets) == count + 1:
+            try:
+                factors = self.factor_zones.classify(self.bed_outlines["vertices"], offsets)
+                return [format_factor(f) for f in factors]
+            except Exception as e:
+                print(f"计算分区重叠面积时出错: {str(e)}")
+        
+        factors = ["100%"] * count
+        centers = self.center_points[:count]
+        if centers:
+            point_factors = self.factor_zones.classify_points([p[:2] for p in centers])
+            for i, factor in enumerate(point_factors):
+                factors[i] = format_factor(factor)
+        return factors
+
     def is_point_in_garage(self, point):
-        """判断点是否在地下车库范围内"""
-        if not self.garage_points:
+        """判断点是否在任一折算分区范围内"""
+        if not len(self.factor_zones):
             return False
-            
-        # 使用射线法判断点是否在多边形内
-        x, y = point[0], point[1]
-        inside = False
-        j = len(self.garage_points) - 1
-        
-        for i in range(len(self.garage_points)):
-            if ((self.garage_points[i][1] > y) != (self.garage_points[j][1] > y) and
-                x < (self.garage_points[j][0] - self.garage_points[i][0]) * 
-                (y - self.garage_points[i][1]) / 
-                (self.garage_points[j][1] - self.garage_points[i][1]) + 
-                self.garage_points[i][0]):
-                inside = not inside
-            j = i
-            
-        return inside 
+        return bool(self.factor_zones.locate_points([point[:2]])[0] >= 0)
 
     def on_unit_change(self, event=None):
         """处理单位切换"""
@@ -738,27 +861,44 @@ QQ邮箱：lazone@qq.com
             pass
 
     def update_layer_list(self):
-        """更新图层列表"""
+        """更新图层列表：在工作线程中读取图层名称，读取完成后再更新下拉列表"""
+        self.call_cad(lambda plant: plant.backend.layer_names(),
+                      on_done=self.set_layer_names, on_error=self.layer_list_failed)
+
+    def set_layer_names(self, names):
+        """用读取到的CAD图层更新图层列表"""
         try:
-            # 获取所有图层名称
             layer_names = ["全部图层"]  # 默认选项
-            for i in range(self.cad.doc.Layers.Count):
-                layer = self.cad.doc.Layers.Item(i)
-                if not layer.Name.startswith("*"):  # 排除系统图层
-                    layer_names.append(layer.Name)
+            for name in names:
+                if not name.startswith("*"):  # 排除系统图层
+                    layer_names.append(name)
+            layer_names.append(MULTI_LAYER_OPTION)
+            self.layers_loaded = True
             
             # 更新下拉列表
             self.layer_combo['values'] = layer_names
             
             # 如果当前选择的图层不在列表中，重置为"全部图层"
-            if self.layer_var.get() not in layer_names:
+            if not self.layer_selection_available(self.layer_var.get()):
                 self.layer_var.set("全部图层")
+            self.last_layer_value = self.layer_var.get()
                 
         except Exception as e:
-            print(f"获取CAD图层失败: {str(e)}")
-            # 设置默认值
-            self.layer_combo['values'] = ["全部图层"]
-            self.layer_var.set("全部图层") 
+            self.layer_list_failed(e)
+
+    def layer_list_failed(self, error):
+        """读取CAD图层失败时使用默认值"""
+        print(f"获取CAD图层失败: {str(error)}")
+        self.layer_combo['values'] = ["全部图层"]
+        self.layer_var.set("全部图层")
+
+    def layer_selection_available(self, value):
+        """检查图层选择（可为分号连接的多个图层）是否都在当前图层列表中"""
+        values = self.layer_combo['values']
+        if value in values and value != MULTI_LAYER_OPTION:
+            return True
+        names = value.split(LAYER_SEPARATOR) if value else []
+        return len(names) > 1 and all(name in values for name in names)
 
     def on_export(self, event=None):
         """处理导出事件"""
@@ -35,18 +35,85 @@ UI 使用 tkinter 和 ttk 部件构建，组织成以下框架：
 
 import tkinter as tk
 from tkinter import ttk
-from cad.plant_mark import PlantMark
+from cad.jobs import JobCancelled
+from cad.annotation_style import read_label_options
 from tkinter import messagebox  # 添加在文件开头的导入部分
+from utils.factor_zones import FactorZoneRegistry
+
+# 图层下拉框中用于多选的选项，多个图层在 layer_var 中用分号连接
+MULTI_LAYER_OPTION = "多个图层..."
+LAYER_SEPARATOR = ";"
+
+
+def parse_layer_selection(value):
+    """把图层下拉框的值转换为图层名称列表"""
+    if not value or value == "全部图层" or value == MULTI_LAYER_OPTION:
+        return ["全部图层"]
+    return [name for name in value.split(LAYER_SEPARATOR) if name]
+
+class ProgressWindow:
+    """CAD任务的进度窗口：显示阶段、数量和耗时，可取消"""
+
+    def __init__(self, root, title="处理进度", on_cancel=None):
+        self.on_cancel = on_cancel
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.resizable(False, False)
+        self.window.attributes('-topmost', True)
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel)
+        
+        self.stage_var = tk.StringVar(value="准备中...")
+        ttk.Label(self.window, textvariable=self.stage_var, width=36).pack(padx=10, pady=(10, 5))
+        self.progress_bar = ttk.Progressbar(self.window, length=280, mode='determinate', maximum=100)
+        self.progress_bar.pack(padx=10, pady=5)
+        self.cancel_button = ttk.Button(self.window, text="取消", command=self.cancel)
+        self.cancel_button.pack(pady=(5, 10))
+
+    def update(self, stage, done, total, elapsed):
+        """更新进度：阶段名称、已完成数量、总数和已用时间（秒）"""
+        self.progress_bar['value'] = done * 100 / total if total else 0
+        self.stage_var.set(f"{stage}：{done}/{total}（已用时{elapsed:.1f}秒）")
+
+    def cancel(self):
+        self.stage_var.set("正在取消，已绘制的标注将被撤销...")
+        self.cancel_button.configure(state=tk.DISABLED)
+        if self.on_cancel:
+            self.on_cancel()
+
+    def close(self):
+        try:
+            self.window.destroy()
+        except tk.TclError:
+            pass
+
+
+def _versioned_attribute(name):
+    """重新赋值时增加 selection_version 的属性，按版本缓存的计算结果随之失效"""
+    attribute = '_' + name
+
+    def getter(self):
+        return getattr(self, attribute)
+
+    def setter(self, value):
+        setattr(self, attribute, value)
+        self.selection_version = getattr(self, 'selection_version', 0) + 1
+
+    return property(getter, setter)
+
 
 class UIComponents:
     def __init__(self):
         # 初始化变量
+        self.selection_version = 0  # 图形数据版本：中心点、轮廓或分区重新赋值时加1
         self.redline_area = 0
         self.original_areas = []
         self.center_points = []
-        self.garage_points = []
+        self.mark_handles = []
+        self.bed_outlines = {}
+        self.factor_zones = FactorZoneRegistry()
         self.factor_vars = []
         self.cad = None
+        self.com_worker = None  # COM工作线程，设置后CAD操作都在其中执行
         
         # 添加 export_manager 的初始化
         from ui.export_manager import ExportManager
@@ -79,6 +146,11 @@ class UIComponents:
         # 从设置中加载上次的图纸名称
         self.load_last_drawing()
 
+    # 图形数据重新赋值时增加 selection_version
+    center_points = _versioned_attribute('center_points')
+    bed_outlines = _versioned_attribute('bed_outlines')
+    factor_zones = _versioned_attribute('factor_zones')
+
     def create_main_frame(self):
         """创建主框架"""
         self.main_frame = ttk.Frame(self.root, padding="10")
@@ -98,6 +170,8 @@ class UIComponents:
         self.layer_combo = ttk.Combobox(self.layer_frame, textvariable=self.layer_var,
                                       width=30, state="readonly")
         self.layer_combo.pack(side=tk.LEFT, padx=3)
+        self.last_layer_value = "全部图层"
+        self.layer_combo.bind('<<ComboboxSelected>>', self.on_layer_selected)
         
         # 添加标注类型选择
         self.mark_type_label = ttk.Label(self.layer_frame, text="标注类型:")
@@ -106,7 +180,7 @@ class UIComponents:
         self.mark_type_var = tk.StringVar(value="标记")
         self.mark_type_combo = ttk.Combobox(self.layer_frame, 
                                           textvariable=self.mark_type_var,
-                                          values=["标记", "数字", "综合"],
+                                          values=["标记", "数字", "综合", "属性块"],
                                           width=6,
                                           state="readonly")
         self.mark_type_combo.pack(side=tk.LEFT, padx=3)
@@ -137,6 +211,30 @@ class UIComponents:
         self.text_height_entry = ttk.Entry(self.unit_frame, textvariable=self.text_height_var,
                                          width=4)  # 减小宽度
         self.text_height_entry.pack(side=tk.LEFT, padx=3)
+        
+        # 自适应字高：按图形大小在几个固定字高中选择
+        self.adaptive_size_var = tk.BooleanVar(value=False)
+        self.adaptive_size_check = ttk.Checkbutton(self.unit_frame, text="自适应",
+                                                   variable=self.adaptive_size_var)
+        self.adaptive_size_check.pack(side=tk.LEFT, padx=3)
+
+        # 标注避让：避开其他标注和图形边界，移动过的标注加引线
+        self.label_layout_var = tk.BooleanVar(value=False)
+        self.label_layout_check = ttk.Checkbutton(self.unit_frame, text="避让",
+                                                  variable=self.label_layout_var)
+        self.label_layout_check.pack(side=tk.LEFT, padx=3)
+
+        # 圆弧：读取多段线圆弧段的凸度，弧形花坛按真实面积计算（每条多段线多一次COM调用）
+        self.arc_mode_var = tk.BooleanVar(value=False)
+        self.arc_mode_check = ttk.Checkbutton(self.unit_frame, text="圆弧",
+                                              variable=self.arc_mode_var)
+        self.arc_mode_check.pack(side=tk.LEFT, padx=3)
+
+        # 脚本模式：标注和填充生成一个AutoLISP脚本，由CAD一次执行
+        self.script_mode_var = tk.BooleanVar(value=False)
+        self.script_mode_check = ttk.Checkbutton(self.unit_frame, text="脚本",
+                                                 variable=self.script_mode_var)
+        self.script_mode_check.pack(side=tk.LEFT, padx=3)
 
         # 添加标注图层选择
         self.annotation_layer_label = ttk.Label(self.unit_frame, text="标注图层:")
@@ -177,6 +275,11 @@ class UIComponents:
                                     command=self.start_marking)
         self.start_button.pack(side=tk.LEFT, padx=5)
         
+        # 创建全图扫描标注按钮（不需要框选）
+        self.scan_button = ttk.Button(self.button_frame, text="全图标注",
+                                    command=self.start_scan)
+        self.scan_button.pack(side=tk.LEFT, padx=5)
+        
         # 创建帮助按钮
         self.help_button = ttk.Button(self.button_frame, text="帮助说明",
                                     command=self.show_help)
@@ -434,6 +537,62 @@ class UIComponents:
         y = (dialog.winfo_screenheight() // 2) - (height // 2)
         dialog.geometry(f'{width}x{height}+{x}+{y}')
 
+    def on_layer_selected(self, event=None):
+        """选择"多个图层..."时弹出多选对话框"""
+        if self.layer_var.get() == MULTI_LAYER_OPTION:
+            self.choose_layers()
+        else:
+            self.last_layer_value = self.layer_var.get()
+
+    def choose_layers(self):
+        """多选要标注的图层"""
+        layers = [name for name in self.layer_combo['values']
+                  if name not in ("全部图层", MULTI_LAYER_OPTION)]
+        current = set(parse_layer_selection(self.last_layer_value))
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("选择多个图层")
+        dialog.geometry("300x320")
+        dialog.resizable(False, False)
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        frame = ttk.Frame(dialog, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        listbox = tk.Listbox(frame, selectmode=tk.MULTIPLE, height=12, exportselection=False)
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=listbox.yview)
+        listbox.configure(yscrollcommand=scrollbar.set)
+        listbox.grid(row=0, column=0, sticky="nsew")
+        scrollbar.grid(row=0, column=1, sticky="ns")
+        frame.columnconfigure(0, weight=1)
+        for i, name in enumerate(layers):
+            listbox.insert(tk.END, name)
+            if name in current:
+                listbox.selection_set(i)
+        
+        def confirm():
+            """确认选择，未选择任何图层时视为全部图层"""
+            selected = [layers[i] for i in listbox.curselection()]
+            value = LAYER_SEPARATOR.join(selected) if selected else "全部图层"
+            self.layer_var.set(value)
+            self.last_layer_value = value
+            dialog.destroy()
+        
+        def cancel():
+            """取消选择，恢复原来的图层"""
+            self.layer_var.set(self.last_layer_value)
+            dialog.destroy()
+        
+        button_frame = ttk.Frame(frame)
+        button_frame.grid(row=1, column=0, columnspan=2, pady=10)
+        ttk.Button(button_frame, text="确定", command=confirm).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="取消", command=cancel).pack(side=tk.LEFT, padx=5)
+        
+        dialog.bind('<Return>', lambda e: confirm())
+        dialog.bind('<Escape>', lambda e: cancel())
+        dialog.protocol("WM_DELETE_WINDOW", cancel)
+
     def set_cad_instance(self, cad_instance):
         """设置 CAD 实例"""
         self.cad = cad_instance
@@ -443,6 +602,78 @@ class UIComponents:
             if hasattr(self, 'root'):
                 self.root.after(100, self.update_hatch_patterns)
 
+    def run_cad_job(self, job, on_done=None, on_progress=None, error_message="CAD操作出错",
+                    progress_title=None):
+        """执行CAD任务 job(plant, context)，完成后在界面线程调用 on_done(结果)
+
+        有COM工作线程时异步执行并返回 Future，否则在界面线程同步执行（context 为 None）。
+        指定 progress_title 时显示带取消按钮的进度窗口。出错时弹出提示并切回界面。
+        """
+        progress_window = None
+
+        def close_progress():
+            if progress_window is not None:
+                progress_window.close()
+
+        def on_error(error):
+            close_progress()
+            if isinstance(error, JobCancelled):
+                messagebox.showinfo("提示", "操作已取消")
+            else:
+                messagebox.showerror("错误", f"{error_message}：{str(error)}")
+            self.switch_to_ui()
+
+        def finished(result):
+            close_progress()
+            if on_done:
+                on_done(result)
+
+        def progress(stage, done, total, elapsed):
+            if progress_window is not None:
+                progress_window.update(stage, done, total, elapsed)
+            if on_progress:
+                on_progress(stage, done, total, elapsed)
+
+        if self.com_worker is None:
+            try:
+                result = job(self.cad, None)
+            except Exception as e:
+                on_error(e)
+                return None
+            if on_done:
+                on_done(result)
+            return None
+
+        if self.com_worker.busy:
+            messagebox.showinfo("提示", "CAD正在执行上一个操作，请稍候")
+            self.switch_to_ui()
+            return None
+        if progress_title:
+            progress_window = ProgressWindow(self.root, progress_title)
+        future = self.com_worker.submit(lambda session, context: job(session.acquire(), context),
+                                        on_done=finished, on_error=on_error, on_progress=progress)
+        if progress_window is not None:
+            progress_window.on_cancel = lambda: self.com_worker.cancel(future)
+        return future
+
+    def call_cad(self, func, on_done=None, on_error=None):
+        """执行快速的CAD读取 func(plant)，完成后在界面线程调用 on_done(结果)，出错时调用 on_error(异常)
+
+        不等待结果：CAD正在执行其他任务时排在其后，界面线程不会被阻塞。
+        """
+        if self.com_worker is None:
+            try:
+                result = func(self.cad)
+            except Exception as e:
+                if on_error:
+                    on_error(e)
+                return None
+            if on_done:
+                on_done(result)
+            return None
+        return self.com_worker.submit(lambda session, context: func(session.acquire()),
+                                      on_done=on_done, on_error=on_error)
+
     def update_hatch_patterns(self):
         """设置默认填充样式"""
         try:
@@ -463,10 +694,22 @@ class UIComponents:
     def apply_hatch(self):
         """应用填充"""
         try:
-            if self.cad:  # 使用 self.cad 而不是 hasattr 检查
+            if self.cad:
+                # 填充参数和标注选项在界面线程中读取，工作线程不访问Tk变量
                 pattern = self.hatch_pattern_var.get()
                 scale = float(self.hatch_scale_var.get())
-                self.cad.apply_hatch(pattern, scale)
+                angle = float(self.hatch_angle_var.get())
+                color = self.color_map.get(self.hatch_color_var.get(), self.color_map["默认"])
+                label_options = read_label_options(self)
+
+                def job(plant, context):
+                    plant.label_options = label_options
+                    try:
+                        return plant.apply_hatch(pattern, scale, angle, color)
+                    finally:
+                        plant.label_options = None
+
+                self.run_cad_job(job, error_message="应用填充时出错")
         except Exception as e:
             tk.messagebox.showerror("错误", f"应用填充时出错: {str(e)}") 
 
@@ -475,7 +718,8 @@ class UIComponents:
         try:
             if self.cad:
                 # 提示用户操作已完成
-                self.cad.doc.Utility.Prompt("\n填充已保留")
+                self.run_cad_job(lambda plant, context: plant.doc.Utility.Prompt("\n填充已保留"),
+                                 error_message="保留填充时出错")
         except Exception as e:
             tk.messagebox.showerror("错误", f"保留填充时出错: {str(e)}") 
 
@@ -526,7 +770,14 @@ class UIComponents:
                 if not self.cad:
                     messagebox.showerror("错误", "未找到活动的CAD实例")
                     return
-                self.export_manager.export_to_cad(data, summary_data, unit_symbol)
+                def exported(status):
+                    # 对话框只在界面线程中弹出
+                    if status == "cancelled":
+                        messagebox.showinfo("提示", "用户取消了点选择操作，表格导出已中止。")
+
+                self.run_cad_job(
+                    lambda plant, context: self.export_manager.export_to_cad(data, summary_data, unit_symbol, plant),
+                    exported, error_message="插入到CAD时出错")
             
             # 重置选择
             self.export_var.set("选择导出格式")
@@ -620,48 +871,3 @@ class UIComponents:
             self.root.title(f"CAD面积标注工具 - {self.current_dwg}")
         else:
             self.root.title("CAD面积标注工具")
-
-    def start_marking(self):
-        """开始标注"""
-        try:
-            selected_layer = self.layer_var.get()
-            if selected_layer == "全部图层":
-                layer_name = ["全部图层"]
-            else:
-                layer_name = [selected_layer]
-            
-            self.root.iconify()
-            
-            plant = PlantMark("Autocad.Application")
-            plant.ui = self
-            
-            # 获取CAD文件名并更新标题
-            current_drawing = plant.get_current_drawing_name()
-            if current_drawing:
-                self.update_title(current_drawing)
-            
-            # 将CAD窗口置于最前
-            plant.wincad.Visible = True
-            plant.wincad.WindowState = 3  # 3 = 最大化
-            self.switch_to_cad()
-            
-            areas, center_points = plant.applicate(layer_name)
-            self.center_points = center_points
-            
-            if areas:
-                self.original_areas = areas
-                self.update_area_list(areas)
-                
-                # 保存框选数据
-                self.settings["original_areas"] = areas
-                self.settings["center_points"] = center_points
-                self.settings_manager.save_settings(self.settings)
-            
-            # 设置到导出管理器
-            self.export_manager.set_cad_name(current_drawing)
-            
-            self.switch_to_ui()
-            
-        except Exception as e:
-            messagebox.showerror("错误", f"标注过程出错：{str(e)}")
-            self.switch_to_ui() 
\ No newline at end of file
@@ -0,0 +1,165 @@
+"""
+折算分区模块
+
+功能说明:
+- FactorZone: 一个分区多边形（地库、屋顶花园等）及其折算系数
+- FactorZoneRegistry: 登记任意数量的分区，用STR打包R树索引分区包围盒
+- 种植区先批量查询R树得到候选分区，只与候选分区求精确重叠面积，
+  折算系数按各分区内的面积比例加权，分区外的部分按默认系数（100%）计
+- 分区可转换为列表保存到设置文件，兼容旧版只保存一条地库线的 garage_points
+"""
+
+import numpy as np
+
+from utils.geometry import PolygonClassifier, as_points, bounding_boxes, densify_arcs, shoelace_areas, subset_buffers
+from utils.overlap import GARAGE_FACTOR, ClipPolygon, overlap_areas
+from utils.spatial_index import STRTree
+
+
+class FactorZone:
+    """折算分区"""
+
+    def __init__(self, points, factor, name=""):
+        self.points = [[float(p[0]), float(p[1])] for p in points]
+        if len(self.points) < 3:
+            raise ValueError("分区至少需要3个顶点")
+        self.factor = float(factor)
+        self.name = name
+        self._clip = None
+        self._classifier = None
+
+    @property
+    def clip(self):
+        """预处理的裁剪多边形"""
+        if self._clip is None:
+            self._clip = ClipPolygon(self.points)
+        return self._clip
+
+    @property
+    def classifier(self):
+        """预处理的点在多边形内判断器"""
+        if self._classifier is None:
+            self._classifier = PolygonClassifier(self.points)
+        return self._classifier
+
+    @property
+    def box(self):
+        return self.clip.box
+
+    def to_dict(self):
+        return {"name": self.name, "factor": self.factor, "points": self.points}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["points"], data.get("factor", GARAGE_FACTOR), data.get("name", ""))
+
+
+class FactorZoneRegistry:
+    """折算分区登记表
+
+    分区互相重叠时，点按登记顺序取第一个包含它的分区；面积加权时各分区的重叠面积
+    之和超过种植区面积的，按比例缩放。
+    """
+
+    def __init__(self, zones=None, default_factor=1.0):
+        self.zones = list(zones or [])
+        self.default_factor = default_factor
+        self.version = 0   # 分区每次变化加1，供调用方判断缓存是否失效
+        self._tree = None
+
+    def __len__(self):
+        return len(self.zones)
+
+    def __iter__(self):
+        return iter(self.zones)
+
+    def add(self, points, factor=GARAGE_FACTOR, name=""):
+        """登记一个分区"""
+        zone = FactorZone(points, factor, name or f"分区{len(self.zones) + 1}")
+        self.zones.append(zone)
+        self._tree = None
+        self.version += 1
+        return zone
+
+    def clear(self):
+        self.zones = []
+        self._tree = None
+        self.version += 1
+
+    @property
+    def tree(self):
+        """分区包围盒的R树，分区变化后重建"""
+        if self._tree is None:
+            self._tree = STRTree([zone.box for zone in self.zones])
+        return self._tree
+
+    def locate_points(self, points):
+        """返回每个点所在分区的序号，不在任何分区内的为 -1"""
+        pts = as_points(points)
+        located = np.full(len(pts), -1, dtype=np.intp)
+        if not len(pts) or not self.zones:
+            return located
+
+        point_ids, zone_ids = self.tree.query_boxes(np.column_stack((pts, pts)))
+        for z in np.unique(zone_ids):
+            candidates = point_ids[zone_ids == z]
+            candidates = candidates[located[candidates] < 0]
+            if not len(candidates):
+                continue
+            inside = candidates[self.zones[z].classifier.contains(pts[candidates])]
+            located[inside] = z
+        return located
+
+    def classify_points(self, points):
+        """返回每个点所在分区的折算系数，不在任何分区内的为默认系数"""
+        located = self.locate_points(points)
+        factors = np.full(len(located), float(self.default_factor))
+        inside = located >= 0
+        if inside.any():
+            zone_factors = np.array([zone.factor for zone in self.zones])
+            factors[inside] = zone_factors[located[inside]]
+        return factors
+
+    def classify(self, vertices, offsets, bulges=None):
+        """按各分区内的面积比例计算每个多边形的加权折算系数"""
+        vertices, offsets = densify_arcs(vertices, offsets, bulges)
+        areas = shoelace_areas(vertices, offsets)
+        count = len(areas)
+        factors = np.full(count, float(self.default_factor))
+        if not count or not self.zones:
+            return factors
+
+        bed_ids, zone_ids = self.tree.query_boxes(bounding_boxes(vertices, offsets))
+        covered = np.zeros(count)
+        weighted = np.zeros(count)
+        for z in np.unique(zone_ids):
+            beds = bed_ids[zone_ids == z]
+            sub_vertices, sub_offsets, _ = subset_buffers(vertices, offsets, beds)
+            overlaps, _ = overlap_areas(sub_vertices, sub_offsets, self.zones[z].clip)
+            covered[beds] += overlaps
+            weighted[beds] += overlaps * self.zones[z].factor
+
+        # 分区重叠导致覆盖面积超出时按比例缩放
+        scale = np.divide(areas, covered, out=np.ones(count), where=covered > areas)
+        covered *= scale
+        weighted *= scale
+        valid = areas > 0
+        factors[valid] = (weighted[valid] + (areas[valid] - covered[valid]) * self.default_factor) / areas[valid]
+        return factors
+
+    def to_list(self):
+        """转换为可保存到设置文件的列表"""
+        return [zone.to_dict() for zone in self.zones]
+
+    @classmethod
+    def from_list(cls, data, garage_points=None):
+        """由设置文件中的列表恢复；没有分区但有旧版地库线时转换为一个地库分区"""
+        registry = cls()
+        for item in data or []:
+            try:
+                registry.zones.append(FactorZone.from_dict(item))
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"恢复折算分区时出错: {str(e)}")
+        if not registry.zones and garage_points and len(garage_points) >= 3:
+            registry.add(garage_points, GARAGE_FACTOR, "地库")
+        return registry
@@ -1,3 +1,380 @@
+"""
+几何计算模块
+
+功能说明:
+- 基于NumPy的批量几何内核，一次调用处理成千上万个多边形
+- 多边形以扁平坐标缓冲表示: vertices 为 x0, y0, x1, y1 ...，
+  offsets[i] 到 offsets[i+1] 为第i个多边形的顶点（按点计），与 EntitySnapshot 一致
+- bulges 为每个顶点的凸度（LWPOLYLINE），表示该顶点到下一顶点的圆弧段，可省略
+- 提供鞋带公式面积、面积加权形心、包围盒，以及点是否在多边形内的判断
+"""
+
+import functools
+
+import numpy as np
+
+
+def as_points(vertices):
+    """将扁平坐标缓冲或点列表转换为 N×2 数组，三维点只取X、Y"""
+    array = np.asarray(vertices, dtype=float)
+    if array.ndim == 2 and array.shape[1] > 2:
+        return array[:, :2]
+    return array.reshape(-1, 2)
+
+
+def polygon_ids(offsets):
+    """返回每个顶点所属多边形的下标"""
+    offsets = np.asarray(offsets, dtype=np.intp)
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def next_vertex_index(offsets):
+    """返回每个顶点在所属多边形中的下一个顶点下标（首尾相接）"""
+    offsets = np.asarray(offsets, dtype=np.intp)
+    total = offsets[-1]
+    nxt = np.arange(1, total + 1, dtype=np.intp)
+    counts = np.diff(offsets)
+    non_empty = counts > 0
+    nxt[offsets[1:][non_empty] - 1] = offsets[:-1][non_empty]
+    return nxt
+
+
+def _edge_terms(vertices, offsets):
+    """计算每条边的起点、终点和叉积
+
+    坐标先减去所属多边形的第一个顶点，测绘坐标（1e5~1e6）下叉积求和不会丢失小图形的面积精度。
+    返回的起点和终点为相对坐标。
+    """
+    offsets = np.asarray(offsets, dtype=np.intp)
+    pts = as_points(vertices)
+    counts = np.diff(offsets)
+    origins = np.repeat(pts[offsets[:-1][counts > 0]], counts[counts > 0], axis=0)
+    nxt = next_vertex_index(offsets)
+    p0 = pts - origins
+    p1 = p0[nxt]
+    cross = p0[:, 0] * p1[:, 1] - p1[:, 0] * p0[:, 1]
+    return p0, p1, cross
+
+
+def _arc_segments(p0, p1, bulges):
+    """计算圆弧段（弓形）相对弦的带符号面积和形心
+
+    凸度 b = tan(θ/4)，正值为逆时针圆弧。弓形面积按 θ 的符号计入，
+    使逆时针多边形的外凸圆弧增加面积。
+    """
+    bulges = np.asarray(bulges, dtype=float)
+    area = np.zeros(len(bulges))
+    centroid = (p0 + p1) / 2
+    arc = bulges != 0
+    if not arc.any():
+        return area, centroid
+
+    b = bulges[arc]
+    a0 = p0[arc]
+    a1 = p1[arc]
+    chord = a1 - a0
+    length = np.hypot(chord[:, 0], chord[:, 1])
+    theta = 4 * np.arctan(b)                    # 带符号圆心角
+    half = np.abs(theta) / 2
+    radius = length / (2 * np.sin(half))
+    seg_area = radius ** 2 / 2 * (theta - np.sin(theta))
+
+    # 弦的左法向；正凸度圆弧的圆心在左侧，弓形向右侧凸出
+    with np.errstate(invalid='ignore', divide='ignore'):
+        normal = np.column_stack((-chord[:, 1], chord[:, 0])) / length[:, None]
+        # 弓形形心到圆心的距离
+        dist = 4 * radius * np.sin(half) ** 3 / (3 * (2 * half - np.sin(2 * half)))
+    offset = dist - radius * np.cos(half)
+    mid = (a0 + a1) / 2
+    seg_centroid = mid - (np.sign(b) * offset)[:, None] * normal
+
+    valid = length > 0
+    area[np.flatnonzero(arc)[valid]] = seg_area[valid]
+    centroid[np.flatnonzero(arc)[valid]] = seg_centroid[valid]
+    return area, centroid
+
+
+def shoelace_areas(vertices, offsets, bulges=None, signed=False):
+    """批量计算多边形面积（含圆弧段），signed 为 True 时逆时针为正"""
+    offsets = np.asarray(offsets, dtype=np.intp)
+    count = len(offsets) - 1
+    ids = polygon_ids(offsets)
+    p0, p1, cross = _edge_terms(vertices, offsets)
+    weights = cross / 2
+    if bulges is not None:
+        seg_area, _ = _arc_segments(p0, p1, bulges)
+        weights = weights + seg_area
+    areas = np.bincount(ids, weights, minlength=count)
+    return areas if signed else np.abs(areas)
+
+
+def polygon_properties(vertices, offsets, bulges=None):
+    """批量计算多边形面积和面积加权形心
+
+    返回 (areas, centroids)，面积为绝对值；面积为零的多边形形心取顶点平均值。
+    """
+    offsets = np.asarray(offsets, dtype=np.intp)
+    count = len(offsets) - 1
+    ids = polygon_ids(offsets)
+    p0, p1, cross = _edge_terms(vertices, offsets)
+
+    # 直线多边形部分（相对各自原点）
+    signed = np.bincount(ids, cross / 2, minlength=count)
+    mx = np.bincount(ids, (p0[:, 0] + p1[:, 0]) * cross / 6, minlength=count)
+    my = np.bincount(ids, (p0[:, 1] + p1[:, 1]) * cross / 6, minlength=count)
+
+    # 圆弧段部分
+    if bulges is not None:
+        seg_area, seg_centroid = _arc_segments(p0, p1, bulges)
+        signed += np.bincount(ids, seg_area, minlength=count)
+        mx += np.bincount(ids, seg_area * seg_centroid[:, 0], minlength=count)
+        my += np.bincount(ids, seg_area * seg_centroid[:, 1], minlength=count)
+
+    # 顶点平均值，用于退化多边形
+    counts = np.diff(offsets)
+    safe_counts = np.maximum(counts, 1)
+    avg_x = np.bincount(ids, p0[:, 0], minlength=count) / safe_counts
+    avg_y = np.bincount(ids, p0[:, 1], minlength=count) / safe_counts
+
+    centroids = np.column_stack((avg_x, avg_y))
+    degenerate = np.isclose(signed, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        centroids[~degenerate, 0] = mx[~degenerate] / signed[~degenerate]
+        centroids[~degenerate, 1] = my[~degenerate] / signed[~degenerate]
+    # 加回各多边形的原点
+    non_empty = counts > 0
+    centroids[non_empty] += as_points(vertices)[offsets[:-1][non_empty]]
+    return np.abs(signed), centroids
+
+
+def polygon_centroids(vertices, offsets, bulges=None):
+    """批量计算多边形面积加权形心"""
+    return polygon_properties(vertices, offsets, bulges)[1]
+
+
+def bounding_boxes(vertices, offsets, bulges=None):
+    """批量计算包围盒，返回 M×4 数组 (xmin, ymin, xmax, ymax)，空多边形为 NaN"""
+    offsets = np.asarray(offsets, dtype=np.intp)
+    count = len(offsets) - 1
+    pts = as_points(vertices)
+    boxes = np.full((count, 4), np.nan)
+    counts = np.diff(offsets)
+    non_empty = counts > 0
+    if not non_empty.any():
+        return boxes
+
+    starts = offsets[:-1][non_empty]
+    boxes[non_empty, 0] = np.minimum.reduceat(pts[:, 0], starts)
+    boxes[non_empty, 1] = np.minimum.reduceat(pts[:, 1], starts)
+    boxes[non_empty, 2] = np.maximum.reduceat(pts[:, 0], starts)
+    boxes[non_empty, 3] = np.maximum.reduceat(pts[:, 1], starts)
+
+    if bulges is not None:
+        extremes, owners = _arc_extreme_points(pts, offsets, bulges)
+        if len(extremes):
+            np.fmin.at(boxes[:, 0], owners, extremes[:, 0])
+            np.fmin.at(boxes[:, 1], owners, extremes[:, 1])
+            np.fmax.at(boxes[:, 2], owners, extremes[:, 0])
+            np.fmax.at(boxes[:, 3], owners, extremes[:, 1])
+    return boxes
+
+
+def _arc_extreme_points(pts, offsets, bulges):
+    """求圆弧段经过的上下左右极值点，返回极值点及其所属多边形"""
+    bulges = np.asarray(bulges, dtype=float)
+    ids = polygon_ids(offsets)
+    nxt = next_vertex_index(offsets)
+    arc = np.flatnonzero(bulges != 0)
+    if not len(arc):
+        return np.empty((0, 2)), np.empty(0, dtype=np.intp)
+
+    a0 = pts[arc]
+    a1 = pts[nxt[arc]]
+    b = bulges[arc]
+    chord = a1 - a0
+    length = np.hypot(chord[:, 0], chord[:, 1])
+    keep = length > 0
+    a0, a1, b, chord, length, arc = a0[keep], a1[keep], b[keep], chord[keep], length[keep], arc[keep]
+
+    theta = 4 * np.arctan(b)
+    half = np.abs(theta) / 2
+    radius = length / (2 * np.sin(half))
+    normal = np.column_stack((-chord[:, 1], chord[:, 0])) / length[:, None]
+    center = (a0 + a1) / 2 + (np.sign(b) * radius * np.cos(half))[:, None] * normal
+
+    # 起始角和扫掠角（逆时针为正）
+    start = np.arctan2(a0[:, 1] - center[:, 1], a0[:, 0] - center[:, 0])
+    points = []
+    owners = []
+    for k, direction in enumerate(((1, 0), (0, 1), (-1, 0), (0, -1))):
+        target = k * np.pi / 2
+        # 从起始角沿圆弧方向转到目标方向所需的角度
+        delta = np.where(theta > 0, target - start, start - target) % (2 * np.pi)
+        hit = delta <= np.abs(theta)
+        if hit.any():
+            points.append(center[hit] + radius[hit, None] * np.array(direction, dtype=float))
+            owners.append(ids[arc[hit]])
+    if not points:
+        return np.empty((0, 2)), np.empty(0, dtype=np.intp)
+    return np.vstack(points), np.concatenate(owners)
+
+
 def is_point_in_polygon(point, polygon_points):
     """判断点是否在多边形内"""
-    # ... (原is_point_in_garage方法的核心逻辑) 
\ No newline at end of file
+    if not polygon_points:
+        return False
+
+    # 使用射线法判断点是否在多边形内
+    x, y = point[0], point[1]
+    inside = False
+    j = len(polygon_points) - 1
+
+    for i in range(len(polygon_points)):
+        xi, yi = polygon_points[i][0], polygon_points[i][1]
+        xj, yj = polygon_points[j][0], polygon_points[j][1]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+
+    return inside
+
+
+class PolygonClassifier:
+    """批量判断点是否在多边形内（射线法），多边形的边数组只预计算一次
+
+    点按Y排序后，每条边只与Y范围覆盖的点配对，配对数约为点数×扫描线穿过的边数，
+    而不是点数×边数。
+    """
+
+    def __init__(self, polygon_points, max_pairs=4000000):
+        ring = as_points(polygon_points)
+        a = ring
+        b = np.roll(ring, -1, axis=0)
+        # 水平边不会与水平射线相交
+        keep = a[:, 1] != b[:, 1]
+        a = a[keep]
+        b = b[keep]
+        self.ax = a[:, 0]
+        self.ay = a[:, 1]
+        self.slopes = (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1])
+        self.y_low = np.minimum(a[:, 1], b[:, 1])
+        self.y_high = np.maximum(a[:, 1], b[:, 1])
+        self.max_pairs = max_pairs
+
+    def contains(self, points):
+        """返回每个点是否在多边形内的布尔数组"""
+        pts = as_points(points)
+        count = len(pts)
+        mask = np.zeros(count, dtype=bool)
+        if not count or not len(self.ay):
+            return mask
+
+        order = np.argsort(pts[:, 1], kind='stable')
+        xs = pts[order, 0]
+        ys = pts[order, 1]
+        # 边与射线相交的条件为 y_low <= y < y_high，对应排序后的一段连续点
+        lo = np.searchsorted(ys, self.y_low, side='left')
+        hi = np.searchsorted(ys, self.y_high, side='left')
+        spans = hi - lo
+
+        crossings = np.zeros(count, dtype=np.intp)
+        ends = np.cumsum(spans)
+        start = 0
+        while start < len(spans):
+            # 按配对数量分批，控制内存
+            stop = int(np.searchsorted(ends, ends[start] - spans[start] + self.max_pairs, side='right'))
+            stop = max(stop, start + 1)
+            batch_spans = spans[start:stop]
+            total = int(batch_spans.sum())
+            if total:
+                edges = np.repeat(np.arange(start, stop), batch_spans)
+                firsts = np.cumsum(batch_spans) - batch_spans
+                index = lo[edges] + np.arange(total) - np.repeat(firsts, batch_spans)
+                x_cross = self.ax[edges] + self.slopes[edges] * (ys[index] - self.ay[edges])
+                crossings += np.bincount(index[xs[index] < x_cross], minlength=count)
+            start = stop
+
+        mask[order] = crossings % 2 == 1
+        return mask
+
+
+def points_in_polygon(points, polygon_points):
+    """批量判断点是否在多边形内，返回布尔数组"""
+    return PolygonClassifier(polygon_points).contains(points)
+
+
+def densify_arcs(vertices, offsets, bulges, max_angle=np.pi / 18):
+    """将圆弧段离散为折线，返回新的 (vertices, offsets)
+
+    每段圆弧按 max_angle 细分，没有凸度时原样返回。
+    """
+    pts = as_points(vertices)
+    offsets = np.asarray(offsets, dtype=np.intp)
+    if bulges is None:
+        return pts.ravel(), offsets
+    bulges = np.asarray(bulges, dtype=float)
+    if not bulges.any():
+        return pts.ravel(), offsets
+
+    nxt = next_vertex_index(offsets)
+    chunks = []
+    new_offsets = [0]
+    total = 0
+    for i in range(len(offsets) - 1):
+        for k in range(offsets[i], offsets[i + 1]):
+            chunks.append(pts[k:k + 1])
+            total += 1
+            b = bulges[k]
+            if b == 0:
+                continue
+            p0 = pts[k]
+            p1 = pts[nxt[k]]
+            chord = p1 - p0
+            length = np.hypot(chord[0], chord[1])
+            if length == 0:
+                continue
+            theta = 4 * np.arctan(b)
+            half = abs(theta) / 2
+            radius = length / (2 * np.sin(half))
+            normal = np.array((-chord[1], chord[0])) / length
+            center = (p0 + p1) / 2 + np.sign(b) * radius * np.cos(half) * normal
+            start = np.arctan2(p0[1] - center[1], p0[0] - center[0])
+            steps = max(2, int(np.ceil(abs(theta) / max_angle)))
+            angles = start + theta * np.arange(1, steps) / steps
+            chunks.append(center + radius * np.column_stack((np.cos(angles), np.sin(angles))))
+            total += len(angles)
+        new_offsets.append(total)
+    new_vertices = np.vstack(chunks) if chunks else np.empty((0, 2))
+    return new_vertices.ravel(), np.asarray(new_offsets, dtype=np.intp)
+
+
+def subset_buffers(vertices, offsets, indices, bulges=None):
+    """按下标取出部分多边形，返回 (vertices, offsets, bulges)"""
+    pts = as_points(vertices)
+    offsets = np.asarray(offsets, dtype=np.intp)
+    indices = np.asarray(indices, dtype=np.intp)
+    counts = np.diff(offsets)[indices]
+    new_offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.intp)
+    # 每个新顶点对应的原顶点下标
+    starts = np.repeat(offsets[:-1][indices] - new_offsets[:-1], counts)
+    source = np.arange(new_offsets[-1]) + starts
+    new_bulges = None if bulges is None else np.asarray(bulges, dtype=float)[source]
+    return pts[source].ravel(), new_offsets, new_bulges
+
+
+@functools.lru_cache(maxsize=8)
+def _unit_circle(segments):
+    """单位圆上等分点的 (cos, sin)，按分段数缓存"""
+    angles = np.arange(segments) * (2 * np.pi / segments)
+    return np.cos(angles), np.sin(angles)
+
+
+def ellipse_outline(center, major_axis, ratio=1.0, segments=36):
+    """生成椭圆（ratio 为 1 时为圆）的近似多边形，返回扁平坐标"""
+    cos, sin = _unit_circle(segments)
+    ux, uy = float(major_axis[0]), float(major_axis[1])
+    vx, vy = -uy * ratio, ux * ratio
+    outline = np.empty(2 * segments)
+    outline[0::2] = center[0] + ux * cos + vx * sin
+    outline[1::2] = center[1] + uy * cos + vy * sin
+    return outline
@@ -0,0 +1,199 @@
+"""
+标注避让布局模块
+
+功能说明:
+- text_width: 按字符估算单行文字宽度（全角字符约一个字高，半角字符约0.7个字高）
+- LabelLayout: 均匀网格占用索引，按标注顺序贪心放置标注框：
+  先试原位置，再试周围一圈、两圈的候选位置，取第一个既不与已放置标注重叠、
+  也不压图形边界线的位置；只能压边界线时取第一个不与标注重叠的位置；
+  所有候选位置都与已放置标注重叠时记为未能放置，留在原位置
+- 每个候选位置只检查标注框覆盖的几个网格单元，整体约为线性复杂度
+"""
+
+import math
+
+import numpy as np
+
+from utils.geometry import as_points, next_vertex_index
+
+WIDE_CHAR_WIDTH = 1.0    # 全角字符宽度（字高的倍数）
+NARROW_CHAR_WIDTH = 0.7  # 半角字符宽度（字高的倍数）
+
+# 候选位置（以标注框宽、高为单位的偏移），按优先顺序排列
+CANDIDATES = (
+    (0, 0),
+    (1, 0), (-1, 0), (0, 1), (0, -1),
+    (1, 1), (-1, 1), (1, -1), (-1, -1),
+    (2, 0), (-2, 0), (0, 2), (0, -2),
+    (2, 2), (-2, 2), (2, -2), (-2, -2),
+)
+
+# 布局结果
+PLACED = 0     # 在原位置
+MOVED = 1      # 移到候选位置
+CROSSING = 2   # 不与标注重叠，但压图形边界线
+UNPLACED = 3   # 未能放置，留在原位置
+
+
+def text_width(text, height):
+    """估算单行文字的宽度"""
+    wide = sum(1 for char in text if ord(char) > 0x2E80)
+    return ((len(text) - wide) * NARROW_CHAR_WIDTH + wide * WIDE_CHAR_WIDTH) * height
+
+
+def _segment_hits_box(x0, y0, x1, y1, bx0, by0, bx1, by1):
+    """线段是否与矩形相交（Liang-Barsky裁剪）"""
+    dx = x1 - x0
+    dy = y1 - y0
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, x0 - bx0), (dx, bx1 - x0), (-dy, y0 - by0), (dy, by1 - y0)):
+        if p == 0:
+            if q < 0:
+                return False
+        else:
+            t = q / p
+            if p < 0:
+                if t > t1:
+                    return False
+                t0 = max(t0, t)
+            else:
+                if t < t0:
+                    return False
+                t1 = min(t1, t)
+    return True
+
+
+class LabelLayout:
+    """标注框的网格占用索引"""
+
+    def __init__(self, cell_size, gap=0.0, candidates=CANDIDATES):
+        if cell_size <= 0:
+            raise ValueError("网格尺寸必须大于0")
+        self.cell_size = float(cell_size)
+        self.gap = float(gap)              # 标注框之间的最小间距
+        self.candidates = candidates
+        self.boxes = []                    # 已放置的标注框 (xmin, ymin, xmax, ymax)
+        self.box_cells = {}
+        self.segments = []                 # 边界线段 (x0, y0, x1, y1, xmin, ymin, xmax, ymax)
+        self.segment_cells = {}
+
+    @classmethod
+    def for_boxes(cls, sizes, gap=0.0, candidates=CANDIDATES):
+        """按标注框尺寸的中位数确定网格尺寸"""
+        sizes = np.asarray(sizes, dtype=float).reshape(-1, 2)
+        cell_size = float(np.median(sizes.max(axis=1))) * 2 if len(sizes) else 1.0
+        return cls(cell_size if cell_size > 0 else 1.0, gap, candidates)
+
+    def _cell_range(self, xmin, ymin, xmax, ymax):
+        size = self.cell_size
+        return (range(math.floor(xmin / size), math.floor(xmax / size) + 1),
+                range(math.floor(ymin / size), math.floor(ymax / size) + 1))
+
+    def add_outlines(self, vertices, offsets):
+        """登记闭合轮廓的边，标注框尽量不压这些线
+
+        长边按网格尺寸切成小段后登记，每段只占几个网格单元。
+        """
+        pts = as_points(vertices)
+        if not len(pts):
+            return
+        ends = pts[next_vertex_index(offsets)]
+        lengths = np.hypot(*(ends - pts).T)
+        pieces = np.maximum(1, np.ceil(lengths / self.cell_size)).astype(np.intp)
+        edge = np.repeat(np.arange(len(pts)), pieces)
+        step = np.arange(len(edge)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+        t0 = (step / pieces[edge])[:, None]
+        t1 = ((step + 1) / pieces[edge])[:, None]
+        starts = pts[edge] + (ends[edge] - pts[edge]) * t0
+        stops = pts[edge] + (ends[edge] - pts[edge]) * t1
+        for x0, y0, x1, y1 in np.hstack((starts, stops)).tolist():
+            index = len(self.segments)
+            xmin, ymin, xmax, ymax = min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+            self.segments.append((x0, y0, x1, y1, xmin, ymin, xmax, ymax))
+            xs, ys = self._cell_range(xmin, ymin, xmax, ymax)
+            for gx in xs:
+                for gy in ys:
+                    self.segment_cells.setdefault((gx, gy), []).append(index)
+
+    def add_box(self, box):
+        """登记一个已放置的标注框"""
+        index = len(self.boxes)
+        self.boxes.append(box)
+        xs, ys = self._cell_range(*box)
+        for gx in xs:
+            for gy in ys:
+                self.box_cells.setdefault((gx, gy), []).append(index)
+        return index
+
+    def overlaps_box(self, box):
+        """是否与已放置的标注框重叠（含间距）"""
+        gap = self.gap
+        xmin, ymin, xmax, ymax = box[0] - gap, box[1] - gap, box[2] + gap, box[3] + gap
+        xs, ys = self._cell_range(xmin, ymin, xmax, ymax)
+        for gx in xs:
+            for gy in ys:
+                for index in self.box_cells.get((gx, gy), ()):
+                    other = self.boxes[index]
+                    if other[0] < xmax and xmin < other[2] and other[1] < ymax and ymin < other[3]:
+                        return True
+        return False
+
+    def crosses_outline(self, box):
+        """是否压边界线"""
+        xmin, ymin, xmax, ymax = box
+        xs, ys = self._cell_range(xmin, ymin, xmax, ymax)
+        for gx in xs:
+            for gy in ys:
+                for index in self.segment_cells.get((gx, gy), ()):
+                    segment = self.segments[index]
+                    # 先用线段的包围盒排除
+                    if segment[4] > xmax or segment[6] < xmin or segment[5] > ymax or segment[7] < ymin:
+                        continue
+                    if _segment_hits_box(segment[0], segment[1], segment[2], segment[3], xmin, ymin, xmax, ymax):
+                        return True
+        return False
+
+    def place(self, anchor, box):
+        """放置一个标注，box 为相对 anchor 的标注框 (xmin, ymin, xmax, ymax)
+
+        返回 (放置点, 布局结果)，放置点即绘制标注时使用的参考点。
+        """
+        ax, ay = anchor[0], anchor[1]
+        width = box[2] - box[0] + self.gap
+        height = box[3] - box[1] + self.gap
+        fallback = None
+        for dx, dy in self.candidates:
+            x = ax + dx * width
+            y = ay + dy * height
+            candidate = (x + box[0], y + box[1], x + box[2], y + box[3])
+            if self.overlaps_box(candidate):
+                continue
+            if not self.crosses_outline(candidate):
+                self.add_box(candidate)
+                return (x, y), PLACED if dx == 0 and dy == 0 else MOVED
+            if fallback is None:
+                fallback = (x, y, candidate)
+        if fallback is not None:
+            x, y, candidate = fallback
+            self.add_box(candidate)
+            return (x, y), CROSSING
+        self.add_box((ax + box[0], ay + box[1], ax + box[2], ay + box[3]))
+        return (ax, ay), UNPLACED
+
+
+def layout_labels(anchors, boxes, vertices=None, offsets=None, gap=0.0, candidates=CANDIDATES):
+    """按顺序布局一批标注
+
+    anchors 为 N×2 的标注锚点，boxes 为 N×4 的标注框（相对锚点），
+    vertices/offsets 为需要避开的图形轮廓。返回 (N×2 放置点, N 个布局结果)。
+    """
+    anchors = np.asarray(anchors, dtype=float).reshape(-1, 2)
+    boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+    layout = LabelLayout.for_boxes(boxes[:, 2:] - boxes[:, :2], gap, candidates)
+    if vertices is not None and offsets is not None:
+        layout.add_outlines(vertices, offsets)
+    positions = np.empty_like(anchors)
+    results = np.empty(len(anchors), dtype=np.int8)
+    for i, (anchor, box) in enumerate(zip(anchors.tolist(), boxes.tolist())):
+        positions[i], results[i] = layout.place(anchor, box)
+    return positions, results
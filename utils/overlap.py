@@ -0,0 +1,257 @@
+"""
+多边形重叠面积模块
+
+功能说明:
+- 计算每个种植区与地库线（任意简单多边形，可为凹形）的精确相交面积
+- 先用包围盒批量筛选：与地库包围盒不相交的种植区直接记为0
+- 附近没有地库边的种植区整体在内或在外，只需一次批量点在多边形内判断
+- 跨越地库边界的种植区按格林公式精确求交：相交区域的边界由"种植区位于地库内的
+  边段"和"地库位于种植区内的边段"组成，分别累加叉积即可。所有跨界种植区的
+  边对、切分和内外判断合并为整批数组运算
+- 种植区与地库线共边（常见于沿地库边线绘制的种植区）时，求交前做微小平移
+  使两者处于一般位置，共边处的面积不会丢失
+"""
+
+import numpy as np
+
+from utils.geometry import (
+    PolygonClassifier, as_points, bounding_boxes, densify_arcs, next_vertex_index,
+    shoelace_areas, subset_buffers,
+)
+
+# 地库顶板覆土绿地的默认折算系数
+GARAGE_FACTOR = 0.8
+
+# 种植区常与地库线共边或顶点落在地库边上，求交前按包围盒尺寸做微小平移使其处于一般位置，
+# 面积误差约为 1e-9 × 周长 × 边长，可以忽略
+_PERTURBATION = 1e-9 * np.array((1.0, 0.6180339887))
+
+# 单批边对数量上限，控制内存
+_MAX_PAIRS = 2000000
+
+
+def _ccw_ring(points):
+    """返回逆时针方向的顶点数组（去掉与首点重合的尾点）"""
+    ring = as_points(points)
+    if len(ring) > 1 and np.allclose(ring[0], ring[-1]):
+        ring = ring[:-1]
+    x = ring[:, 0]
+    y = ring[:, 1]
+    signed = np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)
+    return ring[::-1].copy() if signed < 0 else ring
+
+
+def _ragged_arange(counts):
+    """各段内部序号 0..counts[i]-1 依次拼接"""
+    counts = np.asarray(counts, dtype=np.intp)
+    return np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+
+def _split_segments(ids, params, count):
+    """把编号为 0..count-1 的边按交点参数切开，返回 (边编号, 起点参数, 终点参数)"""
+    all_ids = np.concatenate((np.arange(count), np.arange(count), ids))
+    all_params = np.concatenate((np.zeros(count), np.ones(count), params))
+    order = np.lexsort((all_params, all_ids))
+    all_ids = all_ids[order]
+    all_params = all_params[order]
+    same = all_ids[1:] == all_ids[:-1]
+    seg_ids = all_ids[:-1][same]
+    t0 = all_params[:-1][same]
+    t1 = all_params[1:][same]
+    keep = t1 > t0
+    return seg_ids[keep], t0[keep], t1[keep]
+
+
+def _segment_cross(a, d, seg_ids, t0, t1):
+    """返回子段的 (中点, 叉积)"""
+    p0 = a[seg_ids] + t0[:, None] * d[seg_ids]
+    p1 = a[seg_ids] + t1[:, None] * d[seg_ids]
+    return (p0 + p1) / 2, p0[:, 0] * p1[:, 1] - p1[:, 0] * p0[:, 1]
+
+
+class ClipPolygon:
+    """预处理的地库多边形，边数组只计算一次"""
+
+    def __init__(self, points):
+        ring = _ccw_ring(points)
+        if len(ring) < 3:
+            raise ValueError("地库线至少需要3个顶点")
+        self.a = ring
+        self.b = np.roll(ring, -1, axis=0)
+        self.box = np.concatenate((ring.min(axis=0), ring.max(axis=0)))
+        self.edge_boxes = np.column_stack((np.minimum(self.a, self.b), np.maximum(self.a, self.b)))
+        self.area = float(shoelace_areas(ring.ravel(), [0, len(ring)])[0])
+        self.classifier = PolygonClassifier(ring)
+
+    def contains(self, points):
+        """批量判断点是否在地库内，返回布尔数组"""
+        return self.classifier.contains(points)
+
+    def near_edges(self, boxes, chunk_size=256):
+        """返回包围盒与各 box 相交的地库边，结果为 (box序号数组, 边序号数组)"""
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        eb = self.edge_boxes
+        owners = []
+        edges = []
+        for start in range(0, len(boxes), chunk_size):
+            cb = boxes[start:start + chunk_size]
+            near = ((eb[None, :, 0] <= cb[:, None, 2]) & (eb[None, :, 2] >= cb[:, None, 0]) &
+                    (eb[None, :, 1] <= cb[:, None, 3]) & (eb[None, :, 3] >= cb[:, None, 1]))
+            rows, cols = np.nonzero(near)
+            owners.append(rows + start)
+            edges.append(cols)
+        if not owners:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+        return np.concatenate(owners), np.concatenate(edges)
+
+    def intersection_area(self, points):
+        """单个多边形与地库的精确相交面积"""
+        ring = _ccw_ring(points)
+        if len(ring) < 3:
+            return 0.0
+        box = np.concatenate((ring.min(axis=0), ring.max(axis=0)))
+        owners, edges = self.near_edges([box])
+        return float(self.intersection_areas(ring.ravel(), [0, len(ring)], owners, edges)[0])
+
+    def intersection_areas(self, vertices, offsets, near_owners, near_edges):
+        """批量计算多边形与地库的精确相交面积
+
+        near_owners/near_edges 为 (多边形序号, 附近地库边序号) 对，按多边形序号升序排列。
+        """
+        offsets = np.asarray(offsets, dtype=np.intp)
+        count = len(offsets) - 1
+        result = np.zeros(count)
+        if not count:
+            return result
+
+        # 按边对数量分批
+        edge_counts = np.diff(offsets)
+        near_counts = np.bincount(near_owners, minlength=count)
+        pair_ends = np.cumsum(edge_counts * near_counts)
+        near_starts = np.concatenate(([0], np.cumsum(near_counts)))
+        start = 0
+        while start < count:
+            base = pair_ends[start - 1] if start else 0
+            stop = max(int(np.searchsorted(pair_ends, base + _MAX_PAIRS, side='right')), start + 1)
+            members = np.arange(start, stop)
+            sub_vertices, sub_offsets, _ = subset_buffers(vertices, offsets, members)
+            lo, hi = near_starts[start], near_starts[stop]
+            result[start:stop] = self._intersection_batch(
+                sub_vertices, sub_offsets, near_owners[lo:hi] - start, near_edges[lo:hi])
+            start = stop
+        return result
+
+    def _intersection_batch(self, vertices, offsets, near_owners, near_edges):
+        """一批多边形与地库的相交面积（格林公式）"""
+        count = len(offsets) - 1
+        edge_counts = np.diff(offsets)
+        pts = as_points(vertices)
+
+        # 统一为逆时针方向，并做微小平移
+        signed = shoelace_areas(vertices, offsets, signed=True)
+        owner_of_vertex = np.repeat(np.arange(count), edge_counts)
+        local = _ragged_arange(edge_counts)
+        flip = (signed < 0)[owner_of_vertex]
+        index = offsets[:-1][owner_of_vertex] + np.where(flip, edge_counts[owner_of_vertex] - 1 - local, local)
+        boxes = bounding_boxes(vertices, offsets)
+        extents = np.maximum(np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]), 1.0)
+        a = pts[index] + extents[owner_of_vertex, None] * _PERTURBATION
+        d = a[next_vertex_index(offsets)] - a
+
+        # 全部 (种植区边, 附近地库边) 对；near_owners 已按多边形升序排列
+        near_counts = np.bincount(near_owners, minlength=count)
+        near_starts = np.concatenate(([0], np.cumsum(near_counts)))
+        pair_edge = np.repeat(np.arange(len(a)), near_counts[owner_of_vertex])
+        pair_near = (np.repeat(near_starts[:-1][owner_of_vertex], near_counts[owner_of_vertex]) +
+                     _ragged_arange(near_counts[owner_of_vertex]))
+        clip_index = near_edges[pair_near]
+        ca = self.a[clip_index]
+        ce = self.b[clip_index] - ca
+        pd = d[pair_edge]
+        denom = pd[:, 0] * ce[:, 1] - pd[:, 1] * ce[:, 0]
+        w = ca - a[pair_edge]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = (w[:, 0] * ce[:, 1] - w[:, 1] * ce[:, 0]) / denom
+            u = (w[:, 0] * pd[:, 1] - w[:, 1] * pd[:, 0]) / denom
+        hit = (denom != 0) & (t > 0) & (t < 1) & (u > 0) & (u < 1)
+
+        # 种植区位于地库内的边段
+        seg_ids, t0, t1 = _split_segments(pair_edge[hit], t[hit], len(a))
+        mids, cross = _segment_cross(a, d, seg_ids, t0, t1)
+        inside = self.contains(mids)
+        total = np.zeros(count)
+        total += np.bincount(owner_of_vertex[seg_ids][inside], weights=cross[inside], minlength=count).astype(float)
+
+        # 地库位于种植区内的边段（种植区包围盒外的地库边不可能在种植区内）
+        near_a = self.a[near_edges]
+        near_d = self.b[near_edges] - near_a
+        seg_ids, t0, t1 = _split_segments(pair_near[hit], u[hit], len(near_edges))
+        mids, cross = _segment_cross(near_a, near_d, seg_ids, t0, t1)
+        owners = near_owners[seg_ids]
+
+        # 中点逐个与所属种植区的全部边做射线判断
+        spans = edge_counts[owners]
+        point_of_pair = np.repeat(np.arange(len(mids)), spans)
+        edge = np.repeat(offsets[:-1][owners], spans) + _ragged_arange(spans)
+        ea = a[edge]
+        eb = ea + d[edge]
+        py = mids[point_of_pair, 1]
+        crosses = (ea[:, 1] > py) != (eb[:, 1] > py)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x_cross = (eb[:, 0] - ea[:, 0]) * (py - ea[:, 1]) / (eb[:, 1] - ea[:, 1]) + ea[:, 0]
+        hits = np.bincount(point_of_pair[crosses & (mids[point_of_pair, 0] < x_cross)], minlength=len(mids))
+        inside = hits % 2 == 1
+        total += np.bincount(owners[inside], weights=cross[inside], minlength=count).astype(float)
+        return np.maximum(total / 2, 0.0)
+
+
+def overlap_areas(vertices, offsets, clip_points, bulges=None):
+    """批量计算每个多边形与地库的相交面积，返回 (相交面积, 多边形面积)
+
+    clip_points 可以是顶点列表，也可以是预处理好的 ClipPolygon。
+    """
+    vertices, offsets = densify_arcs(vertices, offsets, bulges)
+    offsets = np.asarray(offsets, dtype=np.intp)
+    pts = as_points(vertices)
+    areas = shoelace_areas(vertices, offsets)
+    overlaps = np.zeros(len(areas))
+    if not len(areas):
+        return overlaps, areas
+
+    clip = clip_points if isinstance(clip_points, ClipPolygon) else ClipPolygon(clip_points)
+    boxes = bounding_boxes(vertices, offsets)
+    counts = np.diff(offsets)
+    candidates = np.flatnonzero(
+        (counts >= 3) &
+        (boxes[:, 0] <= clip.box[2]) & (boxes[:, 2] >= clip.box[0]) &
+        (boxes[:, 1] <= clip.box[3]) & (boxes[:, 3] >= clip.box[1])
+    )
+
+    # 附近没有地库边的多边形整体在内或在外，用首顶点批量判断
+    near_owners, near_edges = clip.near_edges(boxes[candidates])
+    has_near = np.zeros(len(candidates), dtype=bool)
+    has_near[near_owners] = True
+    whole = candidates[~has_near]
+    if len(whole):
+        inside = clip.contains(pts[offsets[whole]])
+        overlaps[whole[inside]] = areas[whole[inside]]
+
+    # 跨界的多边形整批精确求交
+    straddling = candidates[has_near]
+    if len(straddling):
+        local = np.cumsum(has_near) - 1
+        sub_vertices, sub_offsets, _ = subset_buffers(vertices, offsets, straddling)
+        overlaps[straddling] = clip.intersection_areas(sub_vertices, sub_offsets, local[near_owners], near_edges)
+    np.minimum(overlaps, areas, out=overlaps)
+    return overlaps, areas
+
+
+def overlap_fractions(vertices, offsets, clip_points, bulges=None):
+    """批量计算每个多边形位于地库内的面积比例（0到1）"""
+    overlaps, areas = overlap_areas(vertices, offsets, clip_points, bulges)
+    return np.divide(overlaps, areas, out=np.zeros_like(areas), where=areas > 0)
+
+
+def split_factor(fraction, garage_factor, outside_factor=1.0):
+    """按地库内外面积比例加权的折算系数，例如 0.6×80% + 0.4×100%"""
+    return fraction * garage_factor + (1 - fraction) * outside_factor
@@ -0,0 +1,67 @@
+"""
+阅读顺序排序模块
+
+功能说明:
+- 将标注点按从上到下、从左到右的顺序排序
+- 先按Y坐标整体排序，再用容差带自上而下扫描分行，复杂度 O(n log n)
+- 结果与输入顺序无关：同一行内按X排序，坐标完全相同时按原下标排序
+"""
+
+import numpy as np
+
+
+def default_row_tolerance(y_min, y_max):
+    """根据图形分布计算分行容差"""
+    y_range = y_max - y_min
+    # 将Y轴范围分成10个区域，并设置合理的容差范围
+    return max(min(y_range / 10, y_range / 3), 100)
+
+
+def _row_blocks(ys, tolerance=None):
+    """按Y从大到小排序并扫描分行，返回排序下标和每行的起止位置"""
+    ys = np.asarray(ys, dtype=float).ravel()
+    n = len(ys)
+    if tolerance is None and n:
+        tolerance = default_row_tolerance(ys.min(), ys.max())
+
+    # 按Y从大到小排列（取负后升序），稳定排序保证相同Y按原下标
+    order = np.argsort(-ys, kind='stable')
+    depth = -ys[order]
+
+    # 每行以最上方的点为基准，距离小于容差的点归入同一行
+    blocks = []
+    start = 0
+    while start < n:
+        end = int(np.searchsorted(depth, depth[start] + tolerance, side='left'))
+        end = max(end, start + 1)
+        blocks.append((start, end))
+        start = end
+    return order, blocks
+
+
+def assign_rows(ys, tolerance=None):
+    """为每个点分配行号，行号0为最上一行"""
+    order, blocks = _row_blocks(ys, tolerance)
+    rows = np.empty(len(order), dtype=np.intp)
+    for row, (start, end) in enumerate(blocks):
+        rows[order[start:end]] = row
+    return rows
+
+
+def reading_order(points, tolerance=None):
+    """返回按从上到下、从左到右排序的下标数组（argsort）"""
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    order, blocks = _row_blocks(pts[:, 1], tolerance)
+    xs = pts[:, 0]
+    # 行内按X稳定排序：X相同时保持从上到下，坐标也相同时保持原下标顺序
+    for start, end in blocks:
+        block = order[start:end]
+        order[start:end] = block[np.argsort(xs[block], kind='stable')]
+    return order
+
+
+def sort_points(points, tolerance=None):
+    """按从上到下，从左到右排序点"""
+    if len(points) == 0:
+        return []
+    return [points[i] for i in reading_order(points, tolerance)]
@@ -11,9 +11,12 @@ class SettingsManager:
             "redline_area": 0,
             "has_redline": False,
             "has_garage": False,
-            "garage_points": [],
+            "factor_zones": [],    # 折算分区（地库、屋顶花园等）及其系数
             "original_areas": [],  # 添加框选的面积数据
             "center_points": [],   # 添加中心点数据
+            "mark_handles": [],    # 已标注图形的句柄
+            "bed_outlines": {},    # 已标注图形的轮廓（WCS）
+            "annotation_registry": {},  # 每张图纸的标注登记表，用于增量标注
             "cad_filename": ""     # 添加CAD文件名
         }
         
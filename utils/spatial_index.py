@@ -0,0 +1,160 @@
+"""
+空间索引模块
+
+功能说明:
+- GridIndex: 均匀网格空间哈希，按单元格登记点，查询只检查相邻单元格，
+  用于在容差范围内匹配中心点，整体为线性复杂度
+- STRTree: 按 Sort-Tile-Recursive 方法一次性打包的只读R树，
+  支持对一批包围盒同时查询，逐层向量化展开候选节点
+"""
+
+import math
+
+import numpy as np
+
+
+class GridIndex:
+    """点的网格空间哈希"""
+
+    def __init__(self, cell_size):
+        if cell_size <= 0:
+            raise ValueError("网格尺寸必须大于0")
+        self.cell_size = float(cell_size)
+        self.cells = {}
+        self.points = []
+
+    def _cell(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def insert(self, point, item=None):
+        """登记一个点，item 默认为点的序号"""
+        index = len(self.points)
+        self.points.append((point[0], point[1], index if item is None else item))
+        self.cells.setdefault(self._cell(point[0], point[1]), []).append(index)
+        return index
+
+    @classmethod
+    def from_points(cls, points, cell_size):
+        """由点列表建立索引，item 为点的序号"""
+        index = cls(cell_size)
+        for point in points:
+            index.insert(point)
+        return index
+
+    def query(self, point, tolerance):
+        """返回与 point 在X、Y方向都相差小于 tolerance 的点序号"""
+        x, y = point[0], point[1]
+        reach = int(math.ceil(tolerance / self.cell_size))
+        cx, cy = self._cell(x, y)
+        found = []
+        for gx in range(cx - reach, cx + reach + 1):
+            for gy in range(cy - reach, cy + reach + 1):
+                for index in self.cells.get((gx, gy), ()):
+                    px, py, _ = self.points[index]
+                    if abs(px - x) < tolerance and abs(py - y) < tolerance:
+                        found.append(index)
+        return found
+
+    def nearest(self, point, tolerance, exclude=None):
+        """返回容差范围内最近点的序号，没有时返回 None；exclude 为需要跳过的序号集合"""
+        best = None
+        best_distance = float('inf')
+        for index in self.query(point, tolerance):
+            if exclude is not None and index in exclude:
+                continue
+            px, py, _ = self.points[index]
+            distance = (px - point[0]) ** 2 + (py - point[1]) ** 2
+            if distance < best_distance:
+                best_distance = distance
+                best = index
+        return best
+
+    def item(self, index):
+        """获取点登记时的 item"""
+        return self.points[index][2]
+
+
+class STRTree:
+    """包围盒的STR打包R树（只读）
+
+    boxes 为 N×4 数组（xmin, ymin, xmax, ymax）。每层节点的包围盒保存为数组，
+    查询时整批包围盒逐层展开，只保留与节点相交的候选对。
+    """
+
+    def __init__(self, boxes, node_capacity=16):
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        self.node_capacity = max(2, int(node_capacity))
+        self.count = len(boxes)
+        # levels[k] = (节点包围盒, 子节点起始下标, 子节点数量)；最底层的子节点为原始包围盒
+        self.levels = []
+        self.item_order = np.arange(self.count)
+        if not self.count:
+            return
+
+        order = self._str_order(boxes)
+        self.item_order = order
+        children = boxes[order]
+        while True:
+            starts = np.arange(0, len(children), self.node_capacity)
+            counts = np.minimum(self.node_capacity, len(children) - starts)
+            nodes = np.column_stack((
+                np.minimum.reduceat(children[:, 0], starts),
+                np.minimum.reduceat(children[:, 1], starts),
+                np.maximum.reduceat(children[:, 2], starts),
+                np.maximum.reduceat(children[:, 3], starts),
+            ))
+            self.levels.append((nodes, starts, counts))
+            if len(nodes) == 1:
+                break
+            # 上层节点同样按STR排序，子节点下标随之调整
+            order = self._str_order(nodes)
+            nodes_sorted = nodes[order]
+            self.levels[-1] = (nodes_sorted, starts[order], counts[order])
+            children = nodes_sorted
+        self.levels.reverse()
+        self.leaf_boxes = boxes[self.item_order]
+
+    def _str_order(self, boxes):
+        """STR排序：先按X中心分为若干竖条，条内按Y中心排序"""
+        count = len(boxes)
+        leaves = math.ceil(count / self.node_capacity)
+        slices = max(1, math.ceil(math.sqrt(leaves)))
+        per_slice = slices * self.node_capacity
+        cx = (boxes[:, 0] + boxes[:, 2]) / 2
+        cy = (boxes[:, 1] + boxes[:, 3]) / 2
+        by_x = np.argsort(cx, kind='stable')
+        slice_ids = np.empty(count, dtype=np.intp)
+        slice_ids[by_x] = np.arange(count) // per_slice
+        return np.lexsort((cy, slice_ids))
+
+    def query_boxes(self, boxes):
+        """批量查询，返回相交的 (查询序号数组, 条目序号数组)"""
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        empty = np.zeros(0, dtype=np.intp)
+        if not self.count or not len(boxes):
+            return empty, empty
+
+        queries = np.arange(len(boxes))
+        nodes = np.zeros(len(boxes), dtype=np.intp)
+        for node_boxes, starts, counts in self.levels:
+            hit = _boxes_intersect(boxes[queries], node_boxes[nodes])
+            queries = queries[hit]
+            nodes = nodes[hit]
+            # 展开为子节点（最底层的子节点为条目）
+            spans = counts[nodes]
+            firsts = np.repeat(starts[nodes], spans)
+            queries = np.repeat(queries, spans)
+            nodes = firsts + np.arange(len(firsts)) - np.repeat(np.cumsum(spans) - spans, spans)
+
+        hit = _boxes_intersect(boxes[queries], self.leaf_boxes[nodes])
+        return queries[hit], self.item_order[nodes[hit]]
+
+    def query(self, box):
+        """查询与单个包围盒相交的条目序号"""
+        return np.sort(self.query_boxes([box])[1])
+
+
+def _boxes_intersect(a, b):
+    """逐行判断两组包围盒是否相交"""
+    return ((a[:, 0] <= b[:, 2]) & (a[:, 2] >= b[:, 0]) &
+            (a[:, 1] <= b[:, 3]) & (a[:, 3] >= b[:, 1]))
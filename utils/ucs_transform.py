@@ -0,0 +1,74 @@
+"""
+UCS坐标变换模块
+
+功能说明:
+- UcsTransform: 由 UCSORG/UCSXDIR/UCSYDIR 构造的平面仿射变换，
+  一次调用即可在WCS和UCS之间转换整个 N×2 坐标数组，旋转角度在构造时算好
+- 以三个系统变量的值作为缓存键，变量不变时沿用同一个变换对象
+"""
+
+import math
+
+import numpy as np
+
+
+class UcsTransform:
+    """WCS与UCS之间的平面仿射变换"""
+
+    def __init__(self, origin, xaxis, yaxis):
+        self.origin = np.array(origin[:2], dtype=float)
+        self.xaxis = np.array(xaxis[:2], dtype=float)
+        self.yaxis = np.array(yaxis[:2], dtype=float)
+        self.key = self.make_key(origin, xaxis, yaxis)
+        # 行为UCS的X、Y轴：ucs = (wcs - origin) @ axes.T，wcs = ucs @ axes + origin
+        self.axes = np.vstack((self.xaxis, self.yaxis))
+        self.rotation = math.atan2(self.xaxis[1], self.xaxis[0])  # UCS X轴相对WCS X轴的角度（弧度）
+        self.rotation_degrees = math.degrees(self.rotation)
+        self.is_identity = bool(
+            np.allclose(self.origin, 0.0) and np.allclose(self.axes, np.eye(2))
+        )
+
+    @staticmethod
+    def make_key(origin, xaxis, yaxis):
+        """缓存键：三个系统变量的平面分量"""
+        return tuple(float(v) for v in (*origin[:2], *xaxis[:2], *yaxis[:2]))
+
+    @classmethod
+    def identity(cls):
+        return cls((0.0, 0.0), (1.0, 0.0), (0.0, 1.0))
+
+    def to_ucs(self, points):
+        """把WCS点或 N×2 数组转换到UCS，返回 float 数组"""
+        points = np.asarray(points, dtype=float)
+        if self.is_identity:
+            return points[..., :2].copy()
+        return (points[..., :2] - self.origin) @ self.axes.T
+
+    def to_wcs(self, points):
+        """把UCS点或 N×2 数组转换回WCS，返回 float 数组"""
+        points = np.asarray(points, dtype=float)
+        if self.is_identity:
+            return points[..., :2].copy()
+        return points[..., :2] @ self.axes + self.origin
+
+    def as_list(self):
+        """可保存的 [原点, X轴, Y轴] 形式"""
+        return [self.origin.tolist(), self.xaxis.tolist(), self.yaxis.tolist()]
+
+
+class UcsCache:
+    """按系统变量值缓存 UcsTransform，只有变量变化时才重建"""
+
+    def __init__(self):
+        self.transform = None
+        self.rebuilds = 0
+
+    def get(self, origin, xaxis, yaxis):
+        key = UcsTransform.make_key(origin, xaxis, yaxis)
+        if self.transform is None or self.transform.key != key:
+            self.transform = UcsTransform(origin, xaxis, yaxis)
+            self.rebuilds += 1
+        return self.transform
+
+    def clear(self):
+        self.transform = None